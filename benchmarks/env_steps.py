@@ -0,0 +1,64 @@
+"""
+TradingEnv throughput: DataFrame slicing vs strided array windows.
+
+    python -m benchmarks.env_steps [--bars 20000] [--steps 20000]
+
+"pandas" is the previous approach (slice the DataFrame and hstack every step),
+"array" is the strided-view TradingEnv. Parity with the live bot's observation is
+tested in tests/test_trading_env.py.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.env.trading_env import TradingEnv, OBS_FEATURE_COLUMNS
+from src.data.synthetic import synthetic_market
+
+
+class PandasTradingEnv(TradingEnv):
+    """Observation built from the DataFrame each step, as before."""
+
+    def __init__(self, df, **kwargs):
+        super().__init__(df, **kwargs)
+        self.df = df
+
+    def _get_obs(self):
+        price = self.prices[self.current_step]
+        window = self.df.iloc[self.current_step - self.lookback + 1:self.current_step + 1][OBS_FEATURE_COLUMNS].values
+        pnl_ratio = self._unrealized(price) / self.net_worth if self.held_quantity != 0 and self.net_worth > 0 else 0.0
+        lev = np.full((self.lookback, 1), self.current_leverage / self.max_leverage)
+        pnl = np.full((self.lookback, 1), pnl_ratio)
+        return np.nan_to_num(np.hstack((window, lev, pnl))).astype(np.float32)
+
+
+def steps_per_second(env, n_steps, seed=0):
+    rng = np.random.default_rng(seed)
+    actions = rng.uniform(-1, 1, (n_steps, 1)).astype(np.float32)
+    env.reset(seed=seed)
+    start = time.perf_counter()
+    for i in range(n_steps):
+        _, _, terminated, truncated, _ = env.step(actions[i])
+        if terminated or truncated:
+            env.reset()
+    return n_steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bars', type=int, default=20000)
+    parser.add_argument('--steps', type=int, default=20000)
+    args = parser.parse_args()
+
+    df = synthetic_market(args.bars, np.random.default_rng(0))
+    results = {
+        'pandas': steps_per_second(PandasTradingEnv(df), args.steps),
+        'array': steps_per_second(TradingEnv(df), args.steps),
+    }
+    for name, sps in results.items():
+        print(f"{name:>8}: {sps:10,.0f} steps/s")
+    print(f" speedup: {results['array'] / results['pandas']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
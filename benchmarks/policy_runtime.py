@@ -0,0 +1,60 @@
+"""
+Cold start and predict latency: PPO.load + model.predict vs the exported NumPy actor.
+
+    python -m benchmarks.policy_runtime [--model models/ppo_trading_bot.zip] [--calls 5000]
+
+Cold start runs in a fresh interpreter (imports included). Parity compares the
+deterministic actions of both runtimes on random observations.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+COLD_START = {
+    'sb3': "from stable_baselines3 import PPO; m = PPO.load({path!r}); m.predict(np.zeros(m.observation_space.shape, np.float32))",
+    'numpy': "from src.agent.policy_runtime import NumpyPolicy; m = NumpyPolicy.load({path!r}); m.predict(np.zeros(m.observation_shape, np.float32))",
+}
+
+
+def cold_start_seconds(runtime, path):
+    code = f"import time; t = time.perf_counter(); import numpy as np; {COLD_START[runtime].format(path=path)}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def predict_latency_us(model, obs, calls):
+    model.predict(obs[0], deterministic=True)
+    start = time.perf_counter()
+    for i in range(calls):
+        model.predict(obs[i % len(obs)], deterministic=True)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='models/ppo_trading_bot.zip')
+    parser.add_argument('--calls', type=int, default=5000)
+    args = parser.parse_args()
+
+    from stable_baselines3 import PPO
+    from src.agent.export import export_policy
+    from src.agent.policy_runtime import NumpyPolicy
+
+    npz = export_policy(args.model, os.path.join(tempfile.mkdtemp(), 'policy.npz'))
+    sb3, fast = PPO.load(args.model, device='cpu'), NumpyPolicy.load(npz)
+    obs = np.random.default_rng(0).normal(0, 1, (256, *fast.observation_shape)).astype(np.float32)
+
+    for name, model, path in (('sb3', sb3, args.model), ('numpy', fast, npz)):
+        print(f"{name:>6}: cold start {cold_start_seconds(name, path):6.2f}s | "
+              f"predict {predict_latency_us(model, obs, args.calls):8.1f} us")
+    diff = max(float(np.abs(sb3.predict(o, deterministic=True)[0] - fast.predict(o)[0]).max()) for o in obs)
+    print(f"parity: max |sb3 - numpy| = {diff:.3g}")
+
+
+if __name__ == '__main__':
+    main()
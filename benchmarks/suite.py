@@ -0,0 +1,336 @@
+"""
+Offline benchmark suite for the trading cycle hot paths, on synthetic candles.
+
+    python -m benchmarks.suite [--quick] [--out results.json] [--only processor]
+    python -m benchmarks.suite --compare baseline.json [--threshold 0.15]
+
+Cases:
+    processor.*          DataProcessor indicators / normalize / merge at several base-bar counts
+    observation.latest   TradingBot._get_latest_observation end to end (stubbed fetcher, warm engine)
+    inference.*          model.predict on one observation (SB3 checkpoint and the exported NumPy actor)
+    env.step             TradingEnv steps per second
+    execution.paper      PaperTradingSession.execute_target_leverage per call (journal write included)
+    orderbook.update     LocalOrderBook diff (10 level changes) applied + features recomputed
+    cycle.*              observation + predict + execution against the 10 s cycle budget
+
+Results are written as JSON. With --compare, every case shared with the baseline is
+listed with its change, and the exit code is 1 if any case regressed by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.processor import DataProcessor
+from src.data.synthetic import generate_candles, resample_candles, synthetic_market
+
+CYCLE_BUDGET_SECONDS = 10.0
+MODEL_PATH = "models/ppo_trading_bot.zip"
+SIZES = {'quick': [1000, 10000], 'full': [1000, 10000, 100000]}
+
+
+# --- Timing ---
+
+def measure(fn, repeat, setup=None):
+    """Runs fn `repeat` times (fn(setup()) if setup is given); per-call seconds summary."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples)
+    return {
+        'value': float(np.median(samples)),
+        'p90': float(np.percentile(samples, 90)),
+        'min': float(samples.min()),
+        'unit': 's',
+        'better': 'lower',
+        'repeat': repeat,
+    }
+
+
+def measure_batched(fn, calls, repeat=5):
+    """For sub-millisecond calls: median over `repeat` batches of the mean per-call time."""
+    fn()
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        per_call.append((time.perf_counter() - start) / calls)
+    return {'value': float(np.median(per_call)), 'min': float(min(per_call)), 'unit': 's',
+            'better': 'lower', 'repeat': repeat * calls}
+
+
+# --- Fixtures ---
+
+def candle_frames(n_base, base_minutes=5, seed=0, end=None):
+    """1m candles for n_base base bars (ending at `end` if given) resampled to 5m/15m/1h."""
+    n_minutes = n_base * base_minutes
+    start = '2026-01-01'
+    if end is not None:
+        start = (pd.Timestamp(end).floor('1h') - pd.Timedelta(minutes=n_minutes - 60)).strftime('%Y-%m-%d %H:%M')
+    df_1m = generate_candles(n_minutes, np.random.default_rng(seed), start=start)
+    return {'1m': df_1m, '5m': resample_candles(df_1m, 5), '15m': resample_candles(df_1m, 15),
+            '1h': resample_candles(df_1m, 60)}
+
+
+class StubFetcher:
+    """fetch_multi_timeframes() served from in-memory frames (the last `limit` candles)."""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def fetch_multi_timeframes(self, timeframes, limit=1000, since=None):
+        limits = limit if isinstance(limit, dict) else {tf: limit for tf in timeframes}
+        return {tf: self.frames[tf].iloc[-limits[tf]:] for tf in timeframes}
+
+
+def paper_session():
+    from src.main import PaperTradingSession
+    return PaperTradingSession(history_file=os.path.join(tempfile.mkdtemp(), 'bench_trades.json'))
+
+
+def stub_bot(frames):
+    """A TradingBot without network or model: real feature engine + session, stubbed fetcher."""
+    from src.main import TradingBot, LOOKBACK_WINDOW
+    from src.data.incremental import IncrementalFeatureEngine
+
+    bot = TradingBot.__new__(TradingBot)
+    bot.symbol = 'BTC/USDT'
+    bot.stream = None
+    bot.fetcher = StubFetcher(frames)
+    bot.feature_engine = IncrementalFeatureEngine(base_timeframe='5m', timeframes=('15m', '1h', '1m'),
+                                                  lookback=LOOKBACK_WINDOW)
+    bot.paper_session = paper_session()
+    bot.current_price = 0.0
+    return bot
+
+
+# --- Cases ---
+
+def bench_processor(results, sizes, repeat):
+    for n in sizes:
+        frames = candle_frames(n)
+        others = {tf: frames[tf] for tf in ('15m', '1h', '1m')}
+        reps = max(1, repeat // (1 + n // 10000))
+
+        def indicators_setup():
+            return DataProcessor(frames['5m'].copy())
+        results[f'processor.indicators.{n}'] = measure(lambda p: p.add_technical_indicators(), reps, indicators_setup)
+
+        def normalize_setup():
+            p = DataProcessor(frames['5m'].copy())
+            p.add_technical_indicators()
+            return p
+        results[f'processor.normalize.{n}'] = measure(lambda p: p.normalize_features(), reps, normalize_setup)
+
+        base = normalize_setup().normalize_features()
+        results[f'processor.merge.{n}'] = measure(lambda: DataProcessor.merge_timeframes(base, others), reps)
+
+
+def bench_observation(results, repeat):
+    from src.main import LOOKBACK_WINDOW
+    # Candles ending now (UTC), enough 1h history for its indicators to warm up
+    frames = candle_frames(1200, end=pd.Timestamp.now(tz='UTC').tz_localize(None))
+    bot = stub_bot(frames)
+    bot._get_latest_observation(lookback=LOOKBACK_WINDOW)  # seed the engine (cold start excluded)
+    results['observation.latest'] = measure(lambda: bot._get_latest_observation(lookback=LOOKBACK_WINDOW), repeat)
+    return bot._get_latest_observation(lookback=LOOKBACK_WINDOW)
+
+
+def bench_inference(results, obs, calls):
+    if not os.path.exists(MODEL_PATH):
+        print(f"[Bench] {MODEL_PATH} not found, skipping inference")
+        return
+    from stable_baselines3 import PPO
+    from src.agent.export import export_policy
+    from src.agent.policy_runtime import NumpyPolicy
+
+    model = PPO.load(MODEL_PATH, device='cpu')
+    results['inference.sb3'] = measure_batched(lambda: model.predict(obs), calls)
+    npz = export_policy(model, os.path.join(tempfile.mkdtemp(), 'policy.npz'))
+    policy = NumpyPolicy.load(npz)
+    results['inference.numpy'] = measure_batched(lambda: policy.predict(obs), calls)
+
+
+def bench_env(results, steps):
+    from benchmarks.env_steps import steps_per_second
+    from src.env.trading_env import TradingEnv
+
+    env = TradingEnv(synthetic_market(max(steps // 2, 2000), np.random.default_rng(0)))
+    sps = [steps_per_second(env, steps, seed=s) for s in range(3)]
+    results['env.step'] = {'value': float(np.median(sps)), 'unit': 'steps/s', 'better': 'higher', 'repeat': 3 * steps}
+
+
+def bench_execution(results, calls):
+    session = paper_session()
+    prices = 60000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.001, calls + 1)))
+    targets = np.random.default_rng(1).uniform(-5, 5, calls + 1)
+    state = {'i': 0}
+
+    def call():
+        i = state['i'] = (state['i'] + 1) % calls
+        session.execute_target_leverage(targets[i], prices[i], 'BTC/USDT')
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')  # the session prints every fill
+    try:
+        results['execution.paper'] = measure_batched(call, max(calls // 5, 1))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def depth_diffs(n, levels=1000, changes=10, seed=0):
+    """A 1000-level snapshot and n chained depthUpdate diffs, most changes near the touch."""
+    rng = np.random.default_rng(seed)
+    tick, mid = 0.1, 60000.0
+    bids = [[round(mid - tick * (i + 1), 1), float(rng.uniform(0.1, 5))] for i in range(levels)]
+    asks = [[round(mid + tick * i, 1), float(rng.uniform(0.1, 5))] for i in range(levels)]
+    diffs, u = [], 100
+    for _ in range(n):
+        offsets = np.minimum(rng.geometric(0.15, (2, changes)), levels)
+        qtys = np.where(rng.random((2, changes)) < 0.2, 0.0, rng.uniform(0.1, 5, (2, changes)))
+        diffs.append({'e': 'depthUpdate', 'E': u, 'U': u + 1, 'u': u + 5, 'pu': u,
+                      'b': [[round(mid - tick * o, 1), q] for o, q in zip(offsets[0], qtys[0])],
+                      'a': [[round(mid + tick * (o - 1), 1), q] for o, q in zip(offsets[1], qtys[1])]})
+        u += 5
+    return bids, asks, diffs
+
+
+def bench_orderbook(results, calls):
+    from src.data.orderbook import LocalOrderBook
+
+    bids, asks, diffs = depth_diffs(calls)
+    book = LocalOrderBook()
+    book.load_snapshot(bids, asks, 101)
+    events = iter(diffs)
+    results['orderbook.update'] = measure_batched(lambda: book.on_diff(next(events)), max(calls // 5 - 1, 1))
+
+
+def cycle_estimate(results):
+    parts = ['observation.latest', 'execution.paper']
+    if not all(p in results for p in parts):
+        return
+    for runtime in ('sb3', 'numpy'):
+        key = f'inference.{runtime}'
+        if key not in results:
+            continue
+        total = sum(results[p]['value'] for p in parts) + results[key]['value']
+        results[f'cycle.{runtime}'] = {'value': total, 'unit': 's', 'better': 'lower',
+                                       'budget_fraction': total / CYCLE_BUDGET_SECONDS}
+
+
+def run(quick=False, only=None):
+    repeat = 5 if quick else 20
+    results = {}
+
+    def wanted(name):
+        return only is None or any(name.startswith(o) for o in only)
+
+    if wanted('processor'):
+        bench_processor(results, SIZES['quick' if quick else 'full'], repeat)
+    obs = None
+    if wanted('observation') or wanted('inference') or wanted('cycle'):
+        obs = bench_observation(results, repeat * 5)
+    if obs is not None and (wanted('inference') or wanted('cycle')):
+        bench_inference(results, obs, 200 if quick else 1000)
+    if wanted('env'):
+        bench_env(results, 5000 if quick else 20000)
+    if wanted('execution') or wanted('cycle'):
+        bench_execution(results, 500 if quick else 2000)
+    if wanted('orderbook'):
+        bench_orderbook(results, 5000 if quick else 20000)
+    if wanted('cycle'):
+        cycle_estimate(results)
+    return results
+
+
+def metadata(quick):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'quick': quick,
+    }
+
+
+def _fmt(result):
+    value = result['value']
+    if result['unit'] == 's':
+        if value < 1e-3:
+            return f"{value * 1e6:9.1f} us"
+        if value < 1:
+            return f"{value * 1e3:9.2f} ms"
+        return f"{value:9.3f} s "
+    return f"{value:9,.0f} {result['unit']}"
+
+
+def compare(results, baseline, threshold):
+    """Prints case-by-case changes; returns the names of regressions beyond threshold."""
+    regressions = []
+    print(f"{'case':<32} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name in sorted(set(results) & set(baseline)):
+        new, old = results[name], baseline[name]
+        if old['value'] <= 0 or new['value'] <= 0:
+            continue
+        # slowdown > 1 means worse, for both latencies and throughputs
+        slowdown = new['value'] / old['value'] if new['better'] == 'lower' else old['value'] / new['value']
+        flag = ''
+        if slowdown > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<32} {_fmt(old):>14} {_fmt(new):>14} {(slowdown - 1) * 100:+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer repeats')
+    parser.add_argument('--only', nargs='*', help='case prefixes to run (processor, observation, inference, env, execution, orderbook, cycle)')
+    parser.add_argument('--out', default=None, help='write results JSON here')
+    parser.add_argument('--compare', default=None, help='baseline results JSON')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before a case counts as a regression')
+    args = parser.parse_args()
+
+    results = run(quick=args.quick, only=args.only)
+    report = {'meta': metadata(args.quick), 'results': results}
+    for name, result in results.items():
+        extra = f" ({result['budget_fraction'] * 100:.2f}% of the {CYCLE_BUDGET_SECONDS:.0f}s cycle)" if 'budget_fraction' in result else ''
+        print(f"{name:<32} {_fmt(result)}{extra}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        over_budget = [n for n, r in results.items() if r.get('budget_fraction', 0) > 1]
+        if regressions or over_budget:
+            print(f"[Bench] Regressions: {', '.join(regressions) or 'none'}; over cycle budget: {', '.join(over_budget) or 'none'}")
+            sys.exit(1)
+        print("[Bench] No regressions.")
+
+
+if __name__ == '__main__':
+    main()
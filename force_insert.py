@@ -14,6 +14,7 @@ def force_insert():
     
     try:
         storage.save_market_data(data)
+        storage.flush()
         print("Successfully sent insert command.")
         
         # Immediate verification
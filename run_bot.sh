@@ -12,7 +12,15 @@ fi
 # Create logs directory if it doesn't exist
 mkdir -p logs
 
-# 1. Run Streamlit with nohup so it survives terminal closure
+# 1. Run the bot daemon (trading loop + status API) with nohup so it survives terminal closure
+nohup python -m src.daemon > logs/daemon.log 2>&1 &
+DAEMON_PID=$!
+echo $DAEMON_PID > .daemon.pid
+echo "✅ Bot daemon started with PID: $DAEMON_PID"
+echo "   Logs: logs/daemon.log"
+disown $DAEMON_PID
+
+# 2. Run Streamlit (read-only dashboard) with nohup
 nohup streamlit run src/app.py > logs/streamlit.log 2>&1 &
 STREAMLIT_PID=$!
 echo $STREAMLIT_PID > .streamlit.pid
@@ -20,10 +28,10 @@ echo "✅ Streamlit started with PID: $STREAMLIT_PID"
 echo "   Logs: logs/streamlit.log"
 disown $STREAMLIT_PID
 
-# 2. Wait a moment for it to start
+# 3. Wait a moment for it to start
 sleep 2
 
-# 3. Force Open Google Chrome
+# 4. Force Open Google Chrome
 echo "Opening in Google Chrome..."
 open -a "Google Chrome" http://localhost:8501
 
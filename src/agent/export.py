@@ -0,0 +1,75 @@
+"""
+Exports the actor of a PPO checkpoint to a compact .policy.npz for src.agent.policy_runtime.
+Only the layers on the action path are kept (flatten -> policy MLP -> action_net);
+the value head and optimizer state are dropped.
+
+Usage: python -m src.agent.export [models/ppo_trading_bot.zip]
+"""
+import os
+import sys
+
+import numpy as np
+from torch import nn
+
+from src.agent.policy_runtime import policy_path_for
+
+MODEL_PATH = "models/ppo_trading_bot"
+
+ACTIVATION_NAMES = {nn.Tanh: 'tanh', nn.ReLU: 'relu'}
+
+
+def _actor_layers(policy):
+    """(weight (in, out), bias, activation name) per Linear layer of the actor."""
+    from stable_baselines3.common.torch_layers import FlattenExtractor
+    from gymnasium import spaces
+
+    if not isinstance(policy.pi_features_extractor, FlattenExtractor):
+        raise ValueError(f"Unsupported features extractor: {type(policy.pi_features_extractor).__name__}")
+    if not isinstance(policy.action_space, spaces.Box) or policy.squash_output:
+        raise ValueError("Only unsquashed Box action spaces (Gaussian PPO) can be exported")
+
+    layers = []
+    modules = list(policy.mlp_extractor.policy_net) + [policy.action_net]
+    for module in modules:
+        if isinstance(module, nn.Linear):
+            weight = module.weight.detach().cpu().numpy().T
+            bias = module.bias.detach().cpu().numpy()
+            layers.append([weight, bias, 'identity'])
+        elif type(module) in ACTIVATION_NAMES and layers:
+            layers[-1][2] = ACTIVATION_NAMES[type(module)]
+        else:
+            raise ValueError(f"Unsupported actor layer: {module}")
+    return layers
+
+
+def export_policy(model, out_path=None):
+    """
+    model: a loaded PPO or a checkpoint path. Writes the actor weights (atomically)
+    and returns the output path.
+    """
+    if isinstance(model, str):
+        from stable_baselines3 import PPO
+        out_path = out_path or policy_path_for(model)
+        model = PPO.load(model, device='cpu')
+    out_path = out_path or policy_path_for(MODEL_PATH)
+
+    policy = model.policy
+    layers = _actor_layers(policy)
+    arrays = {'n_layers': np.array(len(layers))}
+    for i, (weight, bias, _) in enumerate(layers):
+        arrays[f'w{i}'] = weight.astype(np.float32)
+        arrays[f'b{i}'] = bias.astype(np.float32)
+    arrays['activations'] = np.array([a for _, _, a in layers])
+    arrays['observation_shape'] = np.array(policy.observation_space.shape)
+    arrays['action_low'] = policy.action_space.low.astype(np.float32)
+    arrays['action_high'] = policy.action_space.high.astype(np.float32)
+
+    tmp = f"{out_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, out_path)
+    print(f"[Export] Actor ({len(layers)} layers) written to {out_path} ({os.path.getsize(out_path) / 1024:.0f} KB)")
+    return out_path
+
+
+if __name__ == "__main__":
+    export_policy(sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH + ".zip")
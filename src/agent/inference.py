@@ -0,0 +1,160 @@
+"""
+Batched policy inference: one loaded copy per model, many callers.
+Symbol workers submit single observations and get a Future back; a background
+thread stacks whatever arrived within the batch window into one forward pass.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+from gymnasium import spaces
+from stable_baselines3 import PPO
+
+from src.metrics import Histogram, SIZE_BUCKETS, REGISTRY
+
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', '64'))
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', '5'))
+
+
+class _Request:
+    __slots__ = ('model', 'obs', 'future', 'submitted')
+
+    def __init__(self, model, obs):
+        self.model = model
+        self.obs = obs
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class InferenceServer:
+    def __init__(self, max_batch_size=INFERENCE_BATCH_SIZE, batch_window_ms=INFERENCE_BATCH_WINDOW_MS,
+                 deterministic=False, device='cpu'):
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.deterministic = deterministic  # False matches TradingBot's model.predict(obs)
+        self.device = device
+        self.policies = {}
+        self._queue = queue.Queue()
+        self.running = False
+        self.thread = None
+
+        # Metrics
+        self.request_latency = Histogram()            # submit -> result, seconds
+        self.forward_latency = Histogram()            # one batched forward pass, seconds
+        self.batch_sizes = Histogram(SIZE_BUCKETS)
+        REGISTRY.register('inference_request_seconds', self.request_latency)
+        REGISTRY.register('inference_forward_seconds', self.forward_latency)
+        REGISTRY.register('inference_batch_size', self.batch_sizes)
+        self.requests = 0
+        self.started_at = None
+
+    # --- Models ---
+
+    def load_model(self, name, path):
+        """Loads (or hot-swaps) a PPO checkpoint under `name`."""
+        model = PPO.load(path, device=self.device)
+        self.add_policy(name, model.policy)
+        print(f"[Inference] Loaded model '{name}' from {path}")
+
+    def add_policy(self, name, policy):
+        policy.set_training_mode(False)
+        self.policies[name] = policy  # dict assignment is atomic; in-flight batches keep the old one
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="inference")
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+
+    # --- Client API ---
+
+    def submit(self, name, obs):
+        """Queues one observation; the Future resolves to the action array."""
+        req = _Request(name, np.asarray(obs, dtype=np.float32))
+        if name not in self.policies:
+            req.future.set_exception(KeyError(f"Unknown model '{name}'"))
+            return req.future
+        self._queue.put(req)
+        return req.future
+
+    def predict(self, name, obs, timeout=None):
+        return self.submit(name, obs).result(timeout=timeout)
+
+    def stats(self):
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            'requests': self.requests,
+            'throughput': self.requests / elapsed if elapsed > 0 else 0.0,
+            'request_latency': self.request_latency.snapshot(),
+            'forward_latency': self.forward_latency.snapshot(),
+            'batch_size': self.batch_sizes.snapshot(),
+        }
+
+    # --- Worker ---
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_loop(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            by_model = {}
+            for req in batch:
+                by_model.setdefault(req.model, []).append(req)
+            for name, reqs in by_model.items():
+                self._forward(name, reqs)
+
+    def _forward(self, name, reqs):
+        policy = self.policies[name]
+        try:
+            obs = np.stack([r.obs for r in reqs])
+            start = time.perf_counter()
+            with torch.inference_mode():
+                obs_tensor, _ = policy.obs_to_tensor(obs)
+                actions = policy._predict(obs_tensor, deterministic=self.deterministic)
+            actions = actions.cpu().numpy().reshape((-1, *policy.action_space.shape))
+            if isinstance(policy.action_space, spaces.Box):
+                if policy.squash_output:
+                    actions = policy.unscale_action(actions)
+                else:
+                    actions = np.clip(actions, policy.action_space.low, policy.action_space.high)
+            self.forward_latency.observe(time.perf_counter() - start)
+            self.batch_sizes.observe(len(reqs))
+        except Exception as e:
+            for r in reqs:
+                r.future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        for r, action in zip(reqs, actions):
+            r.future.set_result(action)
+            self.request_latency.observe(done - r.submitted)
+        self.requests += len(reqs)
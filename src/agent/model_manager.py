@@ -0,0 +1,131 @@
+"""
+Training runs next to live trading instead of pausing it.
+Training subprocesses start under a CPU budget (nice level + BLAS/torch thread caps),
+checkpoints are written atomically, and ModelWatcher loads and warms up a new
+checkpoint on its own thread so the trading loop only swaps a reference between cycles.
+With POLICY_RUNTIME=numpy the watcher follows the exported .policy.npz instead of the
+PPO zip, and stable_baselines3 is never imported.
+"""
+import os
+import sys
+import time
+import threading
+import subprocess
+
+import numpy as np
+
+from src.agent.policy_runtime import NumpyPolicy, POLICY_RUNTIME, policy_path_for
+
+RETRAIN_NICE = int(os.getenv('RETRAIN_NICE', '10'))
+RETRAIN_THREADS = int(os.getenv('RETRAIN_THREADS', '1'))
+MODEL_POLL_SECONDS = 5
+WARMUP_PASSES = 3
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def start_training_process(script, nice=RETRAIN_NICE, threads=RETRAIN_THREADS):
+    """Launches a training script at lower CPU priority with capped math-library threads."""
+    env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        env[var] = str(threads)
+    env['RETRAIN_THREADS'] = str(threads)
+    preexec = (lambda: os.nice(nice)) if nice and hasattr(os, 'nice') else None
+    return subprocess.Popen([sys.executable, script], env=env, preexec_fn=preexec)
+
+
+def limit_torch_threads(threads=RETRAIN_THREADS):
+    """Called at the top of training scripts; torch ignores OMP_NUM_THREADS once initialised."""
+    import torch
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set (inter-op pool started)
+
+
+def save_model_atomic(model, path):
+    """model.save() into a temp file, then rename over path(.zip): readers never see a partial zip."""
+    base = path[:-4] if path.endswith('.zip') else path
+    tmp = f"{base}.{os.getpid()}.tmp.zip"
+    model.save(tmp)
+    os.replace(tmp, base + ".zip")
+
+
+def warm_up(model, passes=WARMUP_PASSES):
+    """Runs a few forward passes so the first live prediction doesn't pay for lazy init."""
+    shape = model.observation_shape if isinstance(model, NumpyPolicy) else model.observation_space.shape
+    obs = np.zeros(shape, dtype=np.float32)
+    for _ in range(passes):
+        model.predict(obs)
+
+
+class ModelWatcher:
+    def __init__(self, path, device='cpu', poll_seconds=MODEL_POLL_SECONDS, runtime=POLICY_RUNTIME):
+        self.runtime = runtime
+        if runtime == 'numpy':
+            self.path = policy_path_for(path)
+        else:
+            self.path = path if path.endswith('.zip') else path + ".zip"
+        self.device = device
+        self.poll_seconds = poll_seconds
+        self.timestamp = 0        # mtime of the newest checkpoint loaded (swapped in or pending)
+        self._pending = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="model-watcher")
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def load_now(self):
+        """Synchronous load (startup). Returns (model, mtime) or None if there is no checkpoint."""
+        self._poll()
+        if self.runtime == 'numpy' and not os.path.exists(self.path):
+            # Generated artifact (not in git): train/retrain write it, or export the checkpoint by hand
+            print(f"[ModelWatcher] {self.path} not found; run python -m src.agent.export to create it")
+        return self.take()
+
+    def take(self):
+        """The loaded + warmed model waiting to be swapped in, as (model, mtime), or None."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
+
+    def _poll(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime <= self.timestamp:
+            return
+        start = time.time()
+        try:
+            model = self._load(self.path)
+            warm_up(model)
+        except Exception as e:
+            # e.g. a checkpoint written by an older, non-atomic writer; retry on the next change
+            print(f"[ModelWatcher] ⚠️ Failed to load {self.path}: {e}")
+            self.timestamp = mtime
+            return
+        self.timestamp = mtime
+        with self._lock:
+            self._pending = (model, mtime)
+        print(f"[ModelWatcher] New checkpoint loaded and warmed up in {time.time() - start:.1f}s")
+
+    def _load(self, path):
+        if self.runtime == 'numpy':
+            return NumpyPolicy.load(path)
+        from stable_baselines3 import PPO
+        return PPO.load(path, device=self.device)
+
+    def _run_loop(self):
+        while self.running:
+            self._poll()
+            time.sleep(self.poll_seconds)
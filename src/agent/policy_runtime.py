@@ -0,0 +1,52 @@
+"""
+Minimal policy runtime: the deterministic PPO action in pure NumPy.
+Loads the .policy.npz written by src.agent.export (actor weights only), so live
+trading starts without importing torch, gymnasium or stable_baselines3.
+"""
+import os
+
+import numpy as np
+
+POLICY_RUNTIME = os.getenv('POLICY_RUNTIME', 'sb3').lower()  # 'sb3' or 'numpy'
+
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0, out=x),
+    'identity': lambda x: x,
+}
+
+
+def policy_path_for(model_path):
+    """models/ppo_trading_bot(.zip) -> models/ppo_trading_bot.policy.npz"""
+    base = model_path[:-4] if model_path.endswith('.zip') else model_path
+    return base + ".policy.npz"
+
+
+class NumpyPolicy:
+    def __init__(self, weights, biases, activations, observation_shape, action_low, action_high):
+        # Weights stored (in, out) so a batch is x @ W
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = [ACTIVATIONS[a] for a in activations]
+        self.observation_shape = tuple(observation_shape)
+        self.action_low = np.asarray(action_low, dtype=np.float32)
+        self.action_high = np.asarray(action_high, dtype=np.float32)
+        self.n_inputs = int(np.prod(self.observation_shape))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n = int(data['n_layers'])
+            return cls([data[f'w{i}'] for i in range(n)], [data[f'b{i}'] for i in range(n)],
+                       [str(a) for a in data['activations']], data['observation_shape'],
+                       data['action_low'], data['action_high'])
+
+    def predict(self, obs, state=None, episode_start=None, deterministic=True):
+        """Same contract as PPO.predict (action, state); always the deterministic (mean) action."""
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.shape == self.observation_shape
+        x = obs.reshape(-1, self.n_inputs)
+        for w, b, activation in zip(self.weights, self.biases, self.activations):
+            x = activation(x @ w + b)
+        actions = np.clip(x, self.action_low, self.action_high)
+        return (actions[0] if single else actions), state
@@ -2,13 +2,16 @@ import os
 import time
 import pandas as pd
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
 import sys
 sys.path.append(os.getcwd())
 
 from src.data.fetcher import BinanceDataFetcher
-from src.data.processor import DataProcessor
-from src.env.trading_env import TradingEnv
+from src.data.ratelimit import set_process_role
+from src.data.feature_store import FeatureStore
+from src.env.vec_env import make_vec_env, N_ENVS
+from src.agent.model_manager import limit_torch_threads, save_model_atomic
+from src.agent.export import export_policy
+from src.agent.policy_runtime import policy_path_for
 
 def retrain_model(total_timesteps=5000):
     """
@@ -16,6 +19,8 @@ def retrain_model(total_timesteps=5000):
     This is now an incremental learning step (Fine-Tuning) after each trade.
     """
     MODEL_PATH = "models/ppo_trading_bot"
+    # Runs next to live trading: keep torch to the CPU budget given by the launcher
+    limit_torch_threads()
     
     print(f"[Retrainer] Starting incremental update ({total_timesteps} steps)...")
     
@@ -28,23 +33,13 @@ def retrain_model(total_timesteps=5000):
     print(f"[Retrainer] Fetching data since {pd.to_datetime(start_time, unit='ms')}...")
     
     try:
-        df_5m = fetcher.fetch_ohlcv(timeframe='5m', since=start_time)
-        others = {
-            '15m': fetcher.fetch_ohlcv(timeframe='15m', since=start_time),
-            '1h': fetcher.fetch_ohlcv(timeframe='1h', since=start_time),
-            '1m': fetcher.fetch_ohlcv(timeframe='1m', since=start_time)
-        }
-        
-        # 2. Process
-        processor = DataProcessor(df_5m)
-        df_base = processor.add_technical_indicators()
-        df_base = processor.normalize_features() # Apply Normalization
-        
-        df_merged = DataProcessor.merge_timeframes(df_base, others)
+        # 2. Process (shared feature store: only new candles go through the pipeline)
+        store = FeatureStore('BTC/USDT', '5m', ['15m', '1h', '1m'])
+        df_merged = store.sync(fetcher, since=start_time)
         print(f"[Retrainer] Data ready. Shape: {df_merged.shape}")
         
-        # 3. Create Environment
-        env = DummyVecEnv([lambda: TradingEnv(df_merged)])
+        # 3. Create Environment (N_ENVS > 1: one worker process per env)
+        env = make_vec_env(df_merged, n_envs=N_ENVS)
         
         # 4. Load Existing Model & Resume Training
         if os.path.exists(MODEL_PATH + ".zip"):
@@ -62,9 +57,11 @@ def retrain_model(total_timesteps=5000):
         # 5. Learn
         model.learn(total_timesteps=total_timesteps)
         
-        # 6. Save
-        model.save(MODEL_PATH)
+        # 6. Save (atomic: the live bot may be reading the checkpoint)
+        save_model_atomic(model, MODEL_PATH)
+        export_policy(model, policy_path_for(MODEL_PATH))  # NumPy runtime artifact
         print(f"[Retrainer] Model updated and saved to {MODEL_PATH}")
+        env.close()
         return True
         
     except Exception as e:
@@ -74,4 +71,5 @@ def retrain_model(total_timesteps=5000):
         return False
 
 if __name__ == "__main__":
+    set_process_role('retrain')
     retrain_model()
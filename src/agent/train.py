@@ -1,15 +1,28 @@
 import os
 import pandas as pd
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
 import numpy as np
 
 from src.data.fetcher import BinanceDataFetcher
-from src.data.processor import DataProcessor
-from src.env.trading_env import TradingEnv
+from src.data.processor import timeframe_to_ms
+from src.data.ratelimit import set_process_role
+from src.data.feature_store import FeatureStore
+from src.data.synthetic import generate_market_arrays
+from src.env.trading_env import feature_matrix
+from src.env.vec_env import make_vec_env, measure_fps_scaling, scaling_worker_counts, N_ENVS
+from src.agent.model_manager import limit_torch_threads, save_model_atomic
+from src.agent.export import export_policy
+from src.agent.policy_runtime import policy_path_for
+
+# Synthetic self-play rows per real row
+SYNTHETIC_RATIO = float(os.getenv('SYNTHETIC_RATIO', '1.0'))
+
+# Log rollout fps for 1, 2, 4, ... N_ENVS workers before training
+FPS_SCALING = os.getenv('FPS_SCALING', 'False').lower() == 'true'
 
 def train():
     import time
+    limit_torch_threads()
     
     # 1. Fetch Multi-Timeframe Data
     # Calculate start time (e.g., 20 days ago to cover 1500+ periods of 15m)
@@ -22,69 +35,32 @@ def train():
     # Fetch all from start_time
     print(f"Fetching data starting from {pd.to_datetime(start_time, unit='ms')}...")
     
-    # Primary TF: 15m
-    df_15m = fetcher.fetch_ohlcv(timeframe='15m', since=start_time)
-    
-    # Secondary TFs: 5m, 1h, 1m
-    others = {
-        '5m': fetcher.fetch_ohlcv(timeframe='5m', since=start_time),
-        '1h': fetcher.fetch_ohlcv(timeframe='1h', since=start_time),
-        '1m': fetcher.fetch_ohlcv(timeframe='1m', since=start_time)
-    }
-    
-    # 2. Process and Merge
-    processor_15m = DataProcessor(df_15m)
-    df_base = processor_15m.add_technical_indicators()
-    df_base = processor_15m.normalize_features() # Add Normalization!
-    
-    df_merged = DataProcessor.merge_timeframes(df_base, others)
+    # Primary TF: 15m, Secondary TFs: 5m, 1h, 1m. Features already in the store are
+    # reused; only candles newer than its last row are fetched and processed.
+    store = FeatureStore('BTC/USDT', '15m', ['5m', '1h', '1m'])
+    df_merged = store.sync(fetcher, since=start_time)
     print(f"Final merged features: {df_merged.columns.tolist()}")
     
-    # 2.1 Fetch Self-Play Data
-    from src.env.self_play_env import SelfPlayTradingEnv
-    self_play_env = SelfPlayTradingEnv()
-    self_play_data = []
-
-    for _ in range(100):  # Generate 100 episodes of self-play data
-        state = self_play_env.reset()
-        done = False
-        while not done:
-            action = self_play_env.action_space.sample()  # Random actions for now
-            next_state, reward, done, _ = self_play_env.step(action)
-            self_play_data.append({
-                'state': state,
-                'action': action,
-                'reward': reward,
-                'next_state': next_state
-            })
-            state = next_state
-
-    # Convert self-play data to DataFrame
-    self_play_df = pd.DataFrame(self_play_data)
-
-    # Debugging Self-Play Data
-    print("Self-Play Data Sample:")
-    print(self_play_df.head())
-
-    # Add 'close' column to Self-Play Data
-    self_play_df['close'] = np.random.uniform(10000, 60000, size=len(self_play_df))
-    # Add 'volume' column to Self-Play Data
-    self_play_df['volume'] = np.random.uniform(100, 10000, size=len(self_play_df))
-
-    # Add Timestamp index to Self-Play Data
-    self_play_df['timestamp'] = pd.date_range(start='2026-01-01', periods=len(self_play_df), freq='T')
-    self_play_df.set_index('timestamp', inplace=True)
-
-    # 2.2 Combine Self-Play Data with Market Data
-    df_combined = processor_15m.combine_self_play_and_market_data(self_play_df)
-    print(f"Combined dataset features: {df_combined.columns.tolist()}")
-
-    # Debugging Combined Dataset
-    print("Combined Dataset Columns:")
-    print(df_combined.columns.tolist())
-
-    # Update Environment with Combined Data
-    env = DummyVecEnv([lambda: TradingEnv(df_combined)])
+    # 2.1 Self-Play Data: synthetic episodes written straight into the training matrix after
+    # the real rows, continuing from the last real close (SYNTHETIC_RATIO x the real row count)
+    real_features = feature_matrix(df_merged)
+    n_real = len(real_features)
+    n_synthetic = int(n_real * SYNTHETIC_RATIO)
+    features = np.empty((n_real + n_synthetic, real_features.shape[1]), dtype=np.float32)
+    prices = np.empty(n_real + n_synthetic, dtype=np.float64)
+    features[:n_real] = real_features
+    prices[:n_real] = df_merged['close'].to_numpy(dtype=np.float64)
+    gen_start = time.time()
+    generate_market_arrays(n_synthetic, start_price=prices[n_real - 1],
+                           out_features=features[n_real:], out_prices=prices[n_real:],
+                           base_minutes=timeframe_to_ms(store.base_timeframe) // 60000)
+    print(f"Generated {n_synthetic} synthetic steps in {time.time() - gen_start:.1f}s "
+          f"({n_real} real + {n_synthetic} synthetic rows)")
+
+    # Update Environment with Combined Data (N_ENVS > 1: one worker process per env)
+    if FPS_SCALING:
+        measure_fps_scaling(features, prices, scaling_worker_counts(max(N_ENVS, 1)))
+    env = make_vec_env(features=features, prices=prices, n_envs=N_ENVS)
     
     # 4. Define Model (PPO)
     model = PPO('MlpPolicy', env, verbose=1, tensorboard_log="./logs/")
@@ -99,8 +75,10 @@ def train():
         os.makedirs(models_dir)
     
     model_path = f"{models_dir}/ppo_trading_bot"
-    model.save(model_path)
+    save_model_atomic(model, model_path)
+    export_policy(model, policy_path_for(model_path))  # NumPy runtime artifact
     print(f"Model saved to {model_path}")
+    env.close()
 
 def monitor_performance(trades):
     """
@@ -110,14 +88,18 @@ def monitor_performance(trades):
     import matplotlib.pyplot as plt
     import numpy as np
 
+    from src.performance import PerformanceTracker
+
     # Extract profits from trades
     profits = [trade['profit'] for trade in trades]
     cumulative_profits = np.cumsum(profits)
 
-    # Calculate win rate
-    wins = sum(1 for profit in profits if profit > 0)
-    total_trades = len(profits)
-    win_rate = (wins / total_trades) * 100 if total_trades > 0 else 0
+    # Win rate / profit factor from the same accumulator the live sessions use
+    tracker = PerformanceTracker()
+    for profit in profits:
+        tracker.on_fill(profit)
+    total_trades = tracker.trades
+    win_rate = tracker.win_rate()
 
     # Plot cumulative profits
     plt.figure(figsize=(10, 6))
@@ -131,10 +113,12 @@ def monitor_performance(trades):
 
     print(f"Total Trades: {total_trades}")
     print(f"Win Rate: {win_rate:.2f}%")
-    print(f"Final Profit: {cumulative_profits[-1] if total_trades > 0 else 0:.2f}")
+    print(f"Profit Factor: {tracker.profit_factor():.2f}")
+    print(f"Final Profit: {tracker.realized_pnl:.2f}")
 
 # Example usage
 if __name__ == "__main__":
+    set_process_role('train')
     train()
     # Example trade history
     example_trades = [
@@ -4,12 +4,11 @@ import altair as alt
 import time
 import os
 import sys
-import subprocess
 
 # Ensure src is in python path
 sys.path.append(os.getcwd())
 
-from src.main import TradingBot
+from src.daemon import DaemonClient, DAEMON_URL
 
 # Page Config
 st.set_page_config(
@@ -36,66 +35,41 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize Bot in Session State (Singleton pattern for Streamlit)
-if 'bot' not in st.session_state:
-    st.session_state.bot = TradingBot()
-    st.session_state.history_df = pd.DataFrame(columns=['timestamp', 'net_worth'])
+# Read-only client of the bot daemon (python -m src.daemon); one per browser session,
+# each keeps its own trade/equity cursors so a refresh only transfers what is new
+if 'client' not in st.session_state:
+    st.session_state.client = DaemonClient()
+client = st.session_state.client
 
-# Robustness check: Re-init if attributes missing (due to code update)
 try:
-    _ = st.session_state.bot.paper_session.initial_balance
-except AttributeError:
-    st.session_state.bot = TradingBot()
-    st.session_state.history_df = pd.DataFrame(columns=['timestamp', 'net_worth'])
+    status = client.status()
+    client.poll(max_equity_points=100)
+except OSError as e:
+    st.title("📈 Binance AI Trading Bot")
+    st.error(f"Bot daemon not reachable at {DAEMON_URL} ({e}).\n\nStart it with `python -m src.daemon`.")
+    time.sleep(2)
     st.rerun()
 
-bot = st.session_state.bot
-
-# Sidebar Controls
-st.sidebar.title("🤖 Bot Control")
+# Sidebar Status
+st.sidebar.title("🤖 Bot Status")
 
 # Mode Indicator
-use_testnet = os.getenv('USE_TESTNET', 'True').lower() == 'true'
-# Safely check session type using class name to avoid import issues
-is_live = type(bot.paper_session).__name__ == 'LiveTradingSession'
-
-if is_live:
-    if use_testnet:
+if status.get('mode') == 'live':
+    if status.get('testnet'):
         st.sidebar.success("🟢 TESTNET LIVE")
     else:
         st.sidebar.error("🔴 REAL TRADING")
 else:
     st.sidebar.info("📝 PAPER TRADING")
 
-# Status Indicator - Render Immediately to avoid flickering
-if bot.running:
-    status = bot.get_status()
+if status.get('running'):
     next_retrain = status.get('next_retrain', 'N/A')
     st.sidebar.success(f"Running...\n\n⏳ Next Auto-Retrain: {next_retrain}")
 else:
     st.sidebar.error("Stopped")
 
-col1, col2 = st.sidebar.columns(2)
-
-if col1.button("START", type="primary", disabled=bot.running):
-    bot.start()
-    st.rerun()
-
-if col2.button("STOP", type="secondary", disabled=not bot.running):
-    bot.stop()
-    st.rerun()
-
 st.sidebar.markdown("---")
-if st.sidebar.button("🧠 RETRAIN MODEL"):
-    # Launch background process
-    try:
-        subprocess.Popen([sys.executable, "src/agent/retrainer.py"])
-        bot.last_retrain_time = time.time() # Reset timer
-        st.sidebar.info("🚀 Training started in background!")
-        st.sidebar.caption("Takes ~5-10 mins. Bot will auto-reload when done.")
-    except Exception as e:
-        st.sidebar.error(f"Failed to start training: {e}")
-
+st.sidebar.caption(f"Daemon: {DAEMON_URL}\n\nStart/stop with `python -m src.daemon` / Ctrl+C (or ./stop_bot.sh).")
 
 
 # Main Dashboard
@@ -103,8 +77,6 @@ st.title("📈 Binance AI Trading Bot")
 st.caption("Dynamic Leverage Mode (-20x to +20x)")
 
 # 1. Real-time Metrics
-status = bot.get_status()
-
 # Create metrics row 1
 m1, m2, m3, m4 = st.columns(4)
 
@@ -113,7 +85,7 @@ with m1:
 
 with m2:
     balance = status['balance']
-    start_bal = bot.paper_session.initial_balance
+    start_bal = status['initial_balance']
     delta = balance - start_bal
     st.metric(label="Net Worth (USDT)", value=f"${balance:,.2f}", delta=f"{delta:.2f}")
 
@@ -127,7 +99,7 @@ with m3:
         st.metric(label="Current Leverage", value=f"{direction} {abs(lev):.2f}x")
 
 with m4:
-    win_rate = bot.paper_session.get_win_rate()
+    win_rate = status['win_rate']
     st.metric(label="Win Rate", value=f"{win_rate:.1f}%")
 
 # Create metrics row 2
@@ -151,22 +123,32 @@ with m8:
     action = status.get('action', '--')
     st.metric(label="Last Target", value=action)
 
+# Create metrics row 3 (O(1) session analytics published by the daemon)
+perf = status.get('performance', {})
+m9, m10, m11, m12 = st.columns(4)
+
+with m9:
+    pf = perf.get('profit_factor', 0.0)
+    st.metric(label="Profit Factor", value="∞" if pf == float('inf') else f"{pf:.2f}")
+
+with m10:
+    st.metric(label="Sharpe / Sortino", value=f"{perf.get('sharpe', 0.0):.2f} / {perf.get('sortino', 0.0):.2f}")
+
+with m11:
+    st.metric(label="Max Drawdown", value=f"{perf.get('max_drawdown', 0.0) * 100:.1f}%")
+
+with m12:
+    st.metric(label="Exposure", value=f"{perf.get('exposure', 0.0) * 100:.0f}%")
+
 # 2. Charts & Logs
 tab1, tab2 = st.tabs(["Price Chart", "Trade History"])
 
 with tab1:
-    # Update history for chart (Simulated)
-    # In a real app, you'd pull this from bot.history or fetcher
-    # Update history for chart
-    if bot.running:
-        new_row = pd.DataFrame([{'timestamp': pd.Timestamp.now(), 'net_worth': status['balance']}])
-        st.session_state.history_df = pd.concat([st.session_state.history_df, new_row], ignore_index=True)
-        # Keep last 100 points
-        if len(st.session_state.history_df) > 100:
-            st.session_state.history_df = st.session_state.history_df.iloc[-100:]
-            
-    if not st.session_state.history_df.empty:
-        df_chart = st.session_state.history_df.copy()
+    # Net worth points published by the daemon (last 100)
+    history_df = pd.DataFrame(client.equity, columns=['timestamp', 'net_worth'])
+    history_df['timestamp'] = pd.to_datetime(history_df['timestamp'].map(pd.Timestamp.fromtimestamp))
+    if not history_df.empty:
+        df_chart = history_df
         nw_min = df_chart['net_worth'].min()
         nw_max = df_chart['net_worth'].max()
         padding = max((nw_max - nw_min) * 0.1, 10)
@@ -192,10 +174,10 @@ with tab1:
         st.info("Waiting for data...")
 
 with tab2:
-    st.write("Recent Trades (Session)")
+    st.write(f"Recent Trades ({status.get('trade_count', 0)} total)")
     # Convert list of dicts to DataFrame
-    if bot.paper_session.history:
-        df_trades = pd.DataFrame(bot.paper_session.history).iloc[::-1].reset_index(drop=True)
+    if client.trades:
+        df_trades = pd.DataFrame(client.trades).drop(columns=['id', 'ts']).iloc[::-1].reset_index(drop=True)
         
         def style_df(styler):
             # Color 'type' text
@@ -220,6 +202,5 @@ with tab2:
         st.text("No trades yet.")
 
 # Auto-refresh logic like a game loop
-if bot.running:
-    time.sleep(1) # Refresh every 1s
-    st.rerun()
+time.sleep(1) # Refresh every 1s
+st.rerun()
@@ -0,0 +1,212 @@
+"""
+Headless bot process with a local, read-only status API.
+
+    python -m src.daemon
+
+Runs one TradingBot and, once per PUBLISH_SECONDS, snapshots its status and net worth
+into pre-serialized buffers; trades are paged straight from the session's TradeJournal
+(SQLite WAL, separate reader connection). The HTTP handlers never touch the bot, its
+exchange clients or the trading thread, however many dashboards (src/app.py, src/gui.py) poll.
+
+    GET /status             latest status snapshot
+    GET /trades?since=ID    trades after journal id ID (paged)   -> {"next": ID, "trades": [...]}
+    GET /trades?last=N      the last N trades
+    GET /equity?since=N     net worth points after sequence N  -> {"next": M, "points": [[ts, net_worth], ...]}
+    GET /metrics            cycle stage timings and REST counters (Prometheus text, see src/metrics.py)
+"""
+import os
+import json
+import time
+import signal
+import threading
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.metrics import REGISTRY
+
+DAEMON_HOST = os.getenv('DAEMON_HOST', '127.0.0.1')
+DAEMON_PORT = int(os.getenv('DAEMON_PORT', '8765'))
+DAEMON_URL = os.getenv('DAEMON_URL', f"http://{DAEMON_HOST}:{DAEMON_PORT}")
+PUBLISH_SECONDS = 1.0
+TRADES_PAGE = 500
+EQUITY_POINTS = 86400  # one day at one point per second
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=float).encode()
+
+
+class BotDaemon:
+    def __init__(self, bot=None, host=DAEMON_HOST, port=DAEMON_PORT, publish_seconds=PUBLISH_SECONDS):
+        if bot is None:
+            from src.main import TradingBot
+            bot = TradingBot()
+        self.bot = bot
+        self.publish_seconds = publish_seconds
+        self.running = False
+        self.thread = None
+
+        # Published state: replaced (status) or appended (equity) by the publisher only
+        self._status_body = _dumps({'running': False})
+        self._equity = deque(maxlen=EQUITY_POINTS)
+        self._equity_seq = 0
+
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.server_thread = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.bot.start()
+        self._publish()
+        self.thread = threading.Thread(target=self._publish_loop, daemon=True, name="daemon-publish")
+        self.thread.start()
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="daemon-http")
+        self.server_thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"[Daemon] Serving status on http://{host}:{port}")
+
+    def stop(self):
+        self.running = False
+        self.bot.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        print("[Daemon] Stopped.")
+
+    # --- Publisher ---
+
+    def _publish(self):
+        bot = self.bot
+        session = bot.paper_session
+        status = bot.get_status()
+        status.update({
+            'symbol': bot.symbol,
+            'mode': 'live' if type(session).__name__ == 'LiveTradingSession' else 'paper',
+            'testnet': os.getenv('USE_TESTNET', 'True').lower() == 'true',
+            'initial_balance': session.initial_balance,
+            'win_rate': session.get_win_rate(),
+            'trade_count': len(session.journal),
+            'performance': session.performance.snapshot(),
+            'published_at': time.time(),
+        })
+
+        if status['running']:
+            self._equity_seq += 1
+            self._equity.append((self._equity_seq, status['published_at'], status['balance']))
+        self._status_body = _dumps(status)
+
+    def _publish_loop(self):
+        while self.running:
+            time.sleep(self.publish_seconds)
+            try:
+                self._publish()
+            except Exception as e:
+                print(f"[Daemon] Publish failed: {e}")
+
+    # --- Queries (HTTP handler threads; read-only) ---
+
+    def trades_since(self, since, limit=TRADES_PAGE):
+        trades, cursor = self.bot.paper_session.journal.page(after_id=since, limit=limit)
+        return {'next': cursor, 'trades': trades}
+
+    def last_trades(self, n):
+        trades = self.bot.paper_session.journal.recent(min(n, TRADES_PAGE))
+        return {'next': trades[-1]['id'] if trades else 0, 'trades': trades}
+
+    def equity_since(self, since):
+        points = [[ts, nw] for seq, ts, nw in list(self._equity) if seq > since]
+        return {'next': self._equity_seq, 'points': points}
+
+    def _make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                since = int(query.get('since', ['0'])[0])
+                content_type = 'application/json'
+                if url.path == '/status':
+                    body = daemon._status_body
+                elif url.path == '/trades' and 'last' in query:
+                    body = _dumps(daemon.last_trades(int(query['last'][0])))
+                elif url.path == '/trades':
+                    body = _dumps(daemon.trades_since(since))
+                elif url.path == '/equity':
+                    body = _dumps(daemon.equity_since(since))
+                elif url.path == '/metrics':
+                    body = REGISTRY.render().encode()
+                    content_type = 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # dashboards poll every second
+
+        return Handler
+
+
+class DaemonClient:
+    """Read-only client for the dashboards; keeps the trade/equity cursors between polls."""
+
+    def __init__(self, url=DAEMON_URL, timeout=2.0, max_trades=200):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.max_trades = max_trades
+        self.trades = []
+        self.equity = []
+        self._trades_next = None  # journal id cursor; None = start from the last max_trades
+        self._equity_next = 0
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def status(self):
+        return self._get('/status')
+
+    def poll(self, max_equity_points=None):
+        """Fetches only new trades and equity points and appends them to self.trades / self.equity."""
+        if self._trades_next is None:
+            trades = self._get(f'/trades?last={self.max_trades}')
+        else:
+            trades = self._get(f'/trades?since={self._trades_next}')
+        self.trades.extend(trades['trades'])
+        self._trades_next = max(trades['next'], self._trades_next or 0)
+        if len(self.trades) > self.max_trades:
+            del self.trades[:-self.max_trades]
+
+        equity = self._get(f'/equity?since={self._equity_next}')
+        if equity['next'] < self._equity_next:
+            # Daemon restarted: its equity sequence starts over
+            self.equity, self._equity_next = [], 0
+            return self.poll(max_equity_points)
+        self.equity.extend(equity['points'])
+        self._equity_next = equity['next']
+        if max_equity_points and len(self.equity) > max_equity_points:
+            del self.equity[:-max_equity_points]
+        return self
+
+
+if __name__ == "__main__":
+    daemon = BotDaemon()
+    # run_bot.sh starts the daemon as a background job, where SIGINT is ignored;
+    # stop_bot.sh sends SIGTERM. Both just wake the main thread, which stops the bot.
+    stop_requested = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stop_requested.set())
+    daemon.start()
+    while not stop_requested.wait(1.0):
+        pass
+    daemon.stop()
@@ -0,0 +1,172 @@
+"""
+Gap detection and backfill for the market_data_1m history.
+
+    python -m src.data.backfill [--symbols BTC/USDT,ETH/USDT] [--days 365] [--dry-run]
+
+A scan reads only the stored timestamps of one symbol (one pass over the (symbol, timestamp)
+index) and diffs them against the minute grid. Missing minutes are coalesced into
+kline windows, downloaded in parallel with fetch_ohlcv windows, joined as-of with the
+funding rate and open interest history endpoints and written with idempotent upserts, so
+a scan can be repeated at any time. Order book imbalance has no history and stays empty.
+"""
+import os
+import time
+import argparse
+import datetime
+
+import numpy as np
+
+from src.data.fetcher import BinanceDataFetcher
+from src.data.processor import timeframe_to_ms
+from src.data.ratelimit import set_process_role
+from src.data.storage import MongoStorage
+
+MINUTE_MS = 60 * 1000
+KLINE_PAGE = 1500          # candles per klines request (Binance maximum)
+OI_HISTORY_DAYS = 30       # Binance serves open interest history for the last 30 days only
+OI_PERIOD = '5m'
+BACKFILL_DAYS = int(os.getenv('BACKFILL_DAYS', '365'))
+BACKFILL_RECENT_HOURS = int(os.getenv('BACKFILL_RECENT_HOURS', '24'))  # collector's periodic self-repair
+SETTLE_MINUTES = 2         # the newest minutes belong to the collector
+
+
+def find_gaps(timestamps, start, end, step=MINUTE_MS):
+    """
+    Missing [gap_start, gap_end) ranges of the grid start, start + step, ... < end,
+    given the stored timestamps (epoch ms, sorted; duplicates allowed).
+    """
+    ts = np.unique(timestamps[(timestamps >= start) & (timestamps < end)])
+    bounds = np.concatenate([[start - step], ts, [end]])
+    holes = np.nonzero(np.diff(bounds) > step)[0]
+    return [(int(bounds[i] + step), int(bounds[i + 1])) for i in holes]
+
+
+def plan_windows(gaps, page=KLINE_PAGE, step=MINUTE_MS):
+    """Coalesces gaps into [start, end) request windows of at most `page` candles."""
+    span = page * step
+    windows = []
+    for start, end in gaps:
+        while start < end:
+            if windows and start + step <= windows[-1][0] + span:
+                # Extend the previous window rather than spending a request on a short gap
+                w_start = windows[-1][0]
+                w_end = min(end, w_start + span)
+                windows[-1] = (w_start, w_end)
+            else:
+                w_end = min(end, start + span)
+                windows.append((start, w_end))
+            start = w_end
+    return windows
+
+
+def asof(times, source_times, source_values):
+    """source_values of the last source time <= each time (NaN before the first)."""
+    idx = np.searchsorted(source_times, times, side='right') - 1
+    out = np.full(len(times), np.nan)
+    valid = idx >= 0
+    out[valid] = source_values[idx[valid]]
+    return out
+
+
+def _or_none(x):
+    return None if x != x else float(x)
+
+
+class Backfiller:
+    def __init__(self, symbol='BTC/USDT', fetcher=None, storage=None, exchange=None):
+        self.symbol = symbol
+        self.fetcher = fetcher or BinanceDataFetcher(symbol=symbol, force_production=True, use_cache=False, exchange=exchange)
+        self.storage = storage or MongoStorage()
+
+    def _range(self, start=None, end=None, days=BACKFILL_DAYS):
+        now = self.fetcher.exchange.milliseconds()
+        if end is None:
+            end = (now // MINUTE_MS - SETTLE_MINUTES) * MINUTE_MS
+        if start is None:
+            start = end - days * 24 * 60 * MINUTE_MS
+        return int(start) // MINUTE_MS * MINUTE_MS, int(end) // MINUTE_MS * MINUTE_MS
+
+    def scan(self, start=None, end=None, days=BACKFILL_DAYS):
+        """Gaps of the stored history in [start, end) (epoch ms): ([(gap_start, gap_end)], stats)."""
+        start, end = self._range(start, end, days)
+        stored = self.storage.minute_timestamps(self.symbol, _to_datetime(start), _to_datetime(end))
+        gaps = find_gaps(stored, start, end)
+        stats = {
+            'stored': len(stored),
+            'duplicates': int(len(stored) - len(np.unique(stored))),
+            'gaps': len(gaps),
+            'missing': sum((b - a) // MINUTE_MS for a, b in gaps),
+        }
+        return gaps, stats
+
+    def run(self, start=None, end=None, days=BACKFILL_DAYS, dry_run=False):
+        """Scans [start, end) and fills every missing minute the exchange still has. Returns a summary."""
+        t0 = time.time()
+        gaps, stats = self.scan(start, end, days)
+        if not gaps or dry_run:
+            stats['written'] = 0
+            print(f"[Backfill] {self.symbol}: {stats['missing']} missing minutes in {stats['gaps']} gaps"
+                  f"{' (dry run)' if dry_run and gaps else ''}")
+            return stats
+
+        windows = plan_windows(gaps)
+        ohlcv = np.array(self.fetcher.fetch_ohlcv_windows('1m', windows, KLINE_PAGE), dtype=np.float64).reshape(-1, 6)
+        times = ohlcv[:, 0].astype(np.int64)
+        missing = np.zeros(len(times), dtype=bool)
+        for a, b in gaps:
+            missing |= (times >= a) & (times < b)
+        ohlcv, times = ohlcv[missing], times[missing]
+
+        first, last = gaps[0][0], gaps[-1][1]
+        funding = np.full(len(times), np.nan)
+        open_interest = np.full(len(times), np.nan)
+        if len(times):
+            # The funding in force at a minute is the last one settled before it (8 h cadence)
+            f_times, f_rates = self.fetcher.fetch_funding_history(first - 8 * 60 * MINUTE_MS, last)
+            funding = asof(times, f_times, f_rates)
+            oi_floor = self.fetcher.exchange.milliseconds() - OI_HISTORY_DAYS * 24 * 60 * MINUTE_MS
+            oi_since = max(first - timeframe_to_ms(OI_PERIOD), oi_floor)
+            if oi_since < last:
+                o_times, o_values = self.fetcher.fetch_open_interest_history(oi_since, last, period=OI_PERIOD)
+                open_interest = asof(times, o_times, o_values)
+
+        collected_at = datetime.datetime.utcnow()
+        docs = [{
+            'timestamp': _to_datetime(ts),
+            'symbol': self.symbol,
+            'open': o, 'high': h, 'low': l, 'close': c, 'volume': v,
+            'funding_rate': _or_none(fr),
+            'open_interest': _or_none(oi),
+            'order_book_imbalance': None,
+            'collected_at': collected_at,
+            'backfilled': True,
+        } for ts, (_, o, h, l, c, v), fr, oi in zip(times.tolist(), ohlcv.tolist(), funding.tolist(), open_interest.tolist())]
+        failed = self.storage.upsert_market_data(docs)
+
+        stats.update({'requests': len(windows), 'fetched': len(docs), 'written': len(docs) - failed,
+                      'unavailable': stats['missing'] - len(docs), 'seconds': time.time() - t0})
+        print(f"[Backfill] {self.symbol}: filled {stats['written']}/{stats['missing']} missing minutes "
+              f"({stats['gaps']} gaps, {len(windows)} kline requests) in {stats['seconds']:.1f}s")
+        return stats
+
+
+def _to_datetime(ms):
+    # Naive UTC, like the collector's timestamps
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=int(ms))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default=os.getenv('SYMBOLS', os.getenv('SYMBOL', 'BTC/USDT')))
+    parser.add_argument('--days', type=int, default=BACKFILL_DAYS)
+    parser.add_argument('--dry-run', action='store_true', help='only report the gaps')
+    args = parser.parse_args()
+
+    set_process_role('backfill')
+    storage = MongoStorage()
+    for symbol in [s.strip() for s in args.symbols.split(',') if s.strip()]:
+        Backfiller(symbol, storage=storage).run(days=args.days, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer assumed
+    fcntl = None
+
+CANDLE_CACHE_DIR = os.getenv('CANDLE_CACHE_DIR', 'data/cache')
+
+# One row per closed candle: timestamp (ms), open, high, low, close, volume
+ROW_WIDTH = 6
+ROW_DTYPE = np.dtype('<f8')
+
+
+class CandleCache:
+    """
+    Persistent, append-only OHLCV store keyed by (symbol, timeframe).
+    Each key is a flat little-endian float64 file of [timestamp, o, h, l, c, v] rows,
+    read back as a memory-mapped (n, 6) array so range reads only touch the pages needed.
+    Only closed candles belong here; the still-forming candle is always fetched live.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or CANDLE_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, symbol, timeframe):
+        key = symbol.replace('/', '').replace(':', '_')
+        return os.path.join(self.cache_dir, f"{key}_{timeframe}.f8")
+
+    def _lock(self, symbol, timeframe):
+        # Train, retrain and the bot may update the same key concurrently
+        handle = open(self.path(symbol, timeframe) + '.lock', 'w')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def load(self, symbol, timeframe):
+        """Returns all cached rows as a read-only (n, 6) memmap (empty array if nothing cached)."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return np.empty((0, ROW_WIDTH), dtype=ROW_DTYPE)
+        n = os.path.getsize(path) // (ROW_WIDTH * ROW_DTYPE.itemsize)
+        if n == 0:
+            return np.empty((0, ROW_WIDTH), dtype=ROW_DTYPE)
+        return np.memmap(path, dtype=ROW_DTYPE, mode='r', shape=(n, ROW_WIDTH))
+
+    def read(self, symbol, timeframe, since=None, until=None):
+        """Cached rows with since <= timestamp < until."""
+        rows = self.load(symbol, timeframe)
+        ts = rows[:, 0]
+        lo = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        hi = len(rows) if until is None else int(np.searchsorted(ts, until, side='left'))
+        return np.array(rows[lo:hi])
+
+    def span(self, symbol, timeframe):
+        """(first_ts, last_ts) of the cached candles, or None."""
+        rows = self.load(symbol, timeframe)
+        if len(rows) == 0:
+            return None
+        return int(rows[0, 0]), int(rows[-1, 0])
+
+    def append(self, symbol, timeframe, rows):
+        """Appends closed candles newer than the last cached one. Returns the number written."""
+        rows = np.asarray(rows, dtype=ROW_DTYPE).reshape(-1, ROW_WIDTH)
+        with self._lock(symbol, timeframe):
+            # Span check and write under one lock, or two writers append the same candles
+            span = self.span(symbol, timeframe)
+            if span is not None:
+                rows = rows[rows[:, 0] > span[1]]
+            if len(rows) == 0:
+                return 0
+            with open(self.path(symbol, timeframe), 'ab') as f:
+                f.write(np.ascontiguousarray(rows).tobytes())
+        return len(rows)
+
+    def replace(self, symbol, timeframe, rows):
+        """Atomically rewrites the store for one key (used when extending history backwards)."""
+        rows = np.asarray(rows, dtype=ROW_DTYPE).reshape(-1, ROW_WIDTH)
+        path = self.path(symbol, timeframe)
+        tmp = path + '.tmp'
+        with self._lock(symbol, timeframe):
+            with open(tmp, 'wb') as f:
+                f.write(np.ascontiguousarray(rows).tobytes())
+            os.replace(tmp, path)
+        return len(rows)
@@ -1,76 +1,99 @@
 import time
-import threading
 import datetime
+import pandas as pd
 from src.data.fetcher import BinanceDataFetcher
 from src.data.storage import MongoStorage
+from src.data.scheduler import get_scheduler
+from src.data.backfill import Backfiller, BACKFILL_RECENT_HOURS
+
+COLLECT_PERIOD = 60  # one data point per closed 1m candle
+REPAIR_PERIOD = 3600  # hourly gap scan over the last BACKFILL_RECENT_HOURS
+REPAIR_OFFSET = 30    # seconds past the hour, away from the minute collection
 
 class DataCollector:
-    def __init__(self, symbol='BTC/USDT'):
+    def __init__(self, symbol='BTC/USDT', stream=None, exchange=None, scheduler=None):
         self.symbol = symbol
         # Use Production API for data collection even if trading on Testnet
-        self.fetcher = BinanceDataFetcher(symbol=symbol, use_keys=True, force_production=True)
+        self.fetcher = BinanceDataFetcher(symbol=symbol, use_keys=True, force_production=True, exchange=exchange)
         self.storage = MongoStorage()
+        # Optional MarketDataStream; REST is used whenever the stream is stale
+        self.stream = stream
+        # Shared clock-aligned scheduler: every collector in the process is one job on it
+        self.scheduler = scheduler or get_scheduler()
+        self.job = None
+        self.repair_job = None
         self.running = False
-        self.thread = None
 
     def start(self):
         if self.running: return
         self.running = True
-        self.thread = threading.Thread(target=self._run_loop, daemon=True)
-        self.thread.start()
+        self.job = self.scheduler.add_job(f"collect {self.symbol}", self.collect, period=COLLECT_PERIOD)
+        self.repair_job = self.scheduler.add_job(f"repair {self.symbol}", self.repair, period=REPAIR_PERIOD, offset=REPAIR_OFFSET)
         print(f"[Collector] Started data collection for {self.symbol}")
 
     def stop(self):
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=2.0)
+        for job in (self.job, self.repair_job):
+            if job:
+                self.scheduler.remove_job(job)
+        self.job = self.repair_job = None
         print("[Collector] Stopped data collection")
 
-    def _run_loop(self):
-        while self.running:
-            try:
-                # 1. Fetch Data
-                # Get latest 1m candle
-                df_1m = self.fetcher.fetch_ohlcv(timeframe='1m', limit=2) # Get last 2 to ensure we have the closed one or latest
-                if df_1m.empty:
-                    time.sleep(10)
-                    continue
+    def collect(self, boundary):
+        """
+        Stores the 1m candle that closed at `boundary` (epoch seconds) with the current
+        funding rate, open interest and order book features. REST requests go out concurrently.
+        """
+        closed_at = pd.Timestamp(int(boundary - COLLECT_PERIOD) * 1000, unit='ms')
+        use_stream = self.stream is not None and self.stream.is_fresh()
 
-                latest_candle = df_1m.iloc[-1]
-                timestamp = latest_candle.name.to_pydatetime()
-                
-                # Fetch Advanced Data
-                funding_rate = self.fetcher.fetch_funding_rate()
+        # Open interest has no websocket stream
+        if use_stream:
+            df_1m = self.stream.get_ohlcv('1m', limit=3)
+            funding_rate = self.stream.get_funding_rate()
+            book = self.stream.get_book_features()
+            if book is None:
+                # Local book still waiting for its snapshot
+                open_interest, book = self.scheduler.gather(
+                    self.fetcher.fetch_open_interest, self.fetcher.fetch_order_book_features)
+            else:
                 open_interest = self.fetcher.fetch_open_interest()
-                imbalance = self.fetcher.fetch_order_book_imbalance()
-
-                # 2. Construct Data Point
-                data_point = {
-                    'timestamp': timestamp,
-                    'symbol': self.symbol,
-                    'open': float(latest_candle['open']),
-                    'high': float(latest_candle['high']),
-                    'low': float(latest_candle['low']),
-                    'close': float(latest_candle['close']),
-                    'volume': float(latest_candle['volume']),
-                    'funding_rate': float(funding_rate),
-                    'open_interest': float(open_interest),
-                    'order_book_imbalance': float(imbalance),
-                    'collected_at': datetime.datetime.utcnow()
-                }
+        else:
+            df_1m, funding_rate, open_interest, book = self.scheduler.gather(
+                lambda: self.fetcher.fetch_ohlcv(timeframe='1m', limit=3),
+                self.fetcher.fetch_funding_rate,
+                self.fetcher.fetch_open_interest,
+                self.fetcher.fetch_order_book_features)
 
-                # 3. Save to Storage
-                self.storage.save_market_data(data_point)
-                
-                # print(f"[Collector] Saved data: {data_point['close']} | FR: {funding_rate} | OI: {open_interest}")
+        if closed_at not in df_1m.index:
+            print(f"[Collector] {self.symbol}: candle {closed_at} not available yet, skipped")
+            return
+        candle = df_1m.loc[closed_at]
 
-                # Wait for next minute (align to minute boundary roughly)
-                # Simple sleep 60s for now, can be improved to sync with clock
-                time.sleep(60)
+        data_point = {
+            'timestamp': closed_at.to_pydatetime(),
+            'symbol': self.symbol,
+            'open': float(candle['open']),
+            'high': float(candle['high']),
+            'low': float(candle['low']),
+            'close': float(candle['close']),
+            'volume': float(candle['volume']),
+            'funding_rate': float(funding_rate),
+            'open_interest': float(open_interest),
+            'order_book_imbalance': float(book['book_imbalance_20']) if book else 0.0,
+            'order_book': book,
+            'collected_at': datetime.datetime.utcnow()
+        }
+        self.storage.save_market_data(data_point)
 
-            except Exception as e:
-                print(f"[Collector] Error: {e}")
-                time.sleep(10)
+    def repair(self, boundary):
+        """Backfills minutes missed in the last BACKFILL_RECENT_HOURS (errors, restarts)."""
+        if self.storage.collection is None:
+            # Nothing stored to scan (no MONGODB_URI, or Mongo unreachable): don't download a day for nothing
+            return
+        end = int(boundary * 1000)
+        Backfiller(self.symbol, fetcher=self.fetcher, storage=self.storage).run(
+            start=end - BACKFILL_RECENT_HOURS * 3600 * 1000)
 
 if __name__ == "__main__":
     collector = DataCollector()
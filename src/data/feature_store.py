@@ -0,0 +1,239 @@
+"""
+Persistent store of merged multi-timeframe features.
+
+Keyed by symbol, base timeframe + secondary timeframes and a hash of the feature
+pipeline source (and CLOSE_TIME_ALIGNMENT), so any change to src/data/processor.py or
+the alignment setting starts a fresh store instead of mixing feature definitions.
+Each column is a flat float64 file read back as a memmap; meta.json records the row
+count and covered range. New candles are appended by recomputing only a warm-up
+overlap before the last stored row.
+"""
+import os
+import json
+import time
+import hashlib
+import inspect
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+from src.data.processor import DataProcessor, timeframe_to_ms, CLOSE_TIME_ALIGNMENT
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer assumed
+    fcntl = None
+
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', 'data/features')
+
+# EWM-based indicators (RSI, MACD) have infinite memory; after this many bars of overlap
+# the recomputed values agree with a full-history computation to float64 precision.
+WARMUP_BARS = 500
+
+COLUMN_DTYPE = np.dtype('<f8')
+TIMESTAMP_DTYPE = np.dtype('<i8')
+
+
+def _pipeline_version():
+    try:
+        ta_version = metadata.version('ta')
+    except metadata.PackageNotFoundError:
+        ta_version = 'unknown'
+    source = inspect.getsource(inspect.getmodule(DataProcessor)) + inspect.getsource(compute_features) + ta_version
+    source += f"close_aligned={CLOSE_TIME_ALIGNMENT}"
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+def compute_features(frames, base_timeframe):
+    """
+    The shared feature pipeline: add_technical_indicators -> normalize_features ->
+    merge_timeframes. frames: {timeframe: OHLCV DataFrame}, including the base timeframe.
+    """
+    others = {tf: df for tf, df in frames.items() if tf != base_timeframe}
+    processor = DataProcessor(frames[base_timeframe])
+    processor.add_technical_indicators()
+    df_base = processor.normalize_features()
+    return DataProcessor.merge_timeframes(df_base, others, base_timeframe=base_timeframe)
+
+
+class FeatureStore:
+    def __init__(self, symbol, base_timeframe, timeframes, store_dir=None):
+        self.symbol = symbol
+        self.base_timeframe = base_timeframe
+        self.timeframes = [tf for tf in timeframes if tf != base_timeframe]
+        self.version = PIPELINE_VERSION
+        key = symbol.replace('/', '').replace(':', '_')
+        name = f"{key}_{base_timeframe}_{'-'.join(self.timeframes)}_{self.version}"
+        self.path = os.path.join(store_dir or FEATURE_STORE_DIR, name)
+        os.makedirs(self.path, exist_ok=True)
+
+    # --- Layout ---
+
+    def _file(self, column):
+        return os.path.join(self.path, f"{column}.f8")
+
+    def meta(self):
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _lock(self):
+        handle = open(os.path.join(self.path, ".lock"), 'w')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def __len__(self):
+        meta = self.meta()
+        return meta['rows'] if meta else 0
+
+    def span(self):
+        """(since, last_ts) in ms: the candle start the store was built from and its last row, or None."""
+        meta = self.meta()
+        if not meta or meta['rows'] == 0:
+            return None
+        return meta['since'], meta['last_ts']
+
+    # --- Reads ---
+
+    def _map(self, column, rows, dtype=COLUMN_DTYPE, name=None):
+        # Bounded by meta's row count, so a concurrent append is never half-visible
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name or column), dtype=dtype, mode='r', shape=(rows,))
+
+    def timestamps(self):
+        return self._map(None, len(self), TIMESTAMP_DTYPE, name='timestamp')
+
+    def read(self, since=None, until=None, columns=None):
+        """Stored rows with since <= timestamp < until (ms) as a DataFrame indexed like merge_timeframes."""
+        meta = self.meta()
+        if not meta:
+            return pd.DataFrame()
+        rows = meta['rows']
+        ts = self._map(None, rows, TIMESTAMP_DTYPE, name='timestamp')
+        lo = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        hi = rows if until is None else int(np.searchsorted(ts, until, side='left'))
+        columns = columns or meta['columns']
+        data = {c: np.array(self._map(c, rows)[lo:hi]) for c in columns}
+        index = pd.to_datetime(np.array(ts[lo:hi]), unit='ms')
+        index.name = 'timestamp'
+        return pd.DataFrame(data, index=index)
+
+    def read_matrix(self, columns, since=None, until=None):
+        """float32 (n, len(columns)) matrix with NaN -> 0, ready for TradingEnv(features=...)."""
+        df = self.read(since=since, until=until, columns=list(columns) + ['close'])
+        features = np.ascontiguousarray(np.nan_to_num(df[list(columns)].to_numpy(dtype=np.float32)))
+        return features, df['close'].to_numpy(dtype=np.float64)
+
+    # --- Writes ---
+
+    @staticmethod
+    def _ts_ms(df):
+        return df.index.values.astype('datetime64[ms]').astype(np.int64)
+
+    def replace(self, df, since=None):
+        """Rewrites the store with df (a merged feature frame) built from candles since `since` (ms)."""
+        with self._lock():
+            return self._write_all(df, since)
+
+    def append(self, df):
+        """Appends rows newer than the last stored one. Returns the number written."""
+        with self._lock():
+            meta = self.meta()
+            if not meta or meta['rows'] == 0:
+                return self._write_all(df)
+            if list(df.columns) != meta['columns']:
+                raise ValueError("Feature columns differ from the store; rebuild it with replace()")
+            df = df[self._ts_ms(df) > meta['last_ts']]
+            if len(df) == 0:
+                return 0
+
+            ts = self._ts_ms(df)
+            rows = meta['rows']
+            for name, values, dtype in self._columns(df, ts):
+                with open(self._file(name), 'r+b') as f:
+                    # Drop any tail left by a writer that died before updating meta.json
+                    f.truncate(rows * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            self._write_meta(self._meta_for(meta['columns'], rows + len(df), meta['first_ts'], ts[-1],
+                                            meta['since']))
+            return len(df)
+
+    def _columns(self, df, ts):
+        yield 'timestamp', ts, TIMESTAMP_DTYPE
+        for c in df.columns:
+            yield c, df[c].to_numpy(), COLUMN_DTYPE
+
+    def _write_all(self, df, since=None):
+        if len(df) == 0:
+            return 0
+        ts = self._ts_ms(df)
+        # Readers only trust meta.json; mark the store empty while the files are rewritten
+        self._write_meta(self._meta_for(list(df.columns), 0, None, None))
+        for name, values, dtype in self._columns(df, ts):
+            with open(self._file(name), 'wb') as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self._write_meta(self._meta_for(list(df.columns), len(df), ts[0], ts[-1],
+                                        ts[0] if since is None else since))
+        return len(df)
+
+    def _meta_for(self, columns, rows, first_ts, last_ts, since=None):
+        return {
+            'symbol': self.symbol,
+            'base_timeframe': self.base_timeframe,
+            'timeframes': self.timeframes,
+            'version': self.version,
+            'columns': columns,
+            'rows': int(rows),
+            'first_ts': None if first_ts is None else int(first_ts),
+            'last_ts': None if last_ts is None else int(last_ts),
+            'since': None if since is None else int(since),
+            'updated_at': time.time(),
+        }
+
+    # --- Sync ---
+
+    def _closed(self, df, now_ms):
+        """Rows whose base and secondary candles have all closed (their features are final)."""
+        longest = max(timeframe_to_ms(tf) for tf in [self.base_timeframe] + self.timeframes)
+        return df[self._ts_ms(df) + longest <= now_ms]
+
+    def sync(self, fetcher, since):
+        """
+        Returns merged features from `since` (ms) to now. Stored rows are reused; only
+        candles after a warm-up overlap are fetched (from the candle cache where possible)
+        and run through the pipeline. Finalized new rows are persisted, the still-changing
+        tail is returned but not stored.
+        """
+        timeframes = [self.base_timeframe] + self.timeframes
+        now_ms = int(time.time() * 1000)
+        span = self.span()
+
+        if span is None or since < span[0]:
+            print(f"[FeatureStore] Building {os.path.basename(self.path)} from {pd.to_datetime(since, unit='ms')}")
+            merged = compute_features(fetcher.fetch_multi_timeframes(timeframes, since=since), self.base_timeframe)
+            self.replace(self._closed(merged, now_ms), since=since)
+            return merged[self._ts_ms(merged) >= since]
+
+        sinces = {tf: span[1] - WARMUP_BARS * timeframe_to_ms(tf) for tf in timeframes}
+        fresh = compute_features(fetcher.fetch_multi_timeframes(timeframes, since=sinces), self.base_timeframe)
+        fresh = fresh[self._ts_ms(fresh) > span[1]]
+        written = self.append(self._closed(fresh, now_ms))
+        stored = self.read(since=since)
+        tail = fresh[self._ts_ms(fresh) > self.span()[1]]
+        print(f"[FeatureStore] {len(stored)} rows from store ({written} newly appended), {len(tail)} unfinished")
+        return pd.concat([stored, tail[stored.columns]]) if len(tail) else stored
+
+
+PIPELINE_VERSION = _pipeline_version()
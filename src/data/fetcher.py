@@ -1,28 +1,54 @@
 import ccxt
 import pandas as pd
+import numpy as np
 import time
 from datetime import datetime
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from src.data.cache import CandleCache
+from src.data.processor import timeframe_to_ms
+from src.data.ratelimit import get_rate_limiter, kline_weight, depth_weight
+from src.metrics import instrumented_call
+from src.data.orderbook import book_features, SNAPSHOT_LIMIT
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Page windows of a history download are fetched concurrently on this pool.
+# Timeframes get their own short-lived pool so outer tasks never wait on a saturated inner one.
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+_page_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+# Guards load_markets() on ccxt instances that several fetchers share
+_markets_lock = threading.Lock()
+
+
+def create_public_exchange():
+    """Unauthenticated futures client; pass it to several fetchers to share markets and connections."""
+    exchange = ccxt.binance({
+        'enableRateLimit': True,
+        'options': {
+            'defaultType': 'future',
+        }
+    })
+    # Pacing is done by the process-wide weight budget instead of ccxt's per-instance sleep,
+    # so concurrent requests from all fetchers share one limit.
+    exchange.enableRateLimit = False
+    return exchange
+
 class BinanceDataFetcher:
-    def __init__(self, symbol='BTC/USDT', timeframe='15m', limit=1000, testnet=True, use_keys=True, force_production=False):
+    def __init__(self, symbol='BTC/USDT', timeframe='15m', limit=1000, testnet=True, use_keys=True, force_production=False, use_cache=True, exchange=None):
         load_dotenv()
-        
-        config = {
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'future',
-            }
-        }
 
         # Note: Do NOT include API keys for the data fetcher.
         # Demo Trading API keys only work on the demo endpoint,
         # not on production api.binance.com.
         # Public data (OHLCV, orderbook) doesn't need authentication.
         
-        self.exchange = ccxt.binance(config)
+        self.exchange = exchange if exchange is not None else create_public_exchange()
+        self.limiter = get_rate_limiter()
         
         # Note: Binance Futures Sandbox/Testnet is deprecated.
         # For public market data (OHLCV, orderbook), production API works fine.
@@ -33,45 +59,111 @@ class BinanceDataFetcher:
         self.timeframe = timeframe
         self.limit = limit
 
+        # Local store of closed candles; history requests (since=...) only hit the exchange for the missing tail
+        self.cache = CandleCache() if use_cache else None
+
     def fetch_ohlcv(self, timeframe=None, limit=None, since=None):
         """
         Fetches historical OHLCV data for a specific timeframe.
+        With `since`, closed candles are served from the local cache and only
+        the missing tail is requested from the exchange.
         """
         tf = timeframe or self.timeframe
         lim = limit or self.limit
         print(f"Fetching {self.symbol} {tf} data...")
         
-        all_ohlcv = []
         if since is None:
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, tf, limit=lim)
-            all_ohlcv.extend(ohlcv)
+            all_ohlcv = self._call('fetch_ohlcv', kline_weight(lim), self.symbol, tf, limit=lim)
+        elif self.cache is None:
+            all_ohlcv = self._fetch_since(tf, since, lim)
         else:
-            while True:
-                ohlcv = self.exchange.fetch_ohlcv(self.symbol, tf, since=since, limit=lim)
-                if not ohlcv: break
-                since = ohlcv[-1][0] + 1
-                all_ohlcv.extend(ohlcv)
-                if len(ohlcv) < lim: break
-                time.sleep(self.exchange.rateLimit / 1000)
-
-        df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            all_ohlcv = self._fetch_since_cached(tf, since, lim)
+
+        df = pd.DataFrame(all_ohlcv, columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
         df.set_index('timestamp', inplace=True)
         return df
 
-    def fetch_multi_timeframes(self, timeframes=['5m', '15m', '1h'], limit=1000):
+    def _call(self, method, weight, *args, **kwargs):
+        """Calls a ccxt method after taking its request weight from the shared budget (counted and timed)."""
+        if not self.exchange.markets:
+            with _markets_lock:
+                if not self.exchange.markets:
+                    instrumented_call(self.exchange, self.limiter, 'load_markets', 40)
+        return instrumented_call(self.exchange, self.limiter, method, weight, *args, **kwargs)
+
+    def _fetch_window(self, tf, start, end, lim):
+        ohlcv = self._call('fetch_ohlcv', kline_weight(lim), self.symbol, tf, since=start, limit=lim)
+        return [row for row in ohlcv if row[0] < end]
+
+    def _fetch_since(self, tf, since, lim):
         """
-        Fetches multiple timeframes and returns a dictionary of DataFrames.
+        Downloads everything from `since` up to the latest candle.
+        The range is split into independent windows of `lim` candles that are
+        fetched in parallel under the shared weight budget.
         """
-        data = {}
-        for tf in timeframes:
-            data[tf] = self.fetch_ohlcv(timeframe=tf, limit=limit)
-        return data
+        tf_ms = timeframe_to_ms(tf)
+        now = self.exchange.milliseconds()
+        span = lim * tf_ms
+        starts = list(range(int(since), int(now) + 1, span)) or [int(since)]
+        return self.fetch_ohlcv_windows(tf, [(start, start + span) for start in starts], lim)
+
+    def fetch_ohlcv_windows(self, tf, windows, lim):
+        """
+        Candles inside the [start, end) windows (each at most `lim` candles), fetched in
+        parallel under the shared weight budget; rows sorted by time without duplicates.
+        """
+        if len(windows) == 1:
+            chunks = [self._fetch_window(tf, windows[0][0], windows[0][1], lim)]
+        else:
+            futures = [_page_pool.submit(self._fetch_window, tf, start, end, lim) for start, end in windows]
+            chunks = [f.result() for f in futures]
+        
+        all_ohlcv = []
+        last_ts = None
+        for chunk in chunks:
+            for row in chunk:
+                if last_ts is None or row[0] > last_ts:
+                    all_ohlcv.append(row)
+                    last_ts = row[0]
+        return all_ohlcv
+
+    def _fetch_since_cached(self, tf, since, lim):
+        tf_ms = timeframe_to_ms(tf)
+        span = self.cache.span(self.symbol, tf)
+        
+        if span is None or since < span[0]:
+            # Nothing usable cached: download the whole range and (re)build the store
+            fresh = np.array(self._fetch_since(tf, since, lim), dtype=np.float64).reshape(-1, 6)
+            closed = fresh[fresh[:, 0] + tf_ms <= self.exchange.milliseconds()]
+            self.cache.replace(self.symbol, tf, closed)
+            return fresh
+        
+        # Only the tail after the last cached candle goes to the exchange
+        cached = self.cache.read(self.symbol, tf, since=since)
+        fresh = np.array(self._fetch_since(tf, span[1] + tf_ms, lim), dtype=np.float64).reshape(-1, 6)
+        fresh = fresh[fresh[:, 0] > span[1]]
+        closed = fresh[fresh[:, 0] + tf_ms <= self.exchange.milliseconds()]
+        self.cache.append(self.symbol, tf, closed)
+        print(f"[Cache] {self.symbol} {tf}: {len(cached)} cached + {len(fresh)} fetched")
+        combined = np.vstack([cached, fresh])
+        return combined[combined[:, 0] >= since]
+
+    def fetch_multi_timeframes(self, timeframes=['5m', '15m', '1h'], limit=1000, since=None):
+        """
+        Fetches multiple timeframes concurrently and returns a dictionary of DataFrames
+        (in the order requested). `limit` and `since` may be dicts of per-timeframe values.
+        """
+        limits = limit if isinstance(limit, dict) else {tf: limit for tf in timeframes}
+        sinces = since if isinstance(since, dict) else {tf: since for tf in timeframes}
+        with ThreadPoolExecutor(max_workers=len(timeframes) or 1, thread_name_prefix="fetch-tf") as pool:
+            futures = {tf: pool.submit(self.fetch_ohlcv, timeframe=tf, limit=limits[tf], since=sinces[tf]) for tf in timeframes}
+            return {tf: futures[tf].result() for tf in timeframes}
 
     def fetch_funding_rate(self):
         try:
             # fetchFundingRate is supported by ccxt for binance
-            funding = self.exchange.fetch_funding_rate(self.symbol)
+            funding = self._call('fetch_funding_rate', 1, self.symbol)
             return funding['fundingRate']
         except Exception as e:
             print(f"Error fetching funding rate: {e}")
@@ -80,30 +172,52 @@ class BinanceDataFetcher:
     def fetch_open_interest(self):
         try:
             # fetchOpenInterest is supported by ccxt for binance
-            oi = self.exchange.fetch_open_interest(self.symbol)
+            oi = self._call('fetch_open_interest', 1, self.symbol)
             return float(oi['openInterestAmount']) # Amount in base currency (BTC)
         except Exception as e:
             print(f"Error fetching open interest: {e}")
             return 0.0
 
-    def fetch_order_book_imbalance(self):
+    def fetch_funding_history(self, since, until, page=1000):
+        """Settled funding rates with since <= time < until (ms): (timestamps ms, rates) arrays."""
+        return self._fetch_history('fetch_funding_rate_history', since, until, page, 'fundingRate')
+
+    def fetch_open_interest_history(self, since, until, period='5m', page=500):
+        """Open interest (base currency) per `period` with since <= time < until (ms): (timestamps ms, amounts)."""
+        return self._fetch_history('fetch_open_interest_history', since, until, page, 'openInterestAmount', period)
+
+    def _fetch_history(self, method, since, until, page, field, *args):
+        # Pages forward from `since`; each page starts after the last entry received
+        timestamps, values = [], []
+        cursor = int(since)
+        while cursor < until:
+            rows = self._call(method, 1, self.symbol, *args, since=cursor, limit=page)
+            rows = [r for r in rows if cursor <= r['timestamp'] < until]
+            if not rows:
+                break
+            timestamps.extend(r['timestamp'] for r in rows)
+            values.extend(float(r[field]) if r.get(field) is not None else np.nan for r in rows)
+            cursor = rows[-1]['timestamp'] + 1
+        return np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float64)
+
+    def fetch_order_book_snapshot(self, limit=SNAPSHOT_LIMIT):
+        """REST depth snapshot for LocalOrderBook: (bids, asks, lastUpdateId)."""
+        orderbook = self._call('fetch_order_book', depth_weight(limit), self.symbol, limit=limit)
+        return orderbook['bids'], orderbook['asks'], orderbook['nonce']
+
+    def fetch_order_book_features(self):
+        """Order book features (see src/data/orderbook.py) of a top-20 REST snapshot, or None."""
         try:
-            # Fetch top 20 bids and asks
-            orderbook = self.exchange.fetch_order_book(self.symbol, limit=20)
-            bids = orderbook['bids']
-            asks = orderbook['asks']
-            
-            total_bid_qty = sum([b[1] for b in bids])
-            total_ask_qty = sum([a[1] for a in asks])
-            
-            if (total_bid_qty + total_ask_qty) == 0: return 0.0
-            
-            # Ratio: (Bid - Ask) / (Bid + Ask) -> Range [-1, 1]
-            imbalance = (total_bid_qty - total_ask_qty) / (total_bid_qty + total_ask_qty)
-            return imbalance
+            orderbook = self._call('fetch_order_book', depth_weight(20), self.symbol, limit=20)
+            return book_features(orderbook['bids'], orderbook['asks'])
         except Exception as e:
             print(f"Error fetching order book: {e}")
-            return 0.0
+            return None
+
+    def fetch_order_book_imbalance(self):
+        # Ratio: (Bid - Ask) / (Bid + Ask) over the top 20 levels -> Range [-1, 1]
+        features = self.fetch_order_book_features()
+        return features['book_imbalance_20'] if features else 0.0
 
 if __name__ == "__main__":
     fetcher = BinanceDataFetcher()
@@ -0,0 +1,350 @@
+import math
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from src.data.processor import timeframe_to_ms, CLOSE_TIME_ALIGNMENT
+
+# Column order of the per-timeframe feature block. These are exactly the columns
+# DataProcessor.add_technical_indicators() + normalize_features() produce
+# (secondary timeframes get a "_{tf}" suffix in merge_timeframes).
+FEATURE_COLUMNS = [
+    'rsi', 'macd', 'macd_signal', 'bb_high', 'bb_low', 'ema_20',
+    'close_pct', 'high_pct', 'low_pct', 'open_pct', 'log_volume', 'volume_pct', 'bb_position'
+]
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2
+EMA_WINDOW = 20
+
+NAN = float('nan')
+
+
+def _alpha_from_span(span):
+    # Same arithmetic as pandas ewm(span=...): span -> com -> alpha
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+def _alpha_from_alpha(alpha):
+    # pandas ewm(alpha=...) also round-trips through the center of mass
+    com = 1.0 / alpha - 1.0
+    return 1.0 / (1.0 + com)
+
+
+RSI_ALPHA = _alpha_from_alpha(1 / RSI_WINDOW)
+FAST_ALPHA = _alpha_from_span(MACD_FAST)
+SLOW_ALPHA = _alpha_from_span(MACD_SLOW)
+SIGN_ALPHA = _alpha_from_span(MACD_SIGN)
+EMA_ALPHA = _alpha_from_span(EMA_WINDOW)
+
+
+def _ewm(prev, value, alpha):
+    """One step of pandas' ewm(adjust=False).mean() recursion."""
+    if prev is None:
+        return value
+    if prev != value:
+        old_wt = 1.0 - alpha
+        return (old_wt * prev + alpha * value) / (old_wt + alpha)
+    return prev
+
+
+def _div(a, b):
+    """Float division with numpy semantics (x/0 -> +-inf, 0/0 -> nan)."""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.inf if a > 0 else -math.inf
+    return a / b
+
+
+class IndicatorState:
+    """
+    O(1) running state of the indicators for a single timeframe.
+    step() folds one bar in; with commit=False the state is left untouched so the
+    still-forming candle can be re-evaluated every time it updates.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.prev_bar = None  # (open, high, low, close, log_volume) of the last closed bar
+        self.rsi_up = None
+        self.rsi_down = None
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_20 = None
+        self.signal = None
+        self.macd_count = 0
+        # Bollinger: rolling mean / sum of squared deviations (Welford add/remove)
+        self.window = deque()
+        self.bb_mean = 0.0
+        self.bb_ssqdm = 0.0
+        self.same_run = 0
+
+    def step(self, o, h, l, c, v, commit=True):
+        count = self.count + 1
+        log_volume = math.log1p(v)
+        prev = self.prev_bar
+
+        # RSI (Wilder smoothing). The first diff is NaN, which ta maps to 0 up/down.
+        diff = c - prev[3] if prev is not None else 0.0
+        rsi_up = _ewm(self.rsi_up, diff if diff > 0 else 0.0, RSI_ALPHA)
+        rsi_down = _ewm(self.rsi_down, -diff if diff < 0 else 0.0, RSI_ALPHA)
+        if count < RSI_WINDOW:
+            rsi = NAN
+        elif rsi_down == 0:
+            rsi = 1.0
+        else:
+            rsi = (100 - (100 / (1 + rsi_up / rsi_down))) / 100.0
+
+        # MACD / EMA
+        ema_fast = _ewm(self.ema_fast, c, FAST_ALPHA)
+        ema_slow = _ewm(self.ema_slow, c, SLOW_ALPHA)
+        ema_20 = _ewm(self.ema_20, c, EMA_ALPHA)
+        signal = self.signal
+        macd_count = self.macd_count
+        if count >= MACD_SLOW:
+            macd = ema_fast - ema_slow
+            signal = _ewm(signal, macd, SIGN_ALPHA)
+            macd_count += 1
+        else:
+            macd = NAN
+        macd_signal = signal if macd_count >= MACD_SIGN else NAN
+        ema_out = ema_20 if count >= EMA_WINDOW else NAN
+
+        # Bollinger Bands (population std over the last BB_WINDOW closes)
+        mean, ssqdm, nobs = self.bb_mean, self.bb_ssqdm, len(self.window)
+        if nobs == BB_WINDOW:
+            old = self.window[0]
+            nobs -= 1
+            if nobs:
+                delta = old - mean
+                mean -= delta / nobs
+                ssqdm -= ((nobs + 1) * delta * delta) / nobs
+            else:
+                mean, ssqdm = 0.0, 0.0
+        nobs += 1
+        delta = c - mean
+        mean += delta / nobs
+        ssqdm += ((nobs - 1) * delta * delta) / nobs
+        same_run = self.same_run + 1 if self.window and self.window[-1] == c else 1
+        if same_run >= nobs:
+            # Constant window: pandas returns the value itself as the mean; the variance is
+            # exactly 0 instead of a rounding residual
+            mean, ssqdm = c, 0.0
+        if nobs >= BB_WINDOW:
+            std = math.sqrt(max(ssqdm, 0.0) / nobs)
+            bb_high = mean + BB_DEV * std
+            bb_low = mean - BB_DEV * std
+            # Flat window: mid-band, as in DataProcessor.normalize_features
+            bb_position = 0.5 if same_run >= nobs else _div(c - bb_low, bb_high - bb_low)
+        else:
+            bb_high = bb_low = bb_position = NAN
+
+        # pct_change features
+        if prev is not None:
+            close_pct = _div(c, prev[3]) - 1
+            high_pct = _div(h, prev[1]) - 1
+            low_pct = _div(l, prev[2]) - 1
+            open_pct = _div(o, prev[0]) - 1
+            volume_pct = _div(log_volume, prev[4]) - 1
+        else:
+            close_pct = high_pct = low_pct = open_pct = volume_pct = NAN
+
+        if commit:
+            self.count = count
+            self.prev_bar = (o, h, l, c, log_volume)
+            self.rsi_up, self.rsi_down = rsi_up, rsi_down
+            self.ema_fast, self.ema_slow, self.ema_20 = ema_fast, ema_slow, ema_20
+            self.signal, self.macd_count = signal, macd_count
+            if len(self.window) == BB_WINDOW:
+                self.window.popleft()
+            self.window.append(c)
+            self.bb_mean, self.bb_ssqdm = mean, ssqdm
+            self.same_run = same_run
+
+        return (rsi, macd, macd_signal, bb_high, bb_low, ema_out,
+                close_pct, high_pct, low_pct, open_pct, log_volume, volume_pct, bb_position)
+
+
+class _TimeframeBook:
+    def __init__(self, timeframe, history):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_to_ms(timeframe)
+        self.state = IndicatorState()
+        self.forming_ts = None
+        self.forming_bar = None
+        self.forming_close = NAN
+        # ts (ms) -> feature block, only for rows that survive dropna()
+        self.rows = OrderedDict()
+        self.history = history
+
+    def store(self, ts, feats):
+        if any(f != f for f in feats):
+            self.rows.pop(ts, None)
+            return
+        self.rows[ts] = np.array(feats)
+        self.rows.move_to_end(ts)
+        while len(self.rows) > self.history:
+            self.rows.popitem(last=False)
+
+
+class IncrementalFeatureEngine:
+    """
+    Stateful equivalent of the DataProcessor pipeline used for live inference:
+        add_technical_indicators() -> normalize_features() -> merge_timeframes()
+    Candles are pushed per timeframe (closed or still forming); each push costs O(1)
+    and the merged feature rows match the batch pipeline run over the same candles.
+
+    Secondary timeframes are aligned as merge_timeframes does with the same close_aligned,
+    resolved when rows are read, so push order does not matter.
+    """
+
+    def __init__(self, base_timeframe='5m', timeframes=('15m', '1h', '1m'), lookback=50,
+                 close_aligned=CLOSE_TIME_ALIGNMENT):
+        self.base_timeframe = base_timeframe
+        self.close_aligned = close_aligned
+        self.timeframes = [tf for tf in timeframes if tf != base_timeframe]
+        self.lookback = lookback
+        base_ms = self.base_ms = timeframe_to_ms(base_timeframe)
+        self.books = {base_timeframe: _TimeframeBook(base_timeframe, lookback + 16)}
+        for tf in self.timeframes:
+            history = (lookback * base_ms) // timeframe_to_ms(tf) + 64
+            self.books[tf] = _TimeframeBook(tf, history)
+        # Closed, valid base rows: (ts, feature block, close)
+        self.base_rows = deque(maxlen=lookback + 16)
+        self._column_cache = {}
+
+    def reset(self, timeframe):
+        book = self.books[timeframe]
+        self.books[timeframe] = _TimeframeBook(timeframe, book.history)
+        if timeframe == self.base_timeframe:
+            self.base_rows.clear()
+
+    def seed(self, timeframe, df):
+        """Rebuilds the state of one timeframe from a fetch_ohlcv() DataFrame."""
+        self.reset(timeframe)
+        self.update(timeframe, df)
+
+    def update(self, timeframe, df):
+        """Applies candles (closed or forming, possibly already seen) from a fetch_ohlcv() DataFrame."""
+        if df is None or df.empty:
+            return
+        ts_ms = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+        for ts, (o, h, l, c, v) in zip(ts_ms.tolist(), values.tolist()):
+            self.update_candle(timeframe, ts, o, h, l, c, v)
+
+    def update_candle(self, timeframe, ts, o, h, l, c, v):
+        book = self.books[timeframe]
+        if book.forming_ts is not None:
+            if ts < book.forming_ts:
+                return  # Already folded into the running state
+            if ts > book.forming_ts:
+                # The previous candle has closed: fold it into the running state
+                feats = book.state.step(*book.forming_bar, commit=True)
+                book.store(book.forming_ts, feats)
+                if timeframe == self.base_timeframe and book.forming_ts in book.rows:
+                    self.base_rows.append((book.forming_ts, book.rows[book.forming_ts], book.forming_bar[3]))
+        book.forming_ts = ts
+        book.forming_bar = (o, h, l, c, v)
+        book.forming_close = c
+        book.store(ts, book.state.step(o, h, l, c, v, commit=False))
+
+    def last_timestamp(self, timeframe):
+        return self.books[timeframe].forming_ts
+
+    def bars_behind(self, timeframe, now_ms):
+        """Number of bars opened since the last candle seen for this timeframe (None if never seeded)."""
+        book = self.books[timeframe]
+        if book.forming_ts is None:
+            return None
+        return max(0, (now_ms // book.tf_ms * book.tf_ms - book.forming_ts) // book.tf_ms)
+
+    def latest_close(self):
+        return self.books[self.base_timeframe].forming_close
+
+    def _merged_rows(self, limit=None):
+        base = self.books[self.base_timeframe]
+        rows = list(self.base_rows)
+        if base.forming_ts is not None and base.forming_ts in base.rows:
+            rows.append((base.forming_ts, base.rows[base.forming_ts], base.forming_close))
+        if limit is not None:
+            rows = rows[-limit:]
+        if not rows:
+            return []
+
+        # As-of join: per secondary tf, the last stored (valid) bar closed by each base bar's
+        # close, or opened by its open for the legacy alignment (forming bars included)
+        base_key = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        if self.close_aligned:
+            base_key += self.base_ms
+        sources = []
+        for tf in self.timeframes:
+            book = self.books[tf]
+            if not book.rows:
+                return []
+            keys = np.fromiter(book.rows.keys(), dtype=np.int64, count=len(book.rows))
+            source_key = keys + book.tf_ms if self.close_aligned else keys
+            idx = np.searchsorted(source_key, base_key, side='right') - 1
+            sources.append(np.where(idx >= 0, keys[np.maximum(idx, 0)], -1))
+
+        # Final dropna(): every secondary block must resolve. Sources only move
+        # forward in time, so the valid rows form a suffix.
+        start = max((int(np.sum(src < 0)) for src in sources), default=0)
+        return [row + (tuple(int(src[i]) for src in sources),) for i, row in enumerate(rows) if i >= start]
+
+    def _column_plan(self, columns):
+        # column name -> (block, position); block 0 is the base timeframe,
+        # 1..n the secondary timeframes and -1 the raw base close.
+        key = tuple(columns)
+        if key not in self._column_cache:
+            names = {c: (0, i) for i, c in enumerate(FEATURE_COLUMNS)}
+            for b, tf in enumerate(self.timeframes, start=1):
+                names.update({f"{c}_{tf}": (b, i) for i, c in enumerate(FEATURE_COLUMNS)})
+            names['close'] = (-1, 0)
+            plan = {}
+            for out, c in enumerate(columns):
+                block, pos = names[c]
+                plan.setdefault(block, ([], []))
+                plan[block][0].append(pos)
+                plan[block][1].append(out)
+            self._column_cache[key] = plan
+        return self._column_cache[key]
+
+    def feature_matrix(self, columns, lookback=None):
+        """
+        Returns the last `lookback` merged rows restricted to `columns` as a
+        (lookback, len(columns)) float64 array, or None if not enough valid rows.
+        """
+        lookback = lookback or self.lookback
+        rows = self._merged_rows(lookback)
+        if len(rows) < lookback:
+            return None
+        out = np.empty((lookback, len(columns)))
+        for block, (pos, dest) in self._column_plan(columns).items():
+            if block == -1:
+                out[:, dest[0]] = [r[2] for r in rows]
+                continue
+            if block == 0:
+                data = np.stack([r[1] for r in rows])
+            else:
+                tf_rows = self.books[self.timeframes[block - 1]].rows
+                data = np.stack([tf_rows[r[3][block - 1]] for r in rows])
+            out[:, dest] = data[:, pos]
+        return out
+
+    def frame(self):
+        """All retained merged rows as a DataFrame (same column names as merge_timeframes)."""
+        rows = self._merged_rows()
+        columns = list(FEATURE_COLUMNS)
+        for tf in self.timeframes:
+            columns += [f"{c}_{tf}" for c in FEATURE_COLUMNS]
+        columns.append('close')
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        index = pd.to_datetime([r[0] for r in rows], unit='ms')
+        index.name = 'timestamp'
+        return pd.DataFrame(self.feature_matrix(columns, len(rows)), index=index, columns=columns)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import datetime
+
+JOURNAL_SYNC = os.getenv('JOURNAL_SYNC', 'NORMAL').upper()  # NORMAL: fsync at WAL checkpoints; FULL: every trade
+
+TRADE_FIELDS = ['type', 'price', 'amount', 'realized_pnl', 'unrealized_pnl', 'fee', 'net_worth', 'leverage']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    timestamp TEXT,
+    type TEXT,
+    price REAL,
+    amount REAL,
+    realized_pnl REAL,
+    unrealized_pnl REAL,
+    fee REAL,
+    net_worth REAL,
+    leverage REAL
+);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts);
+CREATE INDEX IF NOT EXISTS trades_type_ts ON trades (type, ts);
+CREATE TABLE IF NOT EXISTS migrations (
+    source TEXT PRIMARY KEY,
+    rows INTEGER,
+    ts REAL
+);
+"""
+
+
+def journal_path_for(history_file):
+    """paper_trades.json -> paper_trades.db (the JSON file is imported once, then kept as .migrated)."""
+    return os.path.splitext(history_file)[0] + ".db"
+
+
+class TradeJournal:
+    """
+    Append-only trade log in SQLite (WAL mode).
+    A fill is one small INSERT instead of rewriting the whole history; in WAL mode with
+    synchronous=NORMAL commits are not fsynced individually, SQLite syncs in batches at
+    checkpoints. Reads (dashboard, daemon request threads) share one reader connection behind
+    a lock, separate from the writer's, so they never block a fill.
+    Rows come back as the dicts the sessions used to keep in their history list, plus id and ts.
+    """
+
+    def __init__(self, path, migrate_from=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+        # ThreadingHTTPServer serves every request on a new thread: one shared connection
+        # instead of one per thread
+        self._reader = self._connect()
+        if migrate_from and os.path.exists(migrate_from):
+            self.import_json(migrate_from)
+
+        self._count = self._read("SELECT COUNT(*) FROM trades")[0][0]
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={JOURNAL_SYNC}")
+        return conn
+
+    def _read(self, sql, params=()):
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    # --- Writes ---
+
+    def record(self, trade):
+        """Appends one trade dict (keys as in TRADE_FIELDS, optional 'timestamp'/'ts'). Returns its id."""
+        ts = trade.get('ts') or time.time()
+        values = [trade.get(f) for f in TRADE_FIELDS]
+        with self._write_lock:
+            conn = self._writer
+            cur = conn.execute(
+                f"INSERT INTO trades (ts, timestamp, {', '.join(TRADE_FIELDS)}) VALUES (?, ?{', ?' * len(TRADE_FIELDS)})",
+                [ts, trade.get('timestamp') or time.strftime('%H:%M:%S', time.localtime(ts))] + values)
+            conn.commit()
+            self._count += 1
+        return cur.lastrowid
+
+    def import_json(self, json_path):
+        """
+        One-time migration of a paper/live_trades.json history list. Old entries only carry
+        HH:MM:SS, so dates are reconstructed backwards from the file's modification time.
+        The JSON file is renamed to *.migrated afterwards; the import is recorded in the same
+        transaction as the rows, so a crash before the rename doesn't import the file twice.
+        """
+        with open(json_path) as f:
+            history = json.load(f)
+        last = datetime.datetime.fromtimestamp(os.path.getmtime(json_path))
+        stamps = []
+        for trade in reversed(history):
+            try:
+                t = datetime.datetime.strptime(trade.get('timestamp', ''), '%H:%M:%S').time()
+                candidate = datetime.datetime.combine(last.date(), t)
+                if candidate > last:
+                    candidate -= datetime.timedelta(days=1)
+                last = candidate
+            except ValueError:
+                pass
+            stamps.append(last.timestamp())
+        stamps.reverse()
+
+        source = os.path.abspath(json_path)
+        with self._write_lock:
+            conn = self._writer
+            done = conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone()
+            if not done:
+                with conn:  # one transaction: the rows and the migration record
+                    conn.executemany(
+                        f"INSERT INTO trades (ts, timestamp, {', '.join(TRADE_FIELDS)}) VALUES (?, ?{', ?' * len(TRADE_FIELDS)})",
+                        [[ts, trade.get('timestamp')] + [trade.get(f) for f in TRADE_FIELDS] for ts, trade in zip(stamps, history)])
+                    conn.execute("INSERT INTO migrations (source, rows, ts) VALUES (?, ?, ?)",
+                                 (source, len(history), time.time()))
+                imported = len(history)
+            else:
+                imported = 0  # Imported before a crash; only the rename is missing
+        os.replace(json_path, json_path + ".migrated")
+        if done:
+            print(f"[Journal] {json_path} was already imported into {self.path}; renamed it")
+        else:
+            print(f"[Journal] Imported {imported} trades from {json_path} into {self.path}")
+        return imported
+
+    # --- Reads ---
+
+    def __len__(self):
+        return self._count
+
+    def totals(self):
+        """Fill aggregates in one pass (seeds PerformanceTracker at startup)."""
+        row = self._read(
+            "SELECT COUNT(*), COALESCE(SUM(realized_pnl > 0), 0), COALESCE(SUM(realized_pnl < 0), 0), "
+            "COALESCE(SUM(MAX(realized_pnl, 0)), 0), COALESCE(-SUM(MIN(realized_pnl, 0)), 0), "
+            "COALESCE(SUM(fee), 0), COALESCE(SUM(realized_pnl), 0) FROM trades")[0]
+        keys = ('trades', 'wins', 'losses', 'gross_profit', 'gross_loss', 'total_fees', 'realized_pnl')
+        return dict(zip(keys, row))
+
+    def query(self, since=None, until=None, type=None, after_id=0, limit=None, newest_first=False):
+        """Trades with since <= ts < until (epoch seconds), optionally of one type, as dicts."""
+        clauses, params = ["id > ?"], [after_id]
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if type is not None:
+            clauses.append("type = ?")
+            params.append(type)
+        sql = f"SELECT * FROM trades WHERE {' AND '.join(clauses)} ORDER BY id {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._read(sql, params)]
+
+    def page(self, after_id=0, limit=500):
+        """Next page of trades after a cursor: (trades, next_cursor)."""
+        trades = self.query(after_id=after_id, limit=limit)
+        return trades, (trades[-1]['id'] if trades else after_id)
+
+    def recent(self, n=100):
+        """The last n trades, oldest first."""
+        return self.query(limit=n, newest_first=True)[::-1]
+
+    def close(self):
+        with self._write_lock, self._read_lock:
+            self._writer.close()
+            self._reader.close()
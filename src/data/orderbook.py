@@ -0,0 +1,209 @@
+"""
+Local order book kept in sync from Binance Futures depth diffs, with microstructure features.
+
+Each side is a pair of parallel lists (price keys, quantities) kept sorted with bisect,
+best level last, so a diff is a binary search plus a short list shift near the top of
+the book. After every update the feature dict is rebuilt from the top 20 levels and
+swapped in whole; readers (collector, TradingBot) take it without locking.
+
+Sync follows the exchange's diff-depth rules: diffs are buffered until a REST snapshot
+(lastUpdateId) arrives, the first diff applied must straddle lastUpdateId, and every
+later diff's pu must equal the previous diff's u. A broken chain drops the book and asks
+for a new snapshot.
+"""
+import bisect
+import threading
+from collections import deque
+
+FEATURE_LEVELS = (5, 10, 20)  # imbalance depths
+DEPTH_MID_LEVELS = 10         # levels per side in the depth-weighted mid
+SNAPSHOT_LIMIT = 1000         # levels in the REST snapshot the book is initialized from
+MAX_BUFFERED = 1000           # diffs kept while waiting for a snapshot
+
+def _imbalance(bid_q, ask_q):
+    total = bid_q + ask_q
+    return (bid_q - ask_q) / total if total > 0 else 0.0
+
+
+def _features(bid_p, bid_q, ask_p, ask_q):
+    """Feature dict from best-first price/quantity lists of both sides (None if a side is empty)."""
+    if not bid_p or not ask_p:
+        return None
+    b1, a1, bq1, aq1 = bid_p[0], ask_p[0], bid_q[0], ask_q[0]
+    features = {f'book_imbalance_{n}': _imbalance(sum(bid_q[:n]), sum(ask_q[:n])) for n in FEATURE_LEVELS}
+
+    n = DEPTH_MID_LEVELS
+    bid_depth, ask_depth = sum(bid_q[:n]), sum(ask_q[:n])
+    bid_vwap = sum(p * q for p, q in zip(bid_p[:n], bid_q[:n])) / bid_depth if bid_depth > 0 else b1
+    ask_vwap = sum(p * q for p, q in zip(ask_p[:n], ask_q[:n])) / ask_depth if ask_depth > 0 else a1
+    features.update({
+        'mid': (b1 + a1) / 2,
+        'spread': a1 - b1,
+        # Leans towards the side with less size at the touch (the side more likely to be taken out)
+        'microprice': (b1 * aq1 + a1 * bq1) / (bq1 + aq1) if bq1 + aq1 > 0 else (b1 + a1) / 2,
+        'depth_weighted_mid': (bid_vwap + ask_vwap) / 2,
+    })
+    return features
+
+
+def book_features(bids, asks):
+    """Features of a best-first [[price, qty], ...] snapshot (e.g. a REST order book)."""
+    depth = max(FEATURE_LEVELS)
+    return _features([float(b[0]) for b in bids[:depth]], [float(b[1]) for b in bids[:depth]],
+                     [float(a[0]) for a in asks[:depth]], [float(a[1]) for a in asks[:depth]])
+
+
+class _BookSide:
+    """Price levels of one side. keys ascending with the best level last (bids: price, asks: -price)."""
+
+    def __init__(self, sign):
+        self.sign = sign
+        self.keys = []
+        self.qtys = []
+
+    def set(self, price, qty):
+        key = price * self.sign
+        keys = self.keys
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if qty == 0:
+                del keys[i]
+                del self.qtys[i]
+            else:
+                self.qtys[i] = qty
+        elif qty != 0:
+            keys.insert(i, key)
+            self.qtys.insert(i, qty)
+
+    def top(self, n):
+        """Best-first (prices, quantities) of the top n levels."""
+        start = max(len(self.keys) - n, 0)
+        keys = self.keys[start:][::-1]
+        if self.sign < 0:
+            keys = [-k for k in keys]
+        return keys, self.qtys[start:][::-1]
+
+    def trim(self, max_levels):
+        if len(self.keys) > max_levels:
+            del self.keys[:-max_levels]
+            del self.qtys[:-max_levels]
+
+
+class LocalOrderBook:
+    def __init__(self, max_levels=SNAPSHOT_LIMIT):
+        self.max_levels = max_levels
+        self.bids = _BookSide(1)
+        self.asks = _BookSide(-1)
+        self.last_update_id = None
+        self.synced = False
+        self._first_diff = False
+        self._buffer = deque(maxlen=MAX_BUFFERED)
+        self._lock = threading.Lock()
+
+        # Published state, replaced wholesale
+        self.features = None
+        self.updated = None  # exchange event time (ms) of the last update
+        self.updates = 0
+        self.resyncs = 0
+
+    @property
+    def needs_snapshot(self):
+        return not self.synced
+
+    # --- Updates ---
+
+    def load_snapshot(self, bids, asks, last_update_id):
+        """Initializes from a REST snapshot, then applies the diffs buffered meanwhile."""
+        with self._lock:
+            self._reset()
+            for price, qty in bids:
+                self.bids.set(float(price), float(qty))
+            for price, qty in asks:
+                self.asks.set(float(price), float(qty))
+            self.last_update_id = int(last_update_id)
+            self.synced = True
+            self._first_diff = True
+            buffered = list(self._buffer)
+            self._buffer.clear()
+            for i, event in enumerate(buffered):
+                self._apply(event)
+                if not self.synced:
+                    self._buffer.extend(buffered[i + 1:])
+                    break
+            if self.synced:
+                self._refresh(None)
+
+    def on_diff(self, event):
+        """Applies one depthUpdate diff (U, u, pu, b, a, E). Returns False if the book is not in sync."""
+        with self._lock:
+            if not self.synced:
+                self._buffer.append(event)
+                return False
+            if self._apply(event):
+                self._refresh(event.get('E'))
+            return self.synced
+
+    def replace(self, bids, asks, event_time=None):
+        """Replaces the whole book with a top-N snapshot (partial depth stream)."""
+        with self._lock:
+            self._reset()
+            for price, qty in bids:
+                self.bids.set(float(price), float(qty))
+            for price, qty in asks:
+                self.asks.set(float(price), float(qty))
+            self.synced = True
+            self._refresh(event_time)
+
+    def _apply(self, event):
+        u = int(event['u'])
+        if u < self.last_update_id:
+            return False  # Already contained in the snapshot
+        if self._first_diff:
+            in_sequence = int(event['U']) <= self.last_update_id <= u
+        else:
+            in_sequence = int(event.get('pu', -1)) == self.last_update_id
+        if not in_sequence:
+            self._desync()
+            # The next snapshot may predate this diff
+            self._buffer.append(event)
+            return False
+        self._first_diff = False
+        for price, qty in event.get('b', ()):
+            self.bids.set(float(price), float(qty))
+        for price, qty in event.get('a', ()):
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = u
+        if len(self.bids.keys) > 2 * self.max_levels or len(self.asks.keys) > 2 * self.max_levels:
+            self.bids.trim(self.max_levels)
+            self.asks.trim(self.max_levels)
+        return True
+
+    def _refresh(self, event_time):
+        depth = max(FEATURE_LEVELS)
+        bid_p, bid_q = self.bids.top(depth)
+        ask_p, ask_q = self.asks.top(depth)
+        self.features = _features(bid_p, bid_q, ask_p, ask_q)
+        self.updated = event_time
+        self.updates += 1
+
+    def _reset(self):
+        self.bids = _BookSide(1)
+        self.asks = _BookSide(-1)
+
+    def _desync(self):
+        self.synced = False
+        self.resyncs += 1
+        self._reset()
+        self.features = None
+        print(f"[OrderBook] Diff sequence broken after update {self.last_update_id}; waiting for a new snapshot")
+
+    # --- Reads ---
+
+    def top(self, n):
+        """Best-first {'bids': [[price, qty], ...], 'asks': [...], 'timestamp': ms} of the top n levels."""
+        with self._lock:
+            bid_p, bid_q = self.bids.top(n)
+            ask_p, ask_q = self.asks.top(n)
+            updated = self.updated
+        return {'bids': [list(l) for l in zip(bid_p, bid_q)], 'asks': [list(l) for l in zip(ask_p, ask_q)],
+                'timestamp': updated}
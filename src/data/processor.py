@@ -1,6 +1,28 @@
+import os
 import pandas as pd
 import ta
 import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TIMEFRAME_UNITS_MS = {'m': 60 * 1000, 'h': 60 * 60 * 1000, 'd': 24 * 60 * 60 * 1000}
+BB_WINDOW = 20
+
+# Join secondary timeframes on close times (only bars closed by the base bar's close) instead of
+# the legacy open-time join, which lets a still-forming 15m/1h bar into the row. This changes the
+# features, so it stays off until the policy has been retrained with it on.
+CLOSE_TIME_ALIGNMENT = os.getenv('CLOSE_TIME_ALIGNMENT', 'False').lower() == 'true'
+
+def timeframe_to_ms(timeframe):
+    """
+    Converts a ccxt timeframe string ('1m', '15m', '1h', '1d') to milliseconds.
+    """
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS_MS[timeframe[-1]]
+
+def _index_ms(df):
+    """Candle open times of a DataFrame's DatetimeIndex as int64 epoch milliseconds."""
+    return df.index.values.astype('datetime64[ms]').astype(np.int64)
 
 class DataProcessor:
     def __init__(self, dataframe):
@@ -19,7 +41,7 @@ class DataProcessor:
         self.df[f'macd_signal{suffix}'] = macd.macd_signal()
         
         # Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(self.df['close'], window=20, window_dev=2)
+        bollinger = ta.volatility.BollingerBands(self.df['close'], window=BB_WINDOW, window_dev=2)
         self.df[f'bb_high{suffix}'] = bollinger.bollinger_hband()
         self.df[f'bb_low{suffix}'] = bollinger.bollinger_lband()
         
@@ -61,6 +83,11 @@ class DataProcessor:
         # 0 = Lower Band, 0.5 = Mid, 1 = Upper Band
         bb_cols = [c for c in self.df.columns if 'bb_high' in c]
         suffixes = [c.replace('bb_high', '') for c in bb_cols]
+        # Flat window (every close equal): the band has no width and 0/0 would drop the row
+        # (or a rounding residual in the rolling std would decide it), so it counts as mid-band
+        if suffixes:
+            closes = self.df['close'].rolling(BB_WINDOW)
+            flat = closes.max() == closes.min()
         
         for s in suffixes:
             high = self.df[f'bb_high{s}']
@@ -70,79 +97,74 @@ class DataProcessor:
             # Calculate BB Position
             # For secondary TFs, 'close' might be the same column name but different data
             # normalize_features is called on the TF-specific dataframe in merge_timeframes
-            self.df[f'bb_position{s}'] = (close - low) / (high - low)
+            self.df[f'bb_position{s}'] = ((close - low) / (high - low)).mask(flat, 0.5)
                 
         # Drop NaN
         self.df.dropna(inplace=True)
         return self.df
 
     @staticmethod
-    def merge_timeframes(base_df, other_dfs_dict):
+    def timeframe_features(df_tf, tf):
         """
-        Merge different timeframes into a single base DataFrame.
-        other_dfs_dict: {'5m': df5, '1h': df1h}
+        Indicators + normalized features of one secondary timeframe, every column suffixed with _{tf}
+        (rsi_{tf}, macd_{tf}, bb_position_{tf}, close_pct_{tf}, volume_pct_{tf}, ...).
         """
-        final_df = base_df.copy()
-        for tf, df_tf in other_dfs_dict.items():
-            # 1. Add indicators to the other timeframe first
-            proc_tf = DataProcessor(df_tf)
-            df_tf_feat = proc_tf.add_technical_indicators(suffix=f"_{tf}")
-            
-            # 2. Normalize features (creates close_pct, bb_position_{tf}, etc.)
-            df_tf_feat = proc_tf.normalize_features()
-            
-            # 3. Rename generic normalized columns to include suffix
-            # normalize_features creates: close_pct, high_pct, low_pct, open_pct, volume_pct, log_volume
-            # It also scales rsi_{tf} (in place) and creates bb_position_{tf} (handled by loop above)
-            
-            rename_map = {
-                'close_pct': f'close_pct_{tf}',
-                'high_pct': f'high_pct_{tf}',
-                'low_pct': f'low_pct_{tf}',
-                'open_pct': f'open_pct_{tf}',
-                'volume_pct': f'volume_pct_{tf}',
-                'log_volume': f'log_volume_{tf}'
-            }
-            df_tf_feat.rename(columns=rename_map, inplace=True)
-            
-            # 4. Select features to merge
-            # We want all the new suffixed columns + the indicators that were already suffixed
-            # Indicators: rsi_{tf}, macd_{tf}, bb_position_{tf}
-            # Normalized: close_pct_{tf}, volume_pct_{tf}
-            
-            # Simply select all columns that end with _{tf}
-            features = [c for c in df_tf_feat.columns if c.endswith(f"_{tf}")]
-            
-            # Join and forward fill
-            final_df = final_df.join(df_tf_feat[features], how='left')
-            final_df.ffill(inplace=True)
-            
-        final_df.dropna(inplace=True)
-        return final_df
+        proc_tf = DataProcessor(df_tf)
+        proc_tf.add_technical_indicators(suffix=f"_{tf}")
+        df_tf_feat = proc_tf.normalize_features()
+
+        # normalize_features creates unsuffixed close_pct, high_pct, low_pct, open_pct, volume_pct, log_volume
+        rename_map = {c: f'{c}_{tf}' for c in ('close_pct', 'high_pct', 'low_pct', 'open_pct', 'volume_pct', 'log_volume')}
+        df_tf_feat = df_tf_feat.rename(columns=rename_map)
+        return df_tf_feat[[c for c in df_tf_feat.columns if c.endswith(f"_{tf}")]]
 
-    def combine_self_play_and_market_data(self, self_play_data):
+    @staticmethod
+    def align_asof(base_ms, source_ms, values, out):
         """
-        Combine self-play generated data with market data.
-        self_play_data: DataFrame containing self-play data.
+        As-of join over sorted int64 times (close times, or open times for the legacy alignment):
+        out[i] = values[j] for the last source row j with source_ms[j] <= base_ms[i], NaN where there is none.
         """
-        # Normalize self-play data
-        self_play_data = self_play_data.copy()
-        self_play_data['close_pct'] = self_play_data['close'].pct_change()
-        self_play_data['close_pct_1m'] = self_play_data['close_pct']  # Add close_pct_1m explicitly
-        self_play_data['log_volume'] = np.log1p(self_play_data['volume'])
-
-        # Add technical indicators to self-play data
-        self_play_data['rsi_1m'] = np.random.uniform(30, 70, size=len(self_play_data))
-        self_play_data['macd_1m'] = np.random.uniform(-2, 2, size=len(self_play_data))
-        self_play_data['bb_position_1m'] = np.random.uniform(0, 1, size=len(self_play_data))
-        self_play_data['volume_pct_1m'] = self_play_data['volume'] / self_play_data['volume'].max()
-
-        self_play_data.dropna(inplace=True)
-
-        # Combine with market data
-        combined_df = pd.concat([self.df, self_play_data], axis=0)
-        combined_df.sort_index(inplace=True)
-        return combined_df
+        idx = np.searchsorted(source_ms, base_ms, side='right') - 1
+        valid = idx >= 0
+        out[valid] = values[idx[valid]]
+        out[~valid] = np.nan
+        return out
+
+    @staticmethod
+    def merge_timeframes(base_df, other_dfs_dict, base_timeframe=None, close_aligned=None):
+        """
+        Merge different timeframes into a single base DataFrame.
+        other_dfs_dict: {'15m': df15, '1h': df1h}
+
+        Candles are indexed by open time. With close_aligned (default CLOSE_TIME_ALIGNMENT) a
+        base row gets, per secondary timeframe, the features of the last candle that had closed
+        by the time the base candle closed, so no row sees a bar that was still forming.
+        Otherwise it gets the last candle opened by the base candle's open (the legacy
+        join + ffill the current policy was trained on). base_timeframe is inferred from the
+        index spacing when not given. Secondary features are aligned into one float32 block.
+        """
+        if close_aligned is None:
+            close_aligned = CLOSE_TIME_ALIGNMENT
+        base_key = _index_ms(base_df)
+        if close_aligned:
+            if base_timeframe is not None:
+                base_key = base_key + timeframe_to_ms(base_timeframe)
+            elif len(base_key) > 1:
+                base_key = base_key + int(np.median(np.diff(base_key)))
+
+        features = {tf: DataProcessor.timeframe_features(df_tf, tf) for tf, df_tf in other_dfs_dict.items()}
+        columns = [c for feat in features.values() for c in feat.columns]
+        block = np.empty((len(base_df), len(columns)), dtype=np.float32)
+        col = 0
+        for tf, feat in features.items():
+            width = feat.shape[1]
+            source_key = _index_ms(feat) + (timeframe_to_ms(tf) if close_aligned else 0)
+            DataProcessor.align_asof(base_key, source_key, feat.to_numpy(dtype=np.float32), block[:, col:col + width])
+            col += width
+
+        final_df = pd.concat([base_df, pd.DataFrame(block, index=base_df.index, columns=columns)], axis=1)
+        final_df.dropna(inplace=True)
+        return final_df
 
 if __name__ == "__main__":
     # Test with dummy data or load from CSV if available
@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+
+# Binance USD-M futures allow 2400 request weight per minute per IP, shared by every
+# process on the host. The limiter is per process, so each process role gets an explicit
+# share of the IP budget. Keep the shares' sum <= 1 / (1 + BURST_FRACTION) so that even
+# with every bucket's burst spent in the same minute the IP stays under the limit.
+IP_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_IP_WEIGHT_PER_MINUTE', '2400'))
+WEIGHT_SHARES = os.getenv('BINANCE_WEIGHT_SHARES', 'bot:0.5,train:0.15,retrain:0.15,backfill:0.1')
+BURST_FRACTION = 0.1  # bucket capacity as a fraction of the per-minute budget
+MAX_REQUEST_WEIGHT = 20  # heaviest single request the fetchers make (1000-level depth)
+MAX_SHARE_SUM = 1.0 / (1.0 + BURST_FRACTION)  # ~0.91: sustained rate + every burst <= the IP limit
+
+_process_role = os.getenv('BINANCE_PROCESS_ROLE', 'bot')
+
+
+def weight_shares(spec=WEIGHT_SHARES):
+    """'role:share,...' -> {role: share}; the shares may not add up to more than MAX_SHARE_SUM."""
+    shares = {}
+    for item in spec.split(','):
+        if item.strip():
+            role, share = item.split(':')
+            shares[role.strip()] = float(share)
+    total = sum(shares.values())
+    if total > MAX_SHARE_SUM + 1e-9:
+        raise ValueError(f"BINANCE_WEIGHT_SHARES add up to {total:.2f} of the IP budget "
+                         f"(> {MAX_SHARE_SUM:.2f}, leaving no room for bursts)")
+    return shares
+
+
+def weight_per_minute(role):
+    shares = weight_shares()
+    if role not in shares:
+        raise ValueError(f"No request weight share for process role '{role}' in BINANCE_WEIGHT_SHARES")
+    return IP_WEIGHT_PER_MINUTE * shares[role]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket over request weight.
+    acquire() blocks until `weight` tokens are available; the bucket refills continuously
+    at weight_per_minute / 60 per second and holds at most a small burst.
+    """
+
+    def __init__(self, weight_per_minute, burst=None):
+        self.refill_per_sec = weight_per_minute / 60.0
+        if burst is None:
+            burst = max(weight_per_minute * BURST_FRACTION, MAX_REQUEST_WEIGHT)
+        self.capacity = float(burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def acquire(self, weight=1):
+        weight = min(float(weight), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.refill_per_sec
+            time.sleep(wait)
+
+
+def kline_weight(limit):
+    """Request weight of GET /fapi/v1/klines for a given limit."""
+    if limit < 100: return 1
+    if limit < 500: return 2
+    if limit <= 1000: return 5
+    return 10
+
+
+def depth_weight(limit):
+    """Request weight of GET /fapi/v1/depth for a given limit."""
+    if limit <= 50: return 2
+    if limit <= 100: return 5
+    if limit <= 500: return 10
+    return 20
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def set_process_role(role):
+    """Selects this process's share of BINANCE_WEIGHT_SHARES. Call before the first fetcher is built."""
+    global _process_role, _shared_limiter
+    weight_per_minute(role)  # validates the role
+    with _shared_lock:
+        if _shared_limiter is not None and role != _process_role:
+            print(f"[RateLimit] Role set to '{role}' after the limiter was created; keeping '{_process_role}'")
+            return
+        _process_role = role
+
+
+def get_rate_limiter():
+    """Process-wide limiter shared by every BinanceDataFetcher."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucket(weight_per_minute(_process_role))
+        return _shared_limiter
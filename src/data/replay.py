@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Binance Futures websocket endpoint.
+Replays recorded combined-stream messages (see MarketDataStream(record_path=...))
+so the streaming data layer can run offline:
+
+    python -m src.data.replay recording.jsonl --port 8765
+    BINANCE_STREAM_URL=ws://127.0.0.1:8765 python src/main.py
+"""
+import sys
+import json
+import asyncio
+import argparse
+import threading
+
+
+class ReplayServer:
+    def __init__(self, messages, host='127.0.0.1', port=8765, interval=0.0, loop_forever=False):
+        self.messages = [m if isinstance(m, str) else json.dumps(m) for m in messages]
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.loop_forever = loop_forever
+        self.thread = None
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls([line.strip() for line in f if line.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, *args):
+        while True:
+            for msg in self.messages:
+                await ws.send(msg)
+                await asyncio.sleep(self.interval)
+            if not self.loop_forever:
+                break
+        # Keep the connection open like the real endpoint until the client leaves
+        await ws.wait_closed()
+
+    async def serve(self):
+        import websockets
+
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            # Pick up the real port when started with port=0
+            self.port = list(server.sockets)[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def start(self):
+        """Serves on a background thread; returns once the socket is listening."""
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            self._loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self._ready.wait(timeout=5.0)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self.thread:
+            self.thread.join(timeout=2.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Binance stream messages")
+    parser.add_argument('path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=0.01)
+    parser.add_argument('--loop', action='store_true')
+    args = parser.parse_args()
+
+    server = ReplayServer.from_file(args.path, host=args.host, port=args.port,
+                                    interval=args.interval, loop_forever=args.loop)
+    print(f"[Replay] Serving {len(server.messages)} messages on {server.url}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,184 @@
+"""
+Clock-aligned job scheduler shared by the data collectors.
+
+One timer thread keeps a heap of jobs keyed by their next due time and wakes on exact
+period boundaries (epoch multiples of `period`) plus a settle offset, so candles that
+closed on the boundary are final on the exchange by the time a job runs. Jobs run on a
+shared worker pool; gather() fans a job's requests out on a separate I/O pool, so many
+symbols and jobs need neither a thread each nor a nested wait on the job pool.
+
+Per job, the delay between the scheduled time and the actual start (skew), the change
+of that delay from one run to the next (jitter) and the run time go to src/metrics.py.
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import REGISTRY, log_event
+
+SCHEDULER_OFFSET_SECONDS = float(os.getenv('SCHEDULER_OFFSET_SECONDS', '2.0'))
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '8'))
+SCHEDULER_IO_WORKERS = int(os.getenv('SCHEDULER_IO_WORKERS', '16'))
+
+
+def next_boundary(now, period, offset=0.0):
+    """First time > now that is a multiple of `period` (epoch seconds) plus `offset`."""
+    return ((now - offset) // period + 1) * period + offset
+
+
+class ScheduledJob:
+    def __init__(self, name, fn, period, offset):
+        self.name = name
+        self.fn = fn
+        self.period = period
+        self.offset = offset
+        self.due = next_boundary(time.time(), period, offset)
+        self.cancelled = False
+        self.running = False
+        self.runs = 0
+        self.missed = 0
+        self.last_skew = None
+        self.skew = REGISTRY.histogram('scheduler_skew_seconds', job=name)
+        self.jitter = REGISTRY.histogram('scheduler_jitter_seconds', job=name)
+        self.duration = REGISTRY.histogram('scheduler_run_seconds', job=name)
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'missed': self.missed,
+            'skew_p50': self.skew.percentile(50),
+            'skew_p99': self.skew.percentile(99),
+            'jitter_p50': self.jitter.percentile(50),
+            'jitter_p99': self.jitter.percentile(99),
+            'run_p50': self.duration.percentile(50),
+        }
+
+
+class MinuteScheduler:
+    def __init__(self, workers=SCHEDULER_WORKERS, io_workers=SCHEDULER_IO_WORKERS, offset=SCHEDULER_OFFSET_SECONDS):
+        self.offset = offset
+        self.jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sched-job")
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="sched-io")
+        self.running = False
+        self.thread = None
+
+    # --- Jobs ---
+
+    def add_job(self, name, fn, period=60, offset=None):
+        """
+        Runs fn(boundary) every `period` seconds, `offset` seconds after each boundary
+        (boundary = the period start in epoch seconds). Starts the scheduler if needed.
+        """
+        job = ScheduledJob(name, fn, period, self.offset if offset is None else offset)
+        with self._lock:
+            if name in self.jobs:
+                self.jobs[name].cancelled = True
+            self.jobs[name] = job
+            heapq.heappush(self._heap, (job.due, next(self._seq), job))
+        self.start()
+        self._wake.set()
+        return job
+
+    def remove_job(self, job):
+        with self._lock:
+            job.cancelled = True
+            if self.jobs.get(job.name) is job:
+                del self.jobs[job.name]
+
+    def gather(self, *calls):
+        """Runs the zero-argument callables concurrently on the I/O pool; results in order."""
+        futures = [self._io_pool.submit(call) for call in calls]
+        return [f.result() for f in futures]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return {job.name: job.stats() for job in jobs}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        with self._lock:
+            if self.running: return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="scheduler")
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+
+    # --- Timer thread ---
+
+    def _run_loop(self):
+        while self.running:
+            with self._lock:
+                head = self._heap[0] if self._heap else None
+            wait = head[0] - time.time() if head else 60.0
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+
+            with self._lock:
+                due, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+            self._dispatch(job, due)
+
+            # Next boundary after now; boundaries slept through count as missed
+            job.due = next_boundary(time.time(), job.period, job.offset)
+            job.missed += max(0, round((job.due - due) / job.period) - 1)
+            with self._lock:
+                if not job.cancelled:
+                    heapq.heappush(self._heap, (job.due, next(self._seq), job))
+
+    def _dispatch(self, job, due):
+        if job.running:
+            # The previous run is still going: skip this boundary rather than pile up
+            job.missed += 1
+            REGISTRY.counter('scheduler_missed_total', job=job.name).inc()
+            log_event('job_overrun', job=job.name, due=due)
+            return
+        job.running = True
+        self._pool.submit(self._execute, job, due)
+
+    def _execute(self, job, due):
+        start = time.time()
+        skew = start - due
+        job.skew.observe(skew)
+        if job.last_skew is not None:
+            job.jitter.observe(abs(skew - job.last_skew))
+        job.last_skew = skew
+        try:
+            job.fn(due - job.offset)
+        except Exception as e:
+            REGISTRY.counter('scheduler_errors_total', job=job.name).inc()
+            print(f"[Scheduler] {job.name} failed: {e}")
+        finally:
+            job.runs += 1
+            job.duration.observe(time.time() - start)
+            job.running = False
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by every DataCollector."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = MinuteScheduler()
+        return _shared_scheduler
@@ -1,9 +1,37 @@
 import os
+import queue
+import atexit
+import threading
+import time
 import pymongo
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import ConnectionFailure, PyMongoError, BulkWriteError, OperationFailure
+from bson import json_util
 from dotenv import load_dotenv
-import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    # Optional: decodes BSON straight into Arrow/NumPy columns
+    from pymongoarrow.api import find_numpy_all
+except ImportError:
+    find_numpy_all = None
+
+COLLECTION_NAME = "market_data_1m"
+TTL_SECONDS = 31536000  # Expire after 1 year
+MARKET_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'funding_rate', 'open_interest', 'order_book_imbalance']
+RANGE_BATCH_SIZE = 50000
+UPSERT_BATCH_SIZE = 5000
+
+# Write-behind pipeline settings
+WRITE_BATCH_SIZE = int(os.getenv('MONGO_WRITE_BATCH', '100'))
+WRITE_FLUSH_INTERVAL = float(os.getenv('MONGO_FLUSH_INTERVAL', '5'))  # seconds
+WRITE_QUEUE_SIZE = int(os.getenv('MONGO_WRITE_QUEUE', '10000'))
+ENQUEUE_TIMEOUT = 1.0  # seconds a producer may block on a full queue before spilling
+SPILL_PATH = os.getenv('MONGO_SPILL_PATH', 'data/mongo_spill.jsonl')
+REPLAY_PATH = SPILL_PATH + '.replay'      # spilled points being replayed (survives a crash mid-replay)
+REJECTED_PATH = SPILL_PATH + '.rejected'  # spilled points that can never be written (kept for inspection)
+DUPLICATE_KEY = 11000
 
 class MongoStorage:
     _instance = None
@@ -14,6 +42,11 @@ class MongoStorage:
             cls._instance.client = None
             cls._instance.db = None
             cls._instance.collection = None
+            cls._instance.is_timeseries = False
+            cls._instance._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            cls._instance._spill_lock = threading.Lock()
+            cls._instance._writer = None
+            cls._instance._writer_lock = threading.Lock()
             cls._instance._connect()
         return cls._instance
 
@@ -29,41 +62,385 @@ class MongoStorage:
             self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
             # Trigger a connection verification
             self.client.admin.command('ping')
-            
+
             self.db = self.client.get_database("binance_bot_db")
-            self.collection = self.db.get_collection("market_data_1m")
-            
-            # Create TTL Index (Expire after 1 year = 31536000 seconds)
-            self.collection.create_index("timestamp", expireAfterSeconds=31536000)
+            self.collection = self._ensure_collection()
             print("[Storage] Connected to MongoDB Atlas successfully.")
-            
+
         except ConnectionFailure as e:
             print(f"[Storage] Connection to MongoDB failed: {e}")
             self.client = None
 
+    def _ensure_collection(self):
+        """
+        market_data_1m is a time-series collection (timeField=timestamp, metaField=symbol)
+        with a (symbol, timestamp) index. Servers without time-series support, and
+        collections created before this layout, stay plain collections with a TTL index
+        and a unique (symbol, timestamp) index.
+        """
+        if COLLECTION_NAME not in self.db.list_collection_names():
+            try:
+                self.db.create_collection(
+                    COLLECTION_NAME,
+                    timeseries={'timeField': 'timestamp', 'metaField': 'symbol', 'granularity': 'minutes'},
+                    expireAfterSeconds=TTL_SECONDS,
+                )
+                print(f"[Storage] Created time-series collection {COLLECTION_NAME}")
+            except PyMongoError as e:
+                print(f"[Storage] Time-series collections unavailable ({e}). Using a plain collection.")
+
+        collection = self.db.get_collection(COLLECTION_NAME)
+        self.is_timeseries = self._is_timeseries(COLLECTION_NAME)
+        if not self.is_timeseries:
+            # Create TTL Index (Expire after 1 year = 31536000 seconds)
+            collection.create_index("timestamp", expireAfterSeconds=TTL_SECONDS)
+            print(f"[Storage] {COLLECTION_NAME} is a plain collection; run migrate_to_timeseries() to convert it.")
+            self._ensure_unique_key(collection)
+        else:
+            # Time-series collections don't support unique indexes; _absent() keeps inserts unique
+            collection.create_index([("symbol", pymongo.ASCENDING), ("timestamp", pymongo.ASCENDING)])
+        return collection
+
+    def _ensure_unique_key(self, collection):
+        """Unique (symbol, timestamp) index, so concurrent upserts of one point can't both insert."""
+        key = [("symbol", pymongo.ASCENDING), ("timestamp", pymongo.ASCENDING)]
+        existing = next((name for name, info in collection.index_information().items()
+                         if [(f, int(d)) for f, d in info['key']] == key), None)
+        if existing is not None:
+            if collection.index_information()[existing].get('unique'):
+                return
+            # Non-unique index from an older version: replace it
+            collection.drop_index(existing)
+        try:
+            collection.create_index(key, unique=True)
+            if existing is not None:
+                print(f"[Storage] (symbol, timestamp) index of {COLLECTION_NAME} is now unique")
+        except OperationFailure as e:
+            print(f"[Storage] {COLLECTION_NAME} holds duplicate points; keeping a non-unique index: {e}")
+            collection.create_index(key)
+
+    def _is_timeseries(self, name):
+        info = next(iter(self.db.list_collections(filter={'name': name})), None)
+        return info is not None and info.get('type') == 'timeseries'
+
+    def migrate_to_timeseries(self, batch_size=RANGE_BATCH_SIZE):
+        """
+        Copies a plain market_data_1m into a new time-series collection and swaps the names.
+        The old data is kept as market_data_1m_legacy.
+        """
+        if self.collection is None or self.is_timeseries:
+            return
+        self.flush()
+        tmp_name = COLLECTION_NAME + "_ts"
+        if tmp_name in self.db.list_collection_names():
+            self.db.drop_collection(tmp_name)
+        self.db.create_collection(
+            tmp_name,
+            timeseries={'timeField': 'timestamp', 'metaField': 'symbol', 'granularity': 'minutes'},
+            expireAfterSeconds=TTL_SECONDS,
+        )
+        target = self.db.get_collection(tmp_name)
+        batch, copied = [], 0
+        for doc in self.collection.find({}, {'_id': 0}).sort("timestamp", 1).batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                target.insert_many(batch, ordered=False)
+                copied += len(batch)
+                batch = []
+        if batch:
+            target.insert_many(batch, ordered=False)
+            copied += len(batch)
+        self.collection.rename(COLLECTION_NAME + "_legacy", dropTarget=True)
+        target.rename(COLLECTION_NAME)
+        self.collection = self._ensure_collection()
+        print(f"[Storage] Migrated {copied} points to time-series collection {COLLECTION_NAME}")
+
     def save_market_data(self, data: dict):
         """
-        Saves a single data point to MongoDB.
+        Queues a single data point for the background writer and returns immediately.
         data: dict containing timestamp, price, funding_rate, open_interest, order_book_imbalance, etc.
+        If the queue stays full (Mongo much slower than producers) the point goes to the spill journal.
         """
-        if self.collection is None:
-            # Try reconnecting if connection was lost or never established
-            self._connect()
-            if not self.collection:
+        self._ensure_writer()
+        try:
+            self._queue.put(data, timeout=ENQUEUE_TIMEOUT)
+        except queue.Full:
+            print("[Storage] Write queue full. Spilling to disk.")
+            self._spill([data])
+
+    def flush(self, timeout=30.0):
+        """Blocks until everything queued before this call has been written (or spilled)."""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flushes pending writes and stops the background writer."""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=30.0)
+        self._writer = None
+
+    # --- Background writer ---
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, daemon=True, name="mongo-writer")
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _writer_loop(self):
+        batch = []
+        deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False  # flush interval elapsed
+
+            if item is None or isinstance(item, threading.Event) or item is False:
+                if batch:
+                    self._write_batch(batch)
+                    batch = []
+                deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+                if item is None:
+                    return
+                if isinstance(item, threading.Event):
+                    item.set()
+                continue
+
+            batch.append(item)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+
+    def _write_batch(self, docs):
+        # Never let one batch kill the writer thread: whatever goes wrong, the batch is spilled
+        try:
+            if self.collection is None:
+                # Try reconnecting if connection was lost or never established
+                self._connect()
+                if self.collection is None:
+                    self._spill(docs)
+                    return
+
+            failed = self._upsert_many(docs)
+            if failed:
+                self._spill(failed)
                 return
+        except Exception as e:
+            print(f"[Storage] Writing a batch of {len(docs)} failed ({e!r}). Spilling to disk.")
+            self._spill(docs)
+            return
 
+        # The write went through, so Mongo is reachable: replay anything spilled while it wasn't
         try:
-            # Ensure timestamp is a datetime object for TTL to work
-            if 'timestamp' in data and not isinstance(data['timestamp'], datetime.datetime):
-                # If it's a timestamp string or int, convert it? 
-                # Usually we expect datetime object.
-                pass
-            
-            self.collection.insert_one(data)
-            # print(f"[Storage] Saved data for {data.get('timestamp')}")
+            self._replay_spill()
         except Exception as e:
-            print(f"[Storage] Error saving data: {e}")
+            print(f"[Storage] Spill replay failed: {e!r}")
+
+    def upsert_market_data(self, docs, batch_size=UPSERT_BATCH_SIZE):
+        """
+        Idempotent bulk write keyed on (symbol, timestamp), synchronously (backfills).
+        Returns the number of documents that could not be written.
+        """
+        if self.collection is None:
+            self._connect()
+            if self.collection is None:
+                return len(docs)
+        failed = 0
+        for i in range(0, len(docs), batch_size):
+            failed += len(self._upsert_many(docs[i:i + batch_size]))
+        return failed
+
+    def _upsert_many(self, docs):
+        """
+        Unordered bulk write keyed on (symbol, timestamp), so replays and refetched candles
+        never duplicate a point. Returns the documents that could not be written.
+        """
+        try:
+            if self.is_timeseries:
+                # Time-series collections can't upsert on measurement fields: insert only the points not stored yet
+                ops = self._absent(docs)
+                if ops:
+                    self.collection.insert_many(ops, ordered=False)
+            else:
+                ops = docs
+                self.collection.bulk_write(
+                    [UpdateOne({'symbol': d['symbol'], 'timestamp': d['timestamp']},
+                               {'$set': {k: v for k, v in d.items() if k != '_id'}}, upsert=True) for d in docs],
+                    ordered=False)
+            return []
+        except BulkWriteError as e:
+            # Duplicates are already stored; anything else gets retried later
+            errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY]
+            if errors:
+                print(f"[Storage] {len(errors)} of {len(ops)} writes failed: {errors[0].get('errmsg')}")
+            return [ops[err['index']] for err in errors]
+        except PyMongoError as e:
+            print(f"[Storage] Error saving batch of {len(docs)}: {e}")
+            return docs
+
+    def _absent(self, docs):
+        """The documents whose (symbol, timestamp) is not stored yet (and not repeated within docs)."""
+        by_symbol = {}
+        for d in docs:
+            by_symbol.setdefault(d['symbol'], []).append(d)
+        absent = []
+        for symbol, group in by_symbol.items():
+            query = {'symbol': symbol, 'timestamp': {'$in': [d['timestamp'] for d in group]}}
+            seen = {doc['timestamp'] for doc in self.collection.find(query, {'_id': 0, 'timestamp': 1})}
+            for d in group:
+                if d['timestamp'] not in seen:
+                    seen.add(d['timestamp'])
+                    absent.append(d)
+        return absent
+
+    # --- Spill journal ---
+
+    def _spill(self, docs):
+        with self._spill_lock:
+            try:
+                os.makedirs(os.path.dirname(SPILL_PATH) or '.', exist_ok=True)
+                with open(SPILL_PATH, 'a') as f:
+                    for doc in docs:
+                        doc.pop('_id', None)
+                        f.write(json_util.dumps(doc))
+                        f.write('\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                print(f"[Storage] Failed to spill {len(docs)} points: {e}")
+
+    def _replay_spill(self):
+        """
+        Writes spilled points back. New spills are appended to the replay file (never replacing
+        it), which is only removed once everything in it is written, so a crash mid-replay or a
+        replay file left by an earlier run just means it is read again (upserts are idempotent).
+        """
+        with self._spill_lock:
+            if os.path.exists(SPILL_PATH):
+                with open(SPILL_PATH) as src, open(REPLAY_PATH, 'a') as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(SPILL_PATH)
+        if not os.path.exists(REPLAY_PATH):
+            return
+
+        with open(REPLAY_PATH) as f:
+            lines = [line for line in f if line.strip()]
+        print(f"[Storage] Replaying {len(lines)} spilled points...")
+        written = 0
+        for i in range(0, len(lines), WRITE_BATCH_SIZE):
+            chunk = lines[i:i + WRITE_BATCH_SIZE]
+            try:
+                failed = self._upsert_many([json_util.loads(line) for line in chunk])
+            except Exception:
+                # Not a Mongo outage: one by one, setting aside the points that can never be written
+                failed, rejected = [], []
+                for line in chunk:
+                    try:
+                        failed.extend(self._upsert_many([json_util.loads(line)]))
+                    except Exception as e:
+                        print(f"[Storage] Spilled point cannot be written ({e!r}); moved to {REJECTED_PATH}")
+                        rejected.append(line)
+                if rejected:
+                    self._append_lines(REJECTED_PATH, rejected)
+            if failed:
+                # Mongo went away again: keep the unwritten rest for the next replay
+                remaining = [json_util.dumps(d) + '\n' for d in failed] + lines[i + WRITE_BATCH_SIZE:]
+                with self._spill_lock:
+                    tmp = REPLAY_PATH + '.tmp'
+                    with open(tmp, 'w') as out:
+                        out.writelines(remaining)
+                        out.flush()
+                        os.fsync(out.fileno())
+                    os.replace(tmp, REPLAY_PATH)
+                print(f"[Storage] Replayed {written} spilled points; {len(remaining)} left for later")
+                return
+            written += len(chunk)
+        os.remove(REPLAY_PATH)
 
-    def get_latest_data(self, limit=100):
+    def _append_lines(self, path, lines):
+        with open(path, 'a') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def get_latest_data(self, limit=100, symbol=None):
         if self.collection is None: return []
-        return list(self.collection.find().sort("timestamp", -1).limit(limit))
+        query = {'symbol': symbol} if symbol else {}
+        return list(self.collection.find(query).sort("timestamp", -1).limit(limit))
+
+    def minute_timestamps(self, symbol, start, end, batch_size=RANGE_BATCH_SIZE):
+        """
+        Stored timestamps in [start, end) for one symbol as a sorted int64 array of epoch ms.
+        Only the timestamp is projected, so this is a scan of the (symbol, timestamp) index.
+        """
+        if self.collection is None:
+            return np.array([], dtype=np.int64)
+        query = {'symbol': symbol, 'timestamp': {'$gte': start, '$lt': end}}
+        if find_numpy_all is not None:
+            data = find_numpy_all(self.collection, query, projection={'_id': 0, 'timestamp': 1}, sort=[("timestamp", 1)])
+            stamps = np.asarray(data['timestamp'], dtype='datetime64[ms]')
+        else:
+            cursor = self.collection.find(query, {'_id': 0, 'timestamp': 1}).sort("timestamp", 1).batch_size(batch_size)
+            stamps = np.array([doc['timestamp'] for doc in cursor], dtype='datetime64[ms]')
+        return stamps.astype(np.int64)
+
+    def iter_range(self, symbol, start, end, fields=None, batch_size=RANGE_BATCH_SIZE):
+        """
+        Streams [start, end) for one symbol in projected batches.
+        Yields (timestamps as datetime64[ms] array, {field: float64 array}) per batch.
+        """
+        if self.collection is None: return
+        fields = list(fields or MARKET_FIELDS)
+        query = {'symbol': symbol, 'timestamp': {'$gte': start, '$lt': end}}
+        projection = {'_id': 0, 'timestamp': 1, **{f: 1 for f in fields}}
+        cursor = self.collection.find(query, projection).sort("timestamp", 1).batch_size(batch_size)
+
+        timestamps = []
+        columns = {f: np.empty(batch_size, dtype=np.float64) for f in fields}
+        for doc in cursor:
+            i = len(timestamps)
+            timestamps.append(doc['timestamp'])
+            for f in fields:
+                v = doc.get(f)
+                columns[f][i] = np.nan if v is None else v
+            if len(timestamps) == batch_size:
+                yield np.array(timestamps, dtype='datetime64[ms]'), {f: col.copy() for f, col in columns.items()}
+                timestamps = []
+        if timestamps:
+            n = len(timestamps)
+            yield np.array(timestamps, dtype='datetime64[ms]'), {f: col[:n].copy() for f, col in columns.items()}
+
+    def get_range(self, symbol, start, end, fields=None, as_frame=True, batch_size=RANGE_BATCH_SIZE):
+        """
+        Loads [start, end) for one symbol as a DataFrame indexed by timestamp
+        (or a dict of NumPy arrays with as_frame=False). Uses pymongoarrow when installed.
+        """
+        fields = list(fields or MARKET_FIELDS)
+        if self.collection is None:
+            data = {'timestamp': np.array([], dtype='datetime64[ms]'), **{f: np.array([]) for f in fields}}
+        elif find_numpy_all is not None:
+            query = {'symbol': symbol, 'timestamp': {'$gte': start, '$lt': end}}
+            projection = {'_id': 0, 'timestamp': 1, **{f: 1 for f in fields}}
+            data = find_numpy_all(self.collection, query, projection=projection, sort=[("timestamp", 1)])
+        else:
+            chunks = list(self.iter_range(symbol, start, end, fields, batch_size))
+            data = {'timestamp': np.concatenate([c[0] for c in chunks]) if chunks else np.array([], dtype='datetime64[ms]')}
+            for f in fields:
+                data[f] = np.concatenate([c[1][f] for c in chunks]) if chunks else np.array([])
+
+        if not as_frame:
+            return data
+        df = pd.DataFrame({f: data[f] for f in fields}, index=pd.DatetimeIndex(data['timestamp'], name='timestamp'))
+        return df
@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.data.orderbook import LocalOrderBook, SNAPSHOT_LIMIT
+from src.data.processor import timeframe_to_ms
+
+STREAM_URL = os.getenv('BINANCE_STREAM_URL', 'wss://fstream.binance.com')
+STALE_AFTER = 30.0  # seconds without a message before readers fall back to REST
+SNAPSHOT_RETRY = 5.0  # minimum seconds between order book snapshot requests
+GAP_RETRY = 30.0  # seconds between attempts to backfill candles missed while disconnected
+
+
+class MarketDataStream:
+    """
+    Binance Futures market-data over websockets (kline, depth, markPrice/funding).
+    Runs an asyncio client on a background thread and keeps rolling candle buffers,
+    a LocalOrderBook and the funding rate in memory for DataCollector and TradingBot.
+    With a fetcher the book follows the diff depth stream from a REST snapshot; without
+    one it takes the top-N partial depth stream. Open interest still comes from REST.
+    """
+
+    def __init__(self, symbol='BTC/USDT', timeframes=('1m', '5m', '15m', '1h'), depth_levels=20,
+                 buffer_size=1000, url=None, fetcher=None, record_path=None):
+        self.symbol = symbol
+        self.stream_symbol = symbol.split(':')[0].replace('/', '').lower()
+        self.timeframes = list(timeframes)
+        self.depth_levels = depth_levels
+        self.buffer_size = buffer_size
+        self.url = url or STREAM_URL
+        self.fetcher = fetcher  # optional REST fetcher used to seed the candle buffers and the order book
+        self.record_path = record_path  # optional JSONL file of raw messages (for ReplayServer)
+
+        self._lock = threading.Lock()
+        self._candles = {tf: OrderedDict() for tf in self.timeframes}
+        self.order_book = LocalOrderBook()
+        self.diff_depth = fetcher is not None
+        self._snapshot_pending = False
+        self._snapshot_requested = 0.0
+        self._mark_price = 0.0
+        self._funding_rate = 0.0
+        self.last_message_time = 0.0
+        self.messages = 0
+        # Candles missed while disconnected; readers use REST until they are backfilled
+        self._gap = False
+        self._next_gap_fill = 0.0
+
+        self.running = False
+        self.thread = None
+        self._loop = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        if self.fetcher is not None:
+            self._seed_candles()
+        self.thread = threading.Thread(target=self._thread_main, daemon=True)
+        self.thread.start()
+        print(f"[Stream] Started market data stream for {self.symbol}")
+
+    def stop(self):
+        self.running = False
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: None)
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        print("[Stream] Stopped market data stream")
+
+    def _seed_candles(self):
+        for tf in self.timeframes:
+            try:
+                df = self.fetcher.fetch_ohlcv(timeframe=tf, limit=self.buffer_size)
+                self.load_candles(tf, df)
+            except Exception as e:
+                print(f"[Stream] Failed to seed {tf} candles: {e}")
+
+    def _fill_gap(self):
+        """Fetches every candle since the last buffered one (re-seeding after long outages)."""
+        try:
+            for tf in self.timeframes:
+                with self._lock:
+                    last_ts = next(reversed(self._candles[tf]), None)
+                behind = None if last_ts is None else (time.time() * 1000 - last_ts) / timeframe_to_ms(tf)
+                if behind is None or behind >= self.buffer_size:
+                    df = self.fetcher.fetch_ohlcv(timeframe=tf, limit=self.buffer_size)
+                else:
+                    # From the last buffered candle: it may have been left unfinished
+                    df = self.fetcher.fetch_ohlcv(timeframe=tf, since=last_ts, limit=min(self.buffer_size, 1000))
+                self.load_candles(tf, df)
+            self._gap = False
+            print("[Stream] Backfilled candles missed while disconnected")
+        except Exception as e:
+            self._next_gap_fill = time.time() + GAP_RETRY
+            print(f"[Stream] Failed to backfill candles after reconnect: {e}")
+
+    def load_candles(self, timeframe, df):
+        """Seeds a candle buffer from a fetch_ohlcv() DataFrame."""
+        ts_ms = df.index.values.astype('datetime64[ms]').astype('int64')
+        rows = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float).tolist()
+        with self._lock:
+            buf = self._candles[timeframe]
+            for ts, row in zip(ts_ms.tolist(), rows):
+                buf[ts] = [ts] + row
+            self._trim(buf)
+
+    def _streams(self):
+        s = self.stream_symbol
+        streams = [f"{s}@kline_{tf}" for tf in self.timeframes]
+        if self.diff_depth:
+            streams.append(f"{s}@depth@100ms")
+        else:
+            streams.append(f"{s}@depth{self.depth_levels}@100ms")
+        streams.append(f"{s}@markPrice@1s")
+        return streams
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run(self):
+        import websockets
+
+        url = f"{self.url}/stream?streams={'/'.join(self._streams())}"
+        backoff = 1.0
+        while self.running:
+            try:
+                async with websockets.connect(url, ping_interval=20, max_size=None) as ws:
+                    print(f"[Stream] Connected to {self.url}")
+                    backoff = 1.0
+                    while self.running:
+                        if self._gap and time.time() >= self._next_gap_fill:
+                            # Before applying new klines, so the buffers stay contiguous
+                            await asyncio.get_running_loop().run_in_executor(None, self._fill_gap)
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self._record(raw)
+                        self.handle_message(json.loads(raw))
+            except Exception as e:
+                if not self.running: break
+                # Klines sent while we were away never arrive; refill them from REST on reconnect
+                self._gap = self.fetcher is not None
+                print(f"[Stream] Connection error: {e}. Reconnecting in {backoff:.0f}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _record(self, raw):
+        if not self.record_path: return
+        try:
+            with open(self.record_path, 'a') as f:
+                f.write(raw if isinstance(raw, str) else raw.decode())
+                f.write('\n')
+        except Exception as e:
+            print(f"[Stream] Failed to record message: {e}")
+
+    # --- Message handling ---
+
+    def handle_message(self, msg):
+        data = msg.get('data', msg)
+        event = data.get('e')
+        if event == 'kline':
+            self._on_kline(data['k'])
+        elif event == 'depthUpdate':
+            self._on_depth(data, msg.get('stream'))
+        elif event == 'markPriceUpdate':
+            self._on_mark_price(data)
+        else:
+            return
+        self.messages += 1
+        self.last_message_time = time.time()
+
+    def _on_kline(self, k):
+        tf = k['i']
+        if tf not in self._candles: return
+        ts = int(k['t'])
+        row = [ts, float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+        with self._lock:
+            buf = self._candles[tf]
+            buf[ts] = row
+            self._trim(buf)
+
+    def _on_depth(self, data, stream=None):
+        # Both depth streams send depthUpdate events; the stream name tells them apart
+        partial = bool(re.search(r'@depth\d+', stream)) if stream else not self.diff_depth
+        if partial:
+            # Partial book depth stream: every message is a full top-N snapshot
+            self.order_book.replace(data.get('b', []), data.get('a', []), data.get('E'))
+            return
+        if not self.order_book.on_diff(data):
+            self._request_snapshot()
+
+    def _request_snapshot(self):
+        # Runs off the event loop so the diffs keep being buffered meanwhile
+        now = time.time()
+        if self.fetcher is None or self._snapshot_pending or now - self._snapshot_requested < SNAPSHOT_RETRY:
+            return
+        self._snapshot_pending = True
+        self._snapshot_requested = now
+        threading.Thread(target=self._load_snapshot, daemon=True).start()
+
+    def _load_snapshot(self):
+        try:
+            bids, asks, last_update_id = self.fetcher.fetch_order_book_snapshot(SNAPSHOT_LIMIT)
+            self.order_book.load_snapshot(bids, asks, last_update_id)
+            print(f"[Stream] Order book synced at update {last_update_id}")
+        except Exception as e:
+            print(f"[Stream] Failed to fetch order book snapshot: {e}")
+        finally:
+            self._snapshot_pending = False
+
+    def _on_mark_price(self, data):
+        with self._lock:
+            self._mark_price = float(data.get('p', 0) or 0)
+            self._funding_rate = float(data.get('r', 0) or 0)
+
+    def _trim(self, buf):
+        while len(buf) > self.buffer_size:
+            buf.popitem(last=False)
+
+    # --- Read API (thread-safe snapshots) ---
+
+    def is_fresh(self, max_age=STALE_AFTER):
+        """Recent messages and no candles missing since a reconnect."""
+        return self.running and not self._gap and (time.time() - self.last_message_time) < max_age
+
+    def has_candles(self, timeframe, limit):
+        with self._lock:
+            return len(self._candles.get(timeframe, ())) >= limit
+
+    def get_ohlcv(self, timeframe, limit=None):
+        """Latest candles (last one may still be forming) shaped like BinanceDataFetcher.fetch_ohlcv()."""
+        with self._lock:
+            rows = list(self._candles[timeframe].values())
+        if limit:
+            rows = rows[-limit:]
+        df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    def get_order_book(self, limit=None):
+        return self.order_book.top(limit or self.depth_levels)
+
+    def get_book_features(self):
+        """Latest order book features (imbalance at 5/10/20 levels, mid, spread, microprice, ...) or None."""
+        return self.order_book.features
+
+    def get_order_book_imbalance(self):
+        features = self.order_book.features
+        return features['book_imbalance_20'] if features else 0.0
+
+    def get_funding_rate(self):
+        with self._lock:
+            return self._funding_rate
+
+    def get_mark_price(self):
+        with self._lock:
+            return self._mark_price
@@ -0,0 +1,245 @@
+"""
+Synthetic market data for self-play training.
+
+generate_episodes() builds whole batches of regime-switching GBM episodes as arrays:
+1m candles -> base candles (base_minutes, the training timeframe) -> the observation features, with the same indicator
+definitions as DataProcessor (ta RSI/MACD/Bollinger, pct changes, log volume)
+computed across all paths at once. generate_market_arrays() chains episodes into one
+continuous price series, fans batches out over a process pool and writes straight
+into a (preallocated) training feature matrix.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.data.processor import DataProcessor, CLOSE_TIME_ALIGNMENT
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+SYNTHETIC_WORKERS = int(os.getenv('SYNTHETIC_WORKERS', str(os.cpu_count() or 1)))
+PATHS_PER_TASK = 32
+
+# (drift, volatility) per minute; regimes switch on average every REGIME_MEAN_MINUTES
+REGIMES = np.array([
+    [0.0, 0.0004],        # quiet range
+    [0.00003, 0.0007],    # uptrend
+    [-0.00003, 0.0007],   # downtrend
+    [0.0, 0.0018],        # high volatility
+])
+REGIME_MEAN_MINUTES = 6 * 60
+
+# normalize_features().dropna() drops rows until macd_signal (26 + 9 - 1 bars) is defined
+WARMUP_BARS = 33
+N_FEATURES = 12
+MACD_COLUMNS = (5, 10)  # price-denominated columns, rescaled when episodes are chained
+
+
+# --- DataFrame helpers (run the regular pipeline; used for parity checks) ---
+
+def generate_candles(n_minutes, rng, start_price=60000.0, volatility=0.0008, start='2026-01-01'):
+    """Synthetic 1m OHLCV frame (geometric random walk with noisy wicks and volume)."""
+    log_ret = rng.normal(0.0, volatility, n_minutes)
+    close = start_price * np.exp(np.cumsum(log_ret))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, n_minutes)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(3.0, 0.5, n_minutes)
+    index = pd.date_range(start=start, periods=n_minutes, freq='1min', name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+def resample_candles(df_1m, minutes):
+    return df_1m.resample(f'{minutes}min').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+
+
+def market_frame(df_base, df_1m):
+    """Base candles + 1m candles -> merged feature frame (same columns as the live pipeline)."""
+    processor = DataProcessor(df_base)
+    processor.add_technical_indicators()
+    return DataProcessor.merge_timeframes(processor.normalize_features(), {'1m': df_1m})
+
+
+def synthetic_market(n_bars, rng, base_minutes=5):
+    """Merged feature frame for n_bars synthetic base candles."""
+    df_1m = generate_candles(n_bars * base_minutes, rng)
+    return market_frame(resample_candles(df_1m, base_minutes), df_1m)
+
+
+# --- Vectorized generator ---
+
+def _ewm_rows_py(x, alpha):
+    """pandas ewm(alpha=..., adjust=False).mean() along axis 1 (no NaNs in x)."""
+    out = np.empty_like(x)
+    out[:, 0] = x[:, 0]
+    keep = 1.0 - alpha
+    for t in range(1, x.shape[1]):
+        out[:, t] = keep * out[:, t - 1] + alpha * x[:, t]
+    return out
+
+
+_ewm_rows = njit(cache=True)(_ewm_rows_py) if njit is not None else _ewm_rows_py
+
+
+def _span_alpha(span):
+    # pandas converts span -> com -> alpha
+    return 1.0 / (1.0 + (span - 1) / 2.0)
+
+
+def _pct_change(x):
+    out = np.empty_like(x)
+    out[:, 0] = np.nan
+    out[:, 1:] = x[:, 1:] / x[:, :-1] - 1.0
+    return out
+
+
+def _rolling_mean_std(x, window):
+    """Trailing rolling mean and population std (ddof=0) along axis 1; NaN before the window fills."""
+    c1 = np.cumsum(x, axis=1)
+    c2 = np.cumsum(x * x, axis=1)
+    s1 = c1.copy()
+    s2 = c2.copy()
+    s1[:, window:] -= c1[:, :-window]
+    s2[:, window:] -= c2[:, :-window]
+    mean = s1 / window
+    std = np.sqrt(np.maximum(s2 / window - mean * mean, 0.0))
+    mean[:, :window - 1] = np.nan
+    std[:, :window - 1] = np.nan
+    return mean, std
+
+
+def timeframe_features(o, h, l, c, v):
+    """
+    (n_paths, T) OHLCV -> dict of observation features for one timeframe:
+    close_pct, high_pct, low_pct, volume_pct, rsi (0-1), macd, bb_position.
+    """
+    diff = np.zeros_like(c)
+    diff[:, 1:] = c[:, 1:] - c[:, :-1]
+    up = _ewm_rows(np.maximum(diff, 0.0), 1.0 / 14)
+    down = _ewm_rows(np.maximum(-diff, 0.0), 1.0 / 14)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + up / down)
+    rsi[:, :13] = np.nan
+
+    macd = _ewm_rows(c, _span_alpha(12)) - _ewm_rows(c, _span_alpha(26))
+    macd[:, :25] = np.nan
+
+    mid, std = _rolling_mean_std(c, 20)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_position = (c - (mid - 2 * std)) / (4 * std)
+    # Flat windows are mid-band, as in DataProcessor.normalize_features
+    window = np.lib.stride_tricks.sliding_window_view(c, 20, axis=1)
+    bb_position[:, 19:][window.max(axis=2) == window.min(axis=2)] = 0.5
+
+    return {
+        'close_pct': _pct_change(c),
+        'high_pct': _pct_change(h),
+        'low_pct': _pct_change(l),
+        'volume_pct': _pct_change(np.log1p(v)),
+        'rsi': rsi / 100.0,
+        'macd': macd,
+        'bb_position': bb_position,
+    }
+
+
+def generate_minute_paths(n_paths, n_minutes, rng, start_price=60000.0):
+    """Regime-switching GBM 1m candles, each (n_paths, n_minutes)."""
+    switches = rng.random((n_paths, n_minutes)) < 1.0 / REGIME_MEAN_MINUTES
+    run_id = np.cumsum(switches, axis=1)
+    run_regime = rng.integers(0, len(REGIMES), (n_paths, int(run_id.max()) + 1))
+    regime = np.take_along_axis(run_regime, run_id, axis=1)
+    drift, vol = REGIMES[regime, 0], REGIMES[regime, 1]
+
+    shock = rng.standard_normal((n_paths, n_minutes))
+    close = start_price * np.exp(np.cumsum(drift + vol * shock, axis=1))
+    open_ = np.empty_like(close)
+    open_[:, 0] = start_price
+    open_[:, 1:] = close[:, :-1]
+    wick = np.abs(rng.standard_normal((2, n_paths, n_minutes))) * (vol / 2)
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    # Volume clusters with the size of the move and the regime's volatility
+    volume = np.exp(3.0 + 0.4 * np.abs(shock) + 0.3 * rng.standard_normal((n_paths, n_minutes))) * (vol / REGIMES[0, 1])
+    return open_, high, low, close, volume
+
+
+def generate_episodes(n_paths, n_bars, seed=None, start_price=60000.0, base_minutes=5):
+    """
+    n_paths episodes of n_bars base candles. Returns
+    features (n_paths, n_bars - WARMUP_BARS, 12) float32 in OBS_FEATURE_COLUMNS order,
+    prices (n_paths, n_bars - WARMUP_BARS) base closes, and the close before each first row.
+    """
+    rng = np.random.default_rng(seed)
+    o, h, l, c, v = generate_minute_paths(n_paths, n_bars * base_minutes, rng, start_price)
+
+    shape = (n_paths, n_bars, base_minutes)
+    bo, bh = o.reshape(shape)[:, :, 0], h.reshape(shape).max(axis=2)
+    bl, bc, bv = l.reshape(shape).min(axis=2), c.reshape(shape)[:, :, -1], v.reshape(shape).sum(axis=2)
+
+    base = timeframe_features(bo, bh, bl, bc, bv)
+    minute = timeframe_features(o, h, l, c, v)
+    # merge_timeframes aligns each base bar with the 1m bar that closes with it (its last minute),
+    # or with the legacy alignment the 1m bar that opens with it (its first minute)
+    minute_row = slice(base_minutes - 1 if CLOSE_TIME_ALIGNMENT else 0, None, base_minutes)
+
+    kept = slice(WARMUP_BARS, None)
+    columns = [base[k][:, kept] for k in ('close_pct', 'high_pct', 'low_pct', 'volume_pct', 'rsi', 'macd', 'bb_position')]
+    columns += [minute[k][:, minute_row][:, kept] for k in ('close_pct', 'volume_pct', 'rsi', 'macd', 'bb_position')]
+    features = np.nan_to_num(np.stack(columns, axis=2).astype(np.float32))
+    return features, bc[:, kept].copy(), bc[:, WARMUP_BARS - 1].copy()
+
+
+def _generate_task(args):
+    n_paths, n_bars, seed, start_price, base_minutes = args
+    return generate_episodes(n_paths, n_bars, seed=seed, start_price=start_price, base_minutes=base_minutes)
+
+
+def generate_market_arrays(n_rows, episode_bars=2000, seed=None, workers=SYNTHETIC_WORKERS,
+                           start_price=60000.0, out_features=None, out_prices=None, base_minutes=5):
+    """
+    Fills n_rows rows of synthetic (features, prices), episode after episode.
+    Episodes are rescaled so prices continue from one to the next (the close before the
+    first row equals start_price), which keeps a concatenation with real data free of jumps.
+    out_features / out_prices may be slices of a larger training matrix. base_minutes is
+    the length of a row's candle and must match the real rows' base timeframe.
+    """
+    rows_per_episode = episode_bars - WARMUP_BARS
+    n_paths = -(-n_rows // rows_per_episode)
+    if out_features is None:
+        out_features = np.empty((n_rows, N_FEATURES), dtype=np.float32)
+    if out_prices is None:
+        out_prices = np.empty(n_rows, dtype=np.float64)
+
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_paths // PATHS_PER_TASK))
+    tasks = [(min(PATHS_PER_TASK, n_paths - i * PATHS_PER_TASK), episode_bars, s, start_price, base_minutes)
+             for i, s in enumerate(seeds)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = pool.map(_generate_task, tasks)
+            _write_chained(results, out_features, out_prices, start_price)
+    else:
+        _write_chained(map(_generate_task, tasks), out_features, out_prices, start_price)
+    return out_features, out_prices
+
+
+def _write_chained(results, out_features, out_prices, start_price):
+    row, level = 0, start_price
+    n_rows = len(out_prices)
+    for features, prices, prev_close in results:
+        for p in range(len(prices)):
+            if row >= n_rows:
+                return
+            n = min(len(prices[p]), n_rows - row)
+            scale = level / prev_close[p]
+            out_features[row:row + n] = features[p, :n]
+            out_prices[row:row + n] = prices[p, :n] * scale
+            for col in MACD_COLUMNS:
+                out_features[row:row + n, col] *= scale
+            level = out_prices[row + n - 1]
+            row += n
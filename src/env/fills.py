@@ -0,0 +1,7 @@
+"""
+Fill parameters shared by PaperTradingSession, TradingEnv and the backtester, so the
+simulated fills cannot drift apart. Kept free of gymnasium like observation.py.
+"""
+COMMISSION_RATE = 0.0005
+MIN_TRADE_VALUE = 10.0  # dust-skip: smaller rebalances are not sent
+INITIAL_BALANCE = 10000.0
@@ -0,0 +1,33 @@
+"""
+Observation layout shared by TradingEnv and the live bot. Kept free of gymnasium so the
+bot can build observations with POLICY_RUNTIME=numpy without the training stack installed.
+"""
+import numpy as np
+
+# Market features in observation order; leverage and unrealized PnL ratio follow (14 total)
+OBS_FEATURE_COLUMNS = [
+    'close_pct', 'high_pct', 'low_pct', 'volume_pct', 'rsi', 'macd', 'bb_position',
+    'close_pct_1m', 'volume_pct_1m', 'rsi_1m', 'macd_1m', 'bb_position_1m'
+]
+N_STATE_FEATURES = 2
+N_OBS_FEATURES = len(OBS_FEATURE_COLUMNS) + N_STATE_FEATURES
+
+
+def feature_matrix(df, columns=OBS_FEATURE_COLUMNS):
+    """DataFrame -> contiguous float32 (n, len(columns)) with NaN replaced by 0."""
+    return np.ascontiguousarray(np.nan_to_num(df[columns].to_numpy(dtype=np.float32)))
+
+
+def build_observation(window, leverage_norm, pnl_ratio, out=None):
+    """
+    Market window (lookback, 12) followed by the leverage / max_leverage and
+    unrealized PnL / net worth columns, NaN -> 0, float32.
+    """
+    lookback, n_feat = window.shape
+    if out is None:
+        out = np.empty((lookback, n_feat + N_STATE_FEATURES), dtype=np.float32)
+    out[:, :n_feat] = window
+    out[:, n_feat] = leverage_norm
+    out[:, n_feat + 1] = pnl_ratio
+    np.nan_to_num(out, copy=False)
+    return out
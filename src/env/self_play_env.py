@@ -0,0 +1,28 @@
+"""
+Self-play environment: TradingEnv over a freshly generated synthetic market each episode
+(regime-switching GBM from src.data.synthetic, same observation features as real data).
+"""
+import numpy as np
+
+from src.data.synthetic import generate_episodes
+from src.env.trading_env import TradingEnv, LOOKBACK_WINDOW
+
+
+class SelfPlayTradingEnv(TradingEnv):
+    def __init__(self, n_bars=600, lookback=LOOKBACK_WINDOW, seed=None, base_minutes=5, **kwargs):
+        self.n_bars = n_bars
+        self.base_minutes = base_minutes  # candle length of the policy's timeframe
+        self._seeds = np.random.SeedSequence(seed)
+        features, prices = self._episode()
+        super().__init__(features=features, prices=prices, lookback=lookback, **kwargs)
+
+    def _episode(self):
+        features, prices, _ = generate_episodes(1, self.n_bars, seed=self._seeds.spawn(1)[0],
+                                             base_minutes=self.base_minutes)
+        return features[0], prices[0]
+
+    def reset(self, seed=None, options=None):
+        if seed is not None:
+            self._seeds = np.random.SeedSequence(seed)
+        self.set_data(*self._episode())
+        return super().reset(seed=seed, options=options)
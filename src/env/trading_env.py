@@ -0,0 +1,172 @@
+"""
+Array-backed trading environment.
+The merged multi-timeframe DataFrame is converted once into a contiguous float32 matrix;
+each step's lookback window is a strided view into it, copied next to the position/PnL
+state columns in a preallocated observation buffer. Fills follow PaperTradingSession.
+"""
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+
+from src.env.observation import (OBS_FEATURE_COLUMNS, N_STATE_FEATURES, N_OBS_FEATURES,  # noqa: F401
+                                  feature_matrix, build_observation)
+from src.env.fills import COMMISSION_RATE, MIN_TRADE_VALUE, INITIAL_BALANCE
+
+LOOKBACK_WINDOW = 50
+MAX_LEVERAGE = 20.0
+BANKRUPT_RATIO = 0.1  # episode ends once net worth falls below 10% of the start
+
+
+class TradingEnv(gym.Env):
+    metadata = {'render_modes': []}
+
+    def __init__(self, df=None, lookback=LOOKBACK_WINDOW, initial_balance=INITIAL_BALANCE,
+                 max_leverage=MAX_LEVERAGE, random_start=False, episode_length=None,
+                 features=None, prices=None, start_offset=0):
+        """
+        df: merged frame from DataProcessor.merge_timeframes (needs OBS_FEATURE_COLUMNS and 'close').
+        features/prices: the same data as arrays (e.g. shared between worker processes) instead of df.
+        random_start: begin episodes at a random row; episode_length caps the steps per episode.
+        start_offset: otherwise the first episode begins this many rows into the data (parallel
+        workers use different offsets so they stay out of phase); later episodes start at the top.
+        """
+        super().__init__()
+        self.lookback = lookback
+        self.initial_balance = float(initial_balance)
+        self.max_leverage = float(max_leverage)
+        self.random_start = random_start
+        self.episode_length = episode_length
+        self.start_offset = start_offset
+
+        if df is not None:
+            features = feature_matrix(df)
+            prices = df['close'].to_numpy(dtype=np.float64)
+        if features is None or prices is None:
+            raise ValueError("TradingEnv needs a DataFrame or features + prices arrays")
+        self.set_data(features, prices)
+        self._obs = np.zeros((lookback, features.shape[1] + N_STATE_FEATURES), dtype=np.float32)
+
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=self._obs.shape, dtype=np.float32)
+        self.action_space = spaces.Box(low=-1.0, high=1.0, shape=(1,), dtype=np.float32)
+
+        self._reset_portfolio()
+        self.current_step = lookback - 1
+        self.start_step = self.current_step
+
+    def set_data(self, features, prices):
+        """Swaps the market data (same feature columns); takes effect on the next reset()."""
+        if len(features) != len(prices):
+            raise ValueError(f"features has {len(features)} rows, prices has {len(prices)}")
+        if len(features) <= self.lookback:
+            raise ValueError(f"Need more than {self.lookback} rows, got {len(features)}")
+        self.features = features
+        self.prices = prices
+        # windows[i] is rows i .. i+lookback-1, a view (no copy)
+        self.windows = np.lib.stride_tricks.sliding_window_view(features, self.lookback, axis=0).transpose(0, 2, 1)
+
+    def _reset_portfolio(self):
+        self.balance = self.initial_balance
+        self.net_worth = self.initial_balance
+        self.held_quantity = 0.0
+        self.entry_price = 0.0
+        self.current_leverage = 0.0
+        self.realized_pnl = 0.0
+        self.total_fees = 0.0
+        self.trades = 0
+
+    # --- Portfolio (same rules as PaperTradingSession.execute_target_leverage) ---
+
+    def _unrealized(self, price):
+        held = self.held_quantity
+        if held > 0:
+            return (price - self.entry_price) * held
+        if held < 0:
+            return (self.entry_price - price) * -held
+        return 0.0
+
+    def _update_net_worth(self, price):
+        self.net_worth = self.balance + self._unrealized(price)
+        self.current_leverage = self.held_quantity * price / self.net_worth if self.net_worth > 0 else 0.0
+
+    def _execute(self, target_leverage, price):
+        self._update_net_worth(price)
+        trade_value = self.net_worth * target_leverage - self.held_quantity * price
+        if abs(trade_value) < MIN_TRADE_VALUE:
+            return
+
+        fee = abs(trade_value) * COMMISSION_RATE
+        self.balance -= fee
+        self.total_fees += fee
+        self.trades += 1
+
+        held, entry = self.held_quantity, self.entry_price
+        qty = trade_value / price
+        if ((held > 0 and qty < 0) or (held < 0 and qty > 0)) and entry > 0:
+            closed = min(abs(qty), abs(held))
+            self.realized_pnl += (price - entry) * closed if held > 0 else (entry - price) * closed
+
+        if (held > 0 and qty > 0) or (held < 0 and qty < 0):
+            entry = abs((held * entry + qty * price) / (held + qty))
+        elif held == 0 and qty != 0:
+            entry = price
+        new_held = held + qty
+        if (held > 0 and new_held < 0) or (held < 0 and new_held > 0):
+            entry = price
+        if abs(new_held) < 1e-10:
+            new_held, entry = 0.0, 0.0
+        self.held_quantity, self.entry_price = new_held, entry
+        self._update_net_worth(price)
+
+    # --- Gym API ---
+
+    def _get_obs(self):
+        price = self.prices[self.current_step]
+        pnl_ratio = 0.0
+        if self.held_quantity != 0 and self.net_worth > 0:
+            pnl_ratio = self._unrealized(price) / self.net_worth
+        return build_observation(self.windows[self.current_step - self.lookback + 1],
+                                 self.current_leverage / self.max_leverage, pnl_ratio, out=self._obs)
+
+    def _info(self):
+        return {
+            'net_worth': self.net_worth,
+            'leverage': self.current_leverage,
+            'realized_pnl': self.realized_pnl,
+            'total_fees': self.total_fees,
+            'trades': self.trades,
+        }
+
+    def reset(self, seed=None, options=None):
+        """
+        The returned observation is a reused buffer; copy it to keep it across steps.
+        (The final observation of an episode is returned as a copy: vectorized envs keep it
+        as terminal_observation while reset() rewrites the buffer.)
+        """
+        super().reset(seed=seed)
+        self._reset_portfolio()
+        first, last = self.lookback - 1, len(self.prices) - 2
+        if self.random_start and last > first:
+            span = last - first if self.episode_length is None else max(1, last - first - self.episode_length)
+            self.current_step = first + int(self.np_random.integers(0, span))
+        else:
+            self.current_step = first + self.start_offset % max(1, last - first)
+            self.start_offset = 0
+        self.start_step = self.current_step
+        return self._get_obs(), self._info()
+
+    def step(self, action):
+        target = float(np.clip(action[0], -1.0, 1.0)) * self.max_leverage
+        prev_net_worth = self.net_worth
+
+        self._execute(target, self.prices[self.current_step])
+        self.current_step += 1
+        self._update_net_worth(self.prices[self.current_step])
+
+        terminated = self.net_worth <= self.initial_balance * BANKRUPT_RATIO
+        truncated = self.current_step >= len(self.prices) - 1 or (
+            self.episode_length is not None and self.current_step - self.start_step >= self.episode_length)
+        reward = float(np.log(max(self.net_worth, 1e-8) / prev_net_worth)) if prev_net_worth > 0 else 0.0
+        obs = self._get_obs()
+        if terminated or truncated:
+            obs = obs.copy()
+        return obs, reward, bool(terminated), bool(truncated), self._info()
@@ -0,0 +1,105 @@
+"""
+Parallel rollout environments.
+The feature matrix and prices are written once to .npy files that every worker
+memory-maps read-only, so N workers share one copy of the data instead of each
+unpickling its own DataFrame.
+"""
+import os
+import time
+import shutil
+import tempfile
+
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from src.env.trading_env import TradingEnv, feature_matrix
+
+N_ENVS = int(os.getenv('N_ENVS', '1'))
+
+
+class _MappedEnvFactory:
+    """Picklable env constructor; runs inside the worker process."""
+
+    def __init__(self, features_path, prices_path, start_offset, env_kwargs):
+        self.features_path = features_path
+        self.prices_path = prices_path
+        self.start_offset = start_offset
+        self.env_kwargs = env_kwargs
+
+    def __call__(self):
+        features = np.load(self.features_path, mmap_mode='r')
+        prices = np.load(self.prices_path, mmap_mode='r')
+        return TradingEnv(features=features, prices=prices, start_offset=self.start_offset, **self.env_kwargs)
+
+
+def share_market_data(df=None, features=None, prices=None, directory=None):
+    """Writes features/prices to .npy files and returns (directory, features_path, prices_path)."""
+    if df is not None:
+        features = feature_matrix(df)
+        prices = df['close'].to_numpy(dtype=np.float64)
+    directory = directory or tempfile.mkdtemp(prefix="trading_env_")
+    features_path = os.path.join(directory, "features.npy")
+    prices_path = os.path.join(directory, "prices.npy")
+    np.save(features_path, np.ascontiguousarray(features, dtype=np.float32))
+    np.save(prices_path, np.ascontiguousarray(prices, dtype=np.float64))
+    return directory, features_path, prices_path
+
+
+def make_vec_env(df=None, n_envs=N_ENVS, features=None, prices=None, **env_kwargs):
+    """
+    n_envs == 1: the usual in-process DummyVecEnv.
+    n_envs > 1: SubprocVecEnv whose workers memory-map the same data, each starting
+    at a different offset (len / n_envs apart).
+    """
+    if n_envs <= 1:
+        if df is not None:
+            return DummyVecEnv([lambda: TradingEnv(df, **env_kwargs)])
+        return DummyVecEnv([lambda: TradingEnv(features=features, prices=prices, **env_kwargs)])
+
+    directory, features_path, prices_path = share_market_data(df, features, prices)
+    n_rows = len(np.load(prices_path, mmap_mode='r'))
+    stride = n_rows // n_envs
+    factories = [_MappedEnvFactory(features_path, prices_path, i * stride, env_kwargs) for i in range(n_envs)]
+    vec_env = SubprocVecEnv(factories)
+    # Every worker has its mapping open once it answers; the files can go (POSIX keeps the pages)
+    vec_env.get_attr('lookback')
+    shutil.rmtree(directory, ignore_errors=True)
+    print(f"[VecEnv] {n_envs} workers sharing {n_rows} rows (offset stride {stride})")
+    return vec_env
+
+
+def measure_fps_scaling(features, prices, worker_counts, model=None, steps_per_env=512):
+    """
+    Rollout throughput (env steps/s, policy inference included when a model is given)
+    for each worker count. Printed as a small table for the training log.
+    """
+    results = {}
+    for n in worker_counts:
+        vec_env = make_vec_env(features=features, prices=prices, n_envs=n)
+        obs = vec_env.reset()
+        start = time.perf_counter()
+        for _ in range(steps_per_env):
+            if model is not None:
+                actions, _ = model.predict(obs)
+            else:
+                actions = np.random.uniform(-1, 1, (n, 1)).astype(np.float32)
+            obs, _, _, _ = vec_env.step(actions)
+        results[n] = n * steps_per_env / (time.perf_counter() - start)
+        vec_env.close()
+
+    base = results[worker_counts[0]]
+    print("[VecEnv] Rollout fps scaling:")
+    for n, fps in results.items():
+        print(f"[VecEnv]   {n:>3} workers: {fps:10,.0f} steps/s ({fps / base:.1f}x)")
+    return results
+
+
+def scaling_worker_counts(max_workers=None):
+    """1, 2, 4, ... up to max_workers (default: CPU count)."""
+    max_workers = max_workers or os.cpu_count() or 1
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
@@ -1,14 +1,12 @@
 import tkinter as tk
 from tkinter import ttk
-import threading
-import time
 import sys
 import os
 
 # Ensure src is in path to import main correctly if run from project root
 sys.path.append(os.getcwd())
 
-from src.main import TradingBot
+from src.daemon import DaemonClient, DAEMON_URL
 
 class TradingBotGUI:
     def __init__(self, root):
@@ -16,8 +14,8 @@ class TradingBotGUI:
         self.root.title("Binance AI Trading Bot")
         self.root.geometry("400x450")
         
-        # Initialize Bot (Model loading might take a moment)
-        self.bot = TradingBot()
+        # Read-only view of the bot daemon (python -m src.daemon)
+        self.client = DaemonClient()
         
         # Styles
         style = ttk.Style()
@@ -63,36 +61,20 @@ class TradingBotGUI:
         self.action_var = tk.StringVar(value="--")
         create_row(info_frame, "Last Action:", self.action_var, 4)
 
-        # Controls
-        btn_frame = ttk.Frame(main_frame)
-        btn_frame.pack(pady=20)
-        
-        self.start_btn = ttk.Button(btn_frame, text="START BOT", command=self.start_bot)
-        self.start_btn.pack(side=tk.LEFT, padx=10)
-        
-        self.stop_btn = ttk.Button(btn_frame, text="STOP BOT", command=self.stop_bot, state=tk.DISABLED)
-        self.stop_btn.pack(side=tk.LEFT, padx=10)
+        ttk.Label(main_frame, text=f"Daemon: {DAEMON_URL}", font=("Helvetica", 10)).pack(pady=10)
         
         # Update Loop
         self.update_ui()
 
-    def start_bot(self):
-        self.bot.start()
-        self.start_btn.config(state=tk.DISABLED)
-        self.stop_btn.config(state=tk.NORMAL)
-        self.status_var.set("Status: RUNNING")
-        self.status_label.config(foreground="green")
-
-    def stop_bot(self):
-        self.bot.stop()
-        self.start_btn.config(state=tk.NORMAL)
-        self.stop_btn.config(state=tk.DISABLED)
-        self.status_var.set("Status: STOPPING...")
-        self.status_label.config(foreground="orange")
-
     def update_ui(self):
-        # Poll bot status
-        status = self.bot.get_status()
+        # Poll the daemon's status snapshot
+        try:
+            status = self.client.status()
+        except OSError:
+            self.status_var.set("Status: DAEMON NOT REACHABLE")
+            self.status_label.config(foreground="orange")
+            self.root.after(2000, self.update_ui)
+            return
         
         if status['price'] > 0:
             self.price_var.set(f"{status['price']:.2f}")
@@ -120,14 +102,9 @@ class TradingBotGUI:
         if status['running']:
             self.status_var.set(f"Status: RUNNING ({status['last_update']})")
             self.status_label.config(foreground="green")
-            self.start_btn.config(state=tk.DISABLED)
-            self.stop_btn.config(state=tk.NORMAL)
         else:
-            if self.status_var.get().startswith("Status: RUNNING"):
-               self.status_var.set("Status: STOPPED")
-               self.status_label.config(foreground="red")
-               self.start_btn.config(state=tk.NORMAL)
-               self.stop_btn.config(state=tk.DISABLED)
+            self.status_var.set("Status: STOPPED")
+            self.status_label.config(foreground="red")
         
         self.root.after(1000, self.update_ui)
 
@@ -4,45 +4,220 @@ Replaces PaperTradingSession when LIVETRADING=True.
 """
 import os
 import time
+import threading
 import ccxt
 from dotenv import load_dotenv
 
+from src.data.journal import TradeJournal, journal_path_for
+from src.performance import PerformanceTracker, CYCLES_PER_YEAR
+from src.data.ratelimit import get_rate_limiter
+from src.metrics import instrumented_call, timed
+from src.env.fills import COMMISSION_RATE
+
 load_dotenv()
 
-COMMISSION_RATE = 0.0005
 MAX_LEVERAGE = 20
 
+# Maximum age of the account snapshot an order is sized from. Sessions of one account share
+# the snapshot, so the sessions trading in the same cycle cost one balance + positions read.
+STATE_TTL = float(os.getenv('LIVE_STATE_TTL', '2'))
+
+# Binance USD-M IP request weight per private endpoint (orders count against the order limits instead)
+ENDPOINT_WEIGHTS = {'set_leverage': 1, 'fetch_balance': 5, 'fetch_positions': 5, 'fetch_ticker': 1,
+                    'create_market_order': 0}
+
+EMPTY_POSITION = {
+    'side': 'none', 'quantity': 0, 'contracts': 0,
+    'notional': 0, 'entry_price': 0, 'unrealized_pnl': 0, 'leverage': 0
+}
+
+
+def create_trading_exchange():
+    """Authenticated futures client (demo endpoint when USE_TESTNET); may be shared by several sessions."""
+    use_testnet = os.getenv('USE_TESTNET', 'True').lower() == 'true'
+    
+    config = {
+        'apiKey': os.getenv('BINANCE_API_KEY'),
+        'secret': os.getenv('BINANCE_SECRET_KEY'),
+        'enableRateLimit': True,
+        'options': {
+            'defaultType': 'future',
+            'recvWindow': 60000
+        }
+    }
+    
+    exchange = ccxt.binance(config)
+    
+    if use_testnet:
+        exchange.enable_demo_trading(True)
+        print("[LIVE] Connected to Binance Futures DEMO TRADING")
+    else:
+        print("[LIVE] Connected to Binance Futures LIVE")
+    return exchange
+
+
+def _market_id(symbol):
+    # 'BTC/USDT' / 'BTC/USDT:USDT' / 'BTCUSDT' -> 'BTCUSDT'
+    return symbol.split(':')[0].replace('/', '')
+
+
+def _parse_position(pos):
+    side = pos.get('side', 'none')
+    contracts = float(pos.get('contracts', 0) or 0)
+    return {
+        'side': side,
+        # Signed quantity
+        'quantity': contracts if side == 'long' else -contracts if side == 'short' else 0,
+        'contracts': contracts,
+        'notional': float(pos.get('notional', 0) or 0),
+        'entry_price': float(pos.get('entryPrice', 0) or 0),
+        'unrealized_pnl': float(pos.get('unrealizedPnl', 0) or 0),
+        'leverage': float(pos.get('leverage', 0) or 0)
+    }
+
+
+class AccountState:
+    """
+    Balance and positions of one futures account, shared by every LiveTradingSession on the
+    same exchange client. Nothing polls: refresh() reads balance and all positions when the
+    snapshot is older than the caller allows, and user-data stream events patch positions
+    in between. Readers take self.state (replaced wholesale, never mutated) without locking.
+    """
+
+    def __init__(self, exchange, limiter=None):
+        self.exchange = exchange
+        self.limiter = limiter or get_rate_limiter()
+        self.state = {'balance': 0.0, 'positions': {}, 'updated': 0.0}
+        self._refresh_lock = threading.Lock()
+        self._sessions = set()
+        self._sessions_lock = threading.Lock()
+        self.user_stream = None
+
+    def _call(self, method, *args, **kwargs):
+        return instrumented_call(self.exchange, self.limiter, method, ENDPOINT_WEIGHTS.get(method, 1), *args, **kwargs)
+
+    def refresh(self, max_age=STATE_TTL):
+        """Re-reads balance and positions if the snapshot is older than max_age seconds (0 forces)."""
+        with self._refresh_lock:
+            if max_age > 0 and time.time() - self.state['updated'] < max_age:
+                return self.state
+            positions = self._fetch_positions()
+            balance = self._fetch_balance()
+            if positions is None or balance is None:
+                return self.state  # keep the last snapshot; the next caller retries
+            self.state = {'balance': balance, 'positions': positions, 'updated': time.time()}
+            return self.state
+
+    def invalidate(self):
+        """Marks the snapshot stale; the next refresh() goes to the exchange."""
+        state = self.state
+        self.state = {'balance': state['balance'], 'positions': state['positions'], 'updated': 0.0}
+
+    def _fetch_balance(self):
+        """USDT balance (futures 'total'), or None on error."""
+        try:
+            balance = self._call('fetch_balance')
+            return float(balance.get('USDT', {}).get('total', 0))
+        except Exception as e:
+            print(f"[LIVE] Error fetching balance: {e}")
+            return None
+
+    def _fetch_positions(self):
+        """{market id: position} for every open position (one request for all symbols), or None on error."""
+        try:
+            positions = {}
+            for pos in self._call('fetch_positions'):
+                market_id = pos.get('info', {}).get('symbol') or _market_id(pos['symbol'])
+                parsed = _parse_position(pos)
+                if parsed['contracts'] or market_id not in positions:
+                    positions[market_id] = parsed
+            return positions
+        except Exception as e:
+            print(f"[LIVE] Error fetching positions: {e}")
+            return None
+
+    # --- Sessions / user-data stream ---
+
+    def attach(self, session, user_stream=None):
+        with self._sessions_lock:
+            self._sessions.add(session)
+            if user_stream is not None and self.user_stream is None:
+                self.user_stream = user_stream
+                user_stream.subscribe(self._on_user_event)
+
+    def detach(self, session):
+        with self._sessions_lock:
+            self._sessions.discard(session)
+            if not self._sessions and self.user_stream is not None:
+                self.user_stream.unsubscribe(self._on_user_event)
+                self.user_stream = None
+
+    def _on_user_event(self, msg):
+        event = msg.get('e')
+        if event == 'ACCOUNT_UPDATE':
+            state = self.state
+            positions = dict(state['positions'])
+            for p in msg.get('a', {}).get('P', []):
+                if p.get('ps', 'BOTH') != 'BOTH':
+                    continue
+                quantity = float(p['pa'])
+                entry_price = float(p['ep'])
+                unrealized = float(p['up'])
+                pos = dict(positions.get(p.get('s'), EMPTY_POSITION))
+                pos.update({
+                    'side': 'long' if quantity > 0 else 'short' if quantity < 0 else 'none',
+                    'quantity': quantity,
+                    'contracts': abs(quantity),
+                    # |qty * mark| with mark recovered from the unrealized PnL
+                    'notional': abs(quantity * entry_price + unrealized),
+                    'entry_price': entry_price,
+                    'unrealized_pnl': unrealized,
+                })
+                positions[p.get('s')] = pos
+            # Margin balance depends on every position's PnL; let REST re-read it before the next order
+            self.state = {'balance': state['balance'], 'positions': positions, 'updated': 0.0}
+        elif event == 'ORDER_TRADE_UPDATE':
+            if msg.get('o', {}).get('X') in ('FILLED', 'PARTIALLY_FILLED'):
+                self.invalidate()
+
+
+_accounts = {}
+_accounts_lock = threading.Lock()
+
+
+def get_account(exchange):
+    """The AccountState shared by every session trading through this exchange client."""
+    with _accounts_lock:
+        account = _accounts.get(id(exchange))
+        if account is None or account.exchange is not exchange:
+            account = _accounts[id(exchange)] = AccountState(exchange)
+        return account
+
 
 class LiveTradingSession:
-    def __init__(self, symbol='BTC/USDT', max_leverage=20):
+    def __init__(self, symbol='BTC/USDT', max_leverage=20, exchange=None, history_file="live_trades.json", user_stream=None,
+                 allocation=1.0):
         self.symbol = symbol
+        self.market_id = _market_id(symbol)
         self.max_leverage = max_leverage
+        # Fraction of the account balance this session trades with. Sessions sharing an account
+        # must split it (allocations summing to <= 1), or each one sizes against the whole balance.
+        self.allocation = allocation
         
         # Exchange Setup
         use_testnet = os.getenv('USE_TESTNET', 'True').lower() == 'true'
+        self.exchange = exchange if exchange is not None else create_trading_exchange()
+        self.limiter = get_rate_limiter()
         
-        config = {
-            'apiKey': os.getenv('BINANCE_API_KEY'),
-            'secret': os.getenv('BINANCE_SECRET_KEY'),
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'future',
-                'recvWindow': 60000
-            }
-        }
-        
-        self.exchange = ccxt.binance(config)
-        
-        if use_testnet:
-            self.exchange.enable_demo_trading(True)
-            print("[LIVE] Connected to Binance Futures DEMO TRADING")
-        else:
-            print("[LIVE] Connected to Binance Futures LIVE")
+        # Account snapshot shared with the other sessions of this exchange client
+        self.account = get_account(self.exchange)
+        self.user_stream = user_stream
+        self.account.attach(self, user_stream)
         
         # Set initial leverage on exchange
         try:
             # Use standard CCXT method
-            self.exchange.set_leverage(int(max_leverage), symbol)
+            self._call('set_leverage', int(max_leverage), symbol)
             # self.exchange.fapiPrivate_post_leverage({
             #     'symbol': symbol.replace('/', ''),
             #     'leverage': max_leverage
@@ -52,14 +227,16 @@ class LiveTradingSession:
             print(f"[LIVE] Warning: Could not set leverage: {e}")
         
         # Track state
-        self.initial_balance = self._fetch_balance()
+        self.initial_balance = self.refresh()['balance']
         self.realized_pnl = 0.0
         self.total_fees = 0.0
         self.total_fees = 0.0
-        self.history_file = "live_trades.json"
+        self.history_file = history_file
         
-        # Load history
-        self.history = self._load_history()
+        # Trade journal (imports an old JSON history on first use)
+        self.journal = TradeJournal(journal_path_for(history_file), migrate_from=history_file)
+        self.performance = PerformanceTracker(periods_per_year=CYCLES_PER_YEAR)
+        self.performance.load_totals(self.journal.totals())
         
         print(f"[LIVE] Initial balance: ${self.initial_balance:,.2f}")
         
@@ -70,125 +247,68 @@ class LiveTradingSession:
             if use_testnet:
                 print(f"[LIVE] 💡 다음 링크에서 테스트넷 자금을 충전해주세요: https://testnet.binancefuture.com/en/futures/delivery/BTCUSDT (Faucet)")
 
+    def stop(self):
+        """Releases the shared account snapshot (and its user-stream subscription with the last session)."""
+        self.account.detach(self)
     
-    def _load_history(self):
-        import json
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"[LIVE] Failed to load history: {e}")
-                return []
-        return []
-
-    def _save_history(self):
-        import json
-        try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.history, f, indent=4)
-        except Exception as e:
-            print(f"[LIVE] Failed to save history: {e}")
-    
-    def _fetch_balance(self):
-        """Fetch USDT balance from exchange."""
-        try:
-            balance = self.exchange.fetch_balance()
-            # For futures, use 'total' USDT
-            usdt = balance.get('USDT', {})
-            return float(usdt.get('total', 0))
-        except Exception as e:
-            print(f"[LIVE] Error fetching balance: {e}")
-            return 0.0
-    
-    def _fetch_position(self):
-        """Fetch current position from exchange."""
-        try:
-            positions = self.exchange.fetch_positions([self.symbol])
-            print(f"[DEBUG] Fetching positions for {self.symbol}...")
-            for pos in positions:
-                # CCXT can return 'BTCUSDT', 'BTC/USDT', or 'BTC/USDT:USDT'
-                s = pos['symbol']
-                target = self.symbol # 'BTC/USDT'
-                target_alt = self.symbol.replace('/', '') # 'BTCUSDT'
-                
-                print(f"[DEBUG] Checking pos symbol: '{s}' vs target '{target}' or '{target_alt}'")
-                
-                # Check for match (including valid ccxt formats)
-                if s == target or s == target_alt or target in s or target_alt in s:
-                    print(f"[DEBUG] MATCH FOUND for {s}!")
-                    side = pos.get('side', 'none')
-                    contracts = float(pos.get('contracts', 0) or 0)
-                    notional = float(pos.get('notional', 0) or 0)
-                    entry_price = float(pos.get('entryPrice', 0) or 0)
-                    unrealized_pnl = float(pos.get('unrealizedPnl', 0) or 0)
-                    leverage = float(pos.get('leverage', 0) or 0)
-                    
-                    # Calculate signed quantity
-                    quantity = contracts if side == 'long' else -contracts if side == 'short' else 0
-                    
-                    return {
-                        'side': side,
-                        'quantity': quantity,
-                        'contracts': contracts,
-                        'notional': notional,
-                        'entry_price': entry_price,
-                        'unrealized_pnl': unrealized_pnl,
-                        'leverage': leverage
-                    }
-            return {
-                'side': 'none', 'quantity': 0, 'contracts': 0,
-                'notional': 0, 'entry_price': 0, 'unrealized_pnl': 0, 'leverage': 0
-            }
-        except Exception as e:
-            print(f"[LIVE] Error fetching position: {e}")
-            return {
-                'side': 'none', 'quantity': 0, 'contracts': 0,
-                'notional': 0, 'entry_price': 0, 'unrealized_pnl': 0, 'leverage': 0
-            }
-    
+    def _call(self, method, *args, **kwargs):
+        """Exchange REST call against the shared weight budget, counted and timed per method."""
+        return instrumented_call(self.exchange, self.limiter, method, ENDPOINT_WEIGHTS.get(method, 1), *args, **kwargs)
+
     def _fetch_price(self):
         """Fetch current market price."""
         try:
-            ticker = self.exchange.fetch_ticker(self.symbol)
+            ticker = self._call('fetch_ticker', self.symbol)
             return float(ticker['last'])
         except Exception as e:
             print(f"[LIVE] Error fetching price: {e}")
             return 0.0
 
+    # --- Cached state ---
+
+    def _view(self, state):
+        """This session's slice of an account snapshot (its allocated share of the balance)."""
+        return {'balance': state['balance'] * self.allocation, 'position': state['positions'].get(self.market_id, EMPTY_POSITION),
+                'updated': state['updated']}
+
+    @property
+    def _state(self):
+        return self._view(self.account.state)
+
+    def refresh(self, force=False):
+        """Balance and position no older than STATE_TTL (re-read from REST if needed, or forced)."""
+        return self._view(self.account.refresh(0 if force else STATE_TTL))
+
+    def invalidate(self):
+        """Marks the snapshot stale; the next refresh() goes to the exchange."""
+        self.account.invalidate()
+
     @property
     def net_worth(self):
-        return self._fetch_balance()
+        return self._state['balance']
     
     @property
     def current_leverage(self):
-        pos = self._fetch_position()
-        balance = self._fetch_balance()
+        state = self._state
+        pos, balance = state['position'], state['balance']
         if balance > 0 and pos['notional'] != 0:
             return pos['notional'] / balance
         return 0.0
     
     @property 
     def held_quantity(self):
-        pos = self._fetch_position()
-        return pos['quantity']
+        return self._state['position']['quantity']
     
     @property
     def entry_price(self):
-        pos = self._fetch_position()
-        return pos['entry_price']
+        return self._state['position']['entry_price']
     
     def get_unrealized_pnl(self, current_price=None):
-        """Get unrealized PnL from exchange."""
-        pos = self._fetch_position()
-        return pos['unrealized_pnl']
+        """Unrealized PnL from the cached exchange position."""
+        return self._state['position']['unrealized_pnl']
     
     def get_win_rate(self):
-        if not self.history:
-            return 0.0
-        wins = sum(1 for trade in self.history if trade['realized_pnl'] > 0)
-        total = len(self.history)
-        return (wins / total) * 100.0
+        return self.performance.win_rate()
 
     def execute_target_leverage(self, target_leverage, current_price, symbol):
         """
@@ -196,9 +316,11 @@ class LiveTradingSession:
         target_leverage: float between -MAX_LEV and +MAX_LEV
         """
         try:
-            # 1. Get current state from exchange
-            pos = self._fetch_position()
-            balance = self._fetch_balance()
+            # 1. Get current state (shared account snapshot, re-read from the exchange if older than STATE_TTL)
+            self.account.attach(self, self.user_stream)
+            state = self.refresh()
+            pos = state['position']
+            balance = state['balance']
             
             if balance <= 0:
                 print("[LIVE] No balance available!")
@@ -326,7 +448,8 @@ class LiveTradingSession:
             reduce_only = is_reducing
             print(f"[LIVE] Placing {side.upper()} market order: {trade_qty} {symbol} (reduceOnly={reduce_only})")
             
-            order = self.exchange.create_market_order(
+            order = self._call(
+                'create_market_order',
                 symbol=self.symbol,
                 side=side,
                 amount=trade_qty,
@@ -361,9 +484,11 @@ class LiveTradingSession:
                 self.realized_pnl += step_realized_pnl
             
             # 10. Get updated position
-            time.sleep(0.5)  # Small delay for exchange to update
-            new_pos = self._fetch_position()
-            new_balance = self._fetch_balance()
+            with timed('live_settle_wait'):
+                time.sleep(0.5)  # Small delay for exchange to update
+            state = self.refresh(force=True)
+            new_pos = state['position']
+            new_balance = state['balance']
             new_leverage = new_pos['notional'] / new_balance if new_balance > 0 else 0
             
             if new_pos['side'] == 'short':
@@ -383,7 +508,7 @@ class LiveTradingSession:
                   f"Fee: ${fee_cost:.2f} | Realized: ${step_realized_pnl:.2f} | "
                   f"Position: {position_type} {abs(new_leverage):.2f}x")
             
-            self.history.append({
+            self.journal.record({
                 'timestamp': time.strftime('%H:%M:%S'),
                 'type': position_type,
                 'price': avg_price,
@@ -394,7 +519,7 @@ class LiveTradingSession:
                 'net_worth': round(new_balance, 2),
                 'leverage': round(new_leverage, 2)
             })
-            self._save_history()
+            self.performance.on_fill(step_realized_pnl, fee_cost)
             
             return f"{position_type} {abs(new_leverage):.1f}x"
             
@@ -405,7 +530,8 @@ class LiveTradingSession:
                 try:
                     retry_qty = float(self.exchange.amount_to_precision(self.symbol, trade_qty * 0.95))
                     print(f"[LIVE] Retrying {side.upper()} {retry_qty} {symbol}")
-                    self.exchange.create_market_order(self.symbol, side, retry_qty)
+                    self._call('create_market_order', self.symbol, side, retry_qty)
+                    self.invalidate()
                     return f"RETRY {side} OK"
                 except Exception as retry_e:
                     print(f"[LIVE] Retry failed: {retry_e}")
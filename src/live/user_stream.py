@@ -0,0 +1,98 @@
+"""
+Binance Futures user-data stream (ACCOUNT_UPDATE / ORDER_TRADE_UPDATE).
+One listen key per account; the AccountState shared by its LiveTradingSessions subscribes
+and patches the cached balance/positions from the events instead of polling private REST endpoints.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+
+USE_TESTNET = os.getenv('USE_TESTNET', 'True').lower() == 'true'
+USER_STREAM_URL = os.getenv('BINANCE_USER_STREAM_URL',
+                            'wss://fstream.binancefuture.com' if USE_TESTNET else 'wss://fstream.binance.com')
+KEEPALIVE_SECONDS = 30 * 60  # listen keys expire after 60 minutes without a keepalive
+
+
+class UserDataStream:
+    def __init__(self, exchange, url=None):
+        self.exchange = exchange  # authenticated ccxt client (listen key endpoints)
+        self.url = url or USER_STREAM_URL
+        self.listeners = []
+        self.listen_key = None
+        self.connected = False
+        self.last_message_time = 0.0
+        self.running = False
+        self.thread = None
+
+    def subscribe(self, callback):
+        """callback(event_dict) is called on the stream thread for every event."""
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._thread_main, daemon=True)
+        self.thread.start()
+        print("[UserStream] Started user data stream")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        print("[UserStream] Stopped user data stream")
+
+    def is_live(self):
+        """True while connected; a quiet account sends no events, so silence is not staleness."""
+        return self.connected
+
+    def _thread_main(self):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            loop.close()
+
+    async def _run(self):
+        import websockets
+
+        backoff = 1.0
+        while self.running:
+            try:
+                self.listen_key = self.exchange.fapiPrivatePostListenKey()['listenKey']
+                last_keepalive = time.time()
+                async with websockets.connect(f"{self.url}/ws/{self.listen_key}", ping_interval=20) as ws:
+                    print("[UserStream] Connected")
+                    self.connected = True
+                    backoff = 1.0
+                    while self.running:
+                        if time.time() - last_keepalive > KEEPALIVE_SECONDS:
+                            self.exchange.fapiPrivatePutListenKey()
+                            last_keepalive = time.time()
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.handle_message(json.loads(raw))
+            except Exception as e:
+                self.connected = False
+                if not self.running: break
+                print(f"[UserStream] Connection error: {e}. Reconnecting in {backoff:.0f}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+        self.connected = False
+
+    def handle_message(self, msg):
+        self.last_message_time = time.time()
+        if msg.get('e') == 'listenKeyExpired':
+            raise ConnectionError("listen key expired")
+        for callback in list(self.listeners):
+            try:
+                callback(msg)
+            except Exception as e:
+                print(f"[UserStream] Listener error: {e}")
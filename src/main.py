@@ -1,36 +1,48 @@
 import time
 import os
 import threading
-import subprocess
-import sys
+from contextlib import nullcontext
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
 import ccxt
-from stable_baselines3 import PPO
 
 from src.data.fetcher import BinanceDataFetcher
 from src.data.processor import DataProcessor
 from src.data.collector import DataCollector
+from src.data.journal import TradeJournal, journal_path_for
+from src.performance import PerformanceTracker, CYCLES_PER_YEAR
+from src.data.incremental import IncrementalFeatureEngine
+from src.data.stream import MarketDataStream
+from src.agent.model_manager import ModelWatcher, start_training_process
+from src.metrics import CycleTimer, start_metrics_server
+# TradingEnv uses exactly these 7 + 5 feature columns (total 14 with state)
+from src.env.observation import OBS_FEATURE_COLUMNS, build_observation
+from src.env.fills import COMMISSION_RATE, MIN_TRADE_VALUE
 
 # Load Environment Variables
 load_dotenv()
 
-from src.live.trader import LiveTradingSession
+from src.live.trader import LiveTradingSession, create_trading_exchange
+from src.live.user_stream import UserDataStream
 
 # Configuration
 SYMBOL = os.getenv('SYMBOL', 'BTC/USDT')
 TIMEFRAME = os.getenv('TIMEFRAME', '5m')
 USE_TESTNET = os.getenv('USE_TESTNET', 'True').lower() == 'true'
 LIVETRADING = os.getenv('LIVETRADING', 'False').lower() == 'true'
+USE_WEBSOCKET = os.getenv('USE_WEBSOCKET', 'False').lower() == 'true'
 MODEL_PATH = "models/ppo_trading_bot"
 LOOKBACK_WINDOW = 50
 MAX_LEVERAGE = 20.0
-COMMISSION_RATE = 0.0005
 RETRAIN_INTERVAL = 2 * 60 * 60 # 2 Hours
 
+# Candles fetched when (re)seeding the incremental feature engine.
+SEED_LIMITS = {'15m': 100, '1h': 50, '1m': 1000, '5m': 200}
+
+
 class PaperTradingSession:
-    def __init__(self, initial_balance=10000.0):
+    def __init__(self, initial_balance=10000.0, history_file="paper_trades.json"):
         self.initial_balance = initial_balance
         self.balance = initial_balance # Cash Balance (minus fees)
         self.net_worth = initial_balance # Equity
@@ -39,27 +51,10 @@ class PaperTradingSession:
         self.current_leverage = 0.0
         self.realized_pnl = 0.0   # Cumulative realized PnL
         self.total_fees = 0.0     # Cumulative fees paid
-        self.history_file = "paper_trades.json"
-        self.history = self._load_history()
-
-    def _load_history(self):
-        import json
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Failed to load history: {e}")
-                return []
-        return []
-
-    def _save_history(self):
-        import json
-        try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.history, f, indent=4)
-        except Exception as e:
-            print(f"Failed to save history: {e}")
+        self.history_file = history_file
+        self.journal = TradeJournal(journal_path_for(history_file), migrate_from=history_file)
+        self.performance = PerformanceTracker(periods_per_year=CYCLES_PER_YEAR)
+        self.performance.load_totals(self.journal.totals())
 
     def execute_target_leverage(self, target_leverage, current_price, symbol):
         """
@@ -80,7 +75,7 @@ class PaperTradingSession:
         trade_value = target_position_value - current_position_value
         
         # Avoid dust trades (e.g. less than $10 change as requested)
-        if abs(trade_value) < 10.0:
+        if abs(trade_value) < MIN_TRADE_VALUE:
             print(f"Skipping small trade: ${trade_value:.2f} (Minimum $10 required)")
             return f"HOLD (Target {target_leverage:.2f}x)"
             
@@ -143,7 +138,7 @@ class PaperTradingSession:
         
         print(f"Trade: {position_type} {abs(self.current_leverage):.2f}x | Fee: {fee:.2f} | Realized: {step_realized_pnl:.2f} | Unrealized: {unrealized:.2f} | Price: {current_price:.2f}")
         
-        self.history.append({
+        self.journal.record({
             'timestamp': time.strftime('%H:%M:%S'),
             'type': position_type,
             'price': current_price,
@@ -154,7 +149,7 @@ class PaperTradingSession:
             'net_worth': round(self.net_worth, 2),
             'leverage': round(self.current_leverage, 2)
         })
-        self._save_history()
+        self.performance.on_fill(step_realized_pnl, fee)
         
         return f"{position_type} {abs(self.current_leverage):.1f}x"
 
@@ -208,59 +203,95 @@ class PaperTradingSession:
             return (self.entry_price - current_price) * abs(self.held_quantity)
 
     def get_win_rate(self):
-        if not self.history:
-            return 0.0
-        
-        wins = sum(1 for trade in self.history if trade['realized_pnl'] > 0)
-        total = len(self.history)
-        return (wins / total) * 100.0
+        return self.performance.win_rate()
 
 class TradingBot:
-    def __init__(self):
+    def __init__(self, symbol=SYMBOL, exchange=None, trade_exchange=None, inference=None, history_file=None, user_stream=None,
+                 allocation=1.0):
+        """
+        Standalone by default. The multi-symbol orchestrator passes shared exchange clients,
+        a shared InferenceServer, user-data stream, a per-symbol history file and the symbol's
+        share of the live account balance (allocation), and drives step() itself.
+        """
+        self.symbol = symbol
         self.running = False
         self.thread = None
+        self.user_stream = None  # only set when this bot owns (starts/stops) the stream
         
         if LIVETRADING:
             print("🚀 INITIALIZING LIVE TRADING SESSION")
-            self.paper_session = LiveTradingSession(symbol=SYMBOL, max_leverage=MAX_LEVERAGE)
+            if trade_exchange is None:
+                trade_exchange = create_trading_exchange()
+            if user_stream is None and USE_WEBSOCKET:
+                # Account/position pushes keep the session's cached state current
+                user_stream = self.user_stream = UserDataStream(trade_exchange)
+            self.paper_session = LiveTradingSession(symbol=symbol, max_leverage=MAX_LEVERAGE, exchange=trade_exchange,
+                                                    history_file=history_file or "live_trades.json", user_stream=user_stream,
+                                                    allocation=allocation)
         else:
             print("📝 Initializing Paper Trading Session")
-            self.paper_session = PaperTradingSession(initial_balance=10000.0)
+            self.paper_session = PaperTradingSession(initial_balance=10000.0, history_file=history_file or "paper_trades.json")
             
-        self.fetcher = BinanceDataFetcher(symbol=SYMBOL, timeframe=TIMEFRAME, limit=100, testnet=USE_TESTNET, use_keys=True) # Enable keys for advanced data
+        self.fetcher = BinanceDataFetcher(symbol=symbol, timeframe=TIMEFRAME, limit=100, testnet=USE_TESTNET, use_keys=True, exchange=exchange) # Enable keys for advanced data
         self.processor = DataProcessor(pd.DataFrame())
+        self.feature_engine = IncrementalFeatureEngine(base_timeframe='5m', timeframes=('15m', '1h', '1m'), lookback=LOOKBACK_WINDOW)
+        
+        # Websocket market data (kline/depth/markPrice), shared with the collector
+        self.stream = MarketDataStream(symbol=symbol, fetcher=self.fetcher, buffer_size=max(SEED_LIMITS.values())) if USE_WEBSOCKET else None
         
         # Data Collector (Background Service)
-        self.collector = DataCollector(symbol=SYMBOL)
+        self.collector = DataCollector(symbol=symbol, stream=self.stream, exchange=exchange)
         
         # GUI State
         self.current_price = 0.0
         self.current_action = "STOPPED"
-        self.current_action = "STOPPED"
         self.last_update_time = "N/A"
+        self.book_features = None  # latest local order book features (websocket mode)
         self.last_retrain_time = time.time()
         
-        # Load Model
-        if os.path.exists(MODEL_PATH + ".zip"):
-            self.model = PPO.load(MODEL_PATH)
-            self.model_timestamp = os.path.getmtime(MODEL_PATH + ".zip")
+        # Action Smoothing State
+        self.ema_leverage = self.paper_session.current_leverage
+        self.smoothing_alpha = 0.3 # Smoothing factor (0 to 1)
+        
+        # Called when a position is fully closed (standalone: retrain in the background)
+        self.on_trade_closed = self._trigger_retrain
+        
+        self.inference = inference
+        self.retrain_process = None # Track background training process
+        self.model = None
+        self.model_timestamp = 0
+        if inference is not None:
+            # Model is owned (loaded and hot-reloaded) by the caller
+            self.model_watcher = None
+            return
+        
+        # Load Model (later checkpoints are loaded in the background and swapped in between cycles)
+        self.model_watcher = ModelWatcher(MODEL_PATH)
+        loaded = self.model_watcher.load_now()
+        if loaded:
+            self.model, self.model_timestamp = loaded
             print(f"Model loaded successfully (Timestamp: {self.model_timestamp})")
         else:
-            self.model = None
-            self.model_timestamp = 0
             print(f"Model not found at {MODEL_PATH}")
-            
-        self.retrain_process = None # Track background training process
 
     def start(self):
         if self.running: return
         self.running = True
         
+        # Start Market Data Stream
+        if self.stream:
+            self.stream.start()
+        if self.user_stream:
+            self.user_stream.start()
+        
         # Start Collector
         self.collector.start()
+        start_metrics_server()
+        if self.model_watcher:
+            self.model_watcher.start()
         
-        # Start Self-Play Training
-        self.self_play_process = subprocess.Popen([sys.executable, "src/agent/train.py"])
+        # Start Self-Play Training (low priority, runs alongside trading)
+        self.self_play_process = start_training_process("src/agent/train.py")
         print(f"✅ Self-Play training started (PID: {self.self_play_process.pid}).")
         
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
@@ -272,6 +303,14 @@ class TradingBot:
         
         # Stop Collector
         self.collector.stop()
+        if self.stream:
+            self.stream.stop()
+        if LIVETRADING:
+            self.paper_session.stop()
+        if self.user_stream:
+            self.user_stream.stop()
+        if self.model_watcher:
+            self.model_watcher.stop()
         
         print("Bot stop signal sent.")
         self.current_action = "STOPPED"
@@ -291,45 +330,67 @@ class TradingBot:
             'realized_pnl': self.paper_session.realized_pnl,
             'unrealized_pnl': unrealized,
             'total_fees': self.paper_session.total_fees,
-            'action': "TRAINING..." if is_training else self.current_action,
+            'action': self.current_action,
             'last_update': self.last_update_time,
-            'next_retrain': "ON EXIT"
+            'next_retrain': "TRAINING..." if is_training else "ON EXIT",
+            'order_book': self.book_features
         }
 
+    def _sync_feature_engine(self):
+        """
+        Feeds the incremental feature engine with only the candles it hasn't seen yet.
+        A timeframe is re-seeded from scratch on first use or after a long gap.
+        """
+        now_ms = int(time.time() * 1000)
+        plan = {}
+        for tf, seed_limit in SEED_LIMITS.items():
+            behind = self.feature_engine.bars_behind(tf, now_ms)
+            if behind is None or behind + 2 > seed_limit:
+                plan[tf] = (True, seed_limit)
+            else:
+                # Last seen (possibly still forming) candle + everything opened since
+                plan[tf] = (False, behind + 2)
+        
+        with self._stage('fetch'):
+            frames = self._fetch_candles({tf: limit for tf, (_, limit) in plan.items()})
+        with self._stage('features'):
+            for tf, (reseed, _) in plan.items():
+                if reseed:
+                    self.feature_engine.seed(tf, frames[tf])
+                else:
+                    self.feature_engine.update(tf, frames[tf])
+
+    def _fetch_candles(self, limits):
+        """
+        Reads candles from the websocket buffers when they are live;
+        everything else is fetched from REST with all timeframes in parallel.
+        """
+        frames = {}
+        stream_ok = self.stream is not None and self.stream.is_fresh()
+        for tf, limit in limits.items():
+            if stream_ok and self.stream.has_candles(tf, limit):
+                frames[tf] = self.stream.get_ohlcv(tf, limit=limit)
+        missing = {tf: limit for tf, limit in limits.items() if tf not in frames}
+        if missing:
+            frames.update(self.fetcher.fetch_multi_timeframes(list(missing), limit=missing))
+        return frames
+
     def _get_latest_observation(self, lookback=50):
-        # 1. Fetch Multi-Timeframe Data
-        # We fetch a bit more for other TFs to ensure alignment
-        df_5m = self.fetcher.fetch_ohlcv(timeframe='5m', limit=200)
-        others = {
-            '15m': self.fetcher.fetch_ohlcv(timeframe='15m', limit=100),
-            '1h': self.fetcher.fetch_ohlcv(timeframe='1h', limit=50),
-            '1m': self.fetcher.fetch_ohlcv(timeframe='1m', limit=1000)
-        }
-        
-        # 2. Process and Merge
-        self.processor = DataProcessor(df_5m)
-        df_base = self.processor.add_technical_indicators()
-        df_base = self.processor.normalize_features() # Apply Normalization to match training
-        
-        df_merged = DataProcessor.merge_timeframes(df_base, others)
-        
-        if len(df_merged) < lookback: 
-            print(f"Warning: Not enough data points ({len(df_merged)} < {lookback})")
+        # 1. Update the multi-timeframe features incrementally
+        # (same values as add_technical_indicators -> normalize_features -> merge_timeframes)
+        self._sync_feature_engine()
+        with self._stage('features'):
+            obs_data = self.feature_engine.feature_matrix(OBS_FEATURE_COLUMNS, lookback)
+        
+        if obs_data is None: 
+            print(f"Warning: Not enough data points (< {lookback})")
             return None
             
-        frame = df_merged.iloc[-lookback:]
-        # Save raw close price BEFORE selecting normalized features
-        self.current_price = frame.iloc[-1]['close'] # Raw price for trading logic
-        
-        # 3. Construct Observation - MUST match TradingEnv._next_observation() exactly
-        # TradingEnv uses exactly these 7 + 5 feature columns (total 14 with state)
-        feature_cols = [
-            'close_pct', 'high_pct', 'low_pct', 'volume_pct', 'rsi', 'macd', 'bb_position',
-            'close_pct_1m', 'volume_pct_1m', 'rsi_1m', 'macd_1m', 'bb_position_1m'
-        ]
-        # print(f"DEBUG: feature_cols length: {len(feature_cols)}")
-        # print(f"DEBUG: feature_cols: {feature_cols}")
-        obs_data = frame[feature_cols].values
+        # Raw price for trading logic
+        self.current_price = self.feature_engine.latest_close()
+        # Order book features are a read of the stream's latest snapshot; the policy was
+        # trained without them, so they are reported but not part of the observation
+        self.book_features = self.stream.get_book_features() if self.stream is not None else None
         
         # State Features
         unrealized_pnl_ratio = 0.0
@@ -343,29 +404,15 @@ class TradingBot:
         
         current_lev_norm = self.paper_session.current_leverage / MAX_LEVERAGE
         
-        lev_array = np.full((lookback, 1), current_lev_norm)
-        pnl_array = np.full((lookback, 1), unrealized_pnl_ratio)
-        
-        # Stack: [7 features] + [leverage] + [pnl] = 9 features
-        obs = np.hstack((obs_data, lev_array, pnl_array))
-        
-        # Replace NaN with 0 (same as TradingEnv)
-        obs = np.nan_to_num(obs)
-                
-        return obs.astype(np.float32)
+        # [12 features] + [leverage] + [pnl] = 14 features, NaN -> 0, float32 (same layout as TradingEnv)
+        return build_observation(obs_data, current_lev_norm, unrealized_pnl_ratio)
 
     def _check_and_reload_model(self):
-        try:
-            path = MODEL_PATH + ".zip"
-            if os.path.exists(path):
-                mod_time = os.path.getmtime(path)
-                if mod_time > self.model_timestamp:
-                    print(f"🔄 Model file changed. Reloading from {path}...")
-                    self.model = PPO.load(MODEL_PATH)
-                    self.model_timestamp = mod_time
-                    print("✅ Model hot-reloaded successfully.")
-        except Exception as e:
-            print(f"⚠️ Failed to reload model: {e}")
+        """Swaps in a checkpoint the watcher has already loaded and warmed up (no disk I/O here)."""
+        loaded = self.model_watcher.take() if self.model_watcher else None
+        if loaded:
+            self.model, self.model_timestamp = loaded
+            print(f"✅ Model hot-swapped (Timestamp: {self.model_timestamp})")
 
     def _trigger_retrain(self):
         """Starts the retraining process in background"""
@@ -375,71 +422,89 @@ class TradingBot:
 
         print("🚀 Triggering Event-Based Retraining...")
         try:
-            self.retrain_process = subprocess.Popen([sys.executable, "src/agent/retrainer.py"])
+            self.retrain_process = start_training_process("src/agent/retrainer.py")
             print(f"✅ Background retraining started (PID: {self.retrain_process.pid}).")
         except Exception as e:
             print(f"❌ Failed to start retraining: {e}")
 
-    def _run_loop(self):
-        # Action Smoothing State
-        ema_leverage = self.paper_session.current_leverage
-        alpha = 0.3 # Smoothing factor (0 to 1)
+    def _predict(self, obs):
+        """Raw policy action in [-1, 1] (batched through the InferenceServer when one is shared)."""
+        if self.inference is not None:
+            return self.inference.predict('default', obs)
+        action, _ = self.model.predict(obs)
+        return action
+
+    def _stage(self, name):
+        """Times a block as a stage of the current cycle (no-op outside step())."""
+        cycle = getattr(self, '_cycle', None)
+        return cycle.stage(name) if cycle is not None else nullcontext()
+
+    def step(self):
+        """One trading cycle, with per-stage timings recorded and logged (see src/metrics.py)."""
+        cycle = self._cycle = CycleTimer(self.symbol)
+        try:
+            self._step()
+        finally:
+            self._cycle = None
+            cycle.finish()
+
+    def _step(self):
+        """One trading cycle: observe, predict, smooth, execute."""
+        self.last_update_time = time.strftime('%H:%M:%S')
+        print(f"--- Cycle at {self.last_update_time} ({self.symbol}) ---")
+        
+        obs = self._get_latest_observation(lookback=LOOKBACK_WINDOW)
+        has_model = 'default' in self.inference.policies if self.inference is not None else self.model is not None
+        
+        if obs is None or not has_model:
+            print(f"Skipping: obs is {'None' if obs is None else 'OK'}, model is {'OK' if has_model else 'None'}")
+            return
+        
+        # Predict Continuous Action
+        with self._stage('predict'):
+            action = self._predict(obs)
+        
+        # action is array [-1, 1]
+        raw_target_leverage = float(action[0]) * MAX_LEVERAGE
+        
+        # Apply Smoothing (EMA)
+        alpha = self.smoothing_alpha
+        self.ema_leverage = (alpha * raw_target_leverage) + ((1 - alpha) * self.ema_leverage)
         
+        print(f"Price: {self.current_price:.2f} | Raw Target: {raw_target_leverage:.2f}x | Smoothed: {self.ema_leverage:.2f}x")
+        
+        # Track Previous State
+        prev_qty = self.paper_session.held_quantity
+
+        # Execute
+        with self._stage('execute'):
+            action_msg = self.paper_session.execute_target_leverage(self.ema_leverage, self.current_price, self.symbol)
+        self.current_action = action_msg
+        self.paper_session.performance.on_equity(self.paper_session.net_worth, self.paper_session.current_leverage)
+        print(f"Action result: {action_msg}")
+
+        # Track New State
+        curr_qty = self.paper_session.held_quantity
+
+        # EVENT: Trade Closed (Was holding, now 0)
+        if abs(prev_qty) > 0 and abs(curr_qty) == 0:
+            print("🎉 TRADE CLOSED! Triggering Retraining...")
+            self.on_trade_closed()
+
+    def _run_loop(self):
         while self.running:
             try:
-                # 1. Blocking Check: Pause if training
-                if self.retrain_process:
-                    if self.retrain_process.poll() is None:
-                        # process is still running
-                        self.current_action = "TRAINING..."
-                        print(f"⏳ Training in progress... Trading Paused. (PID: {self.retrain_process.pid})")
-                        time.sleep(10)
-                        continue
-                    else:
-                        # process finished
-                        print("✅ Training process finished.")
-                        self.retrain_process = None
-                        # proceeding to reload model below
+                # 1. Retraining runs alongside trading; the current policy keeps trading until
+                # the watcher has the new checkpoint ready
+                if self.retrain_process and self.retrain_process.poll() is not None:
+                    print(f"✅ Training process finished (exit code {self.retrain_process.returncode}).")
+                    self.retrain_process = None
 
-                self.last_update_time = time.strftime('%H:%M:%S')
-                print(f"--- Cycle at {self.last_update_time} ---")
-                
-                # Check for model update
+                # Swap in a new model between cycles
                 self._check_and_reload_model()
                 # self._check_auto_retrain() # REMOVED: Time-based
                 
-                obs = self._get_latest_observation(lookback=LOOKBACK_WINDOW)
-                
-                if obs is not None and self.model:
-                    # Predict Continuous Action
-                    action, _ = self.model.predict(obs)
-                    
-                    # action is array [-1, 1]
-                    raw_target_leverage = float(action[0]) * MAX_LEVERAGE
-                    
-                    # Apply Smoothing (EMA)
-                    ema_leverage = (alpha * raw_target_leverage) + ((1 - alpha) * ema_leverage)
-                    
-                    print(f"Price: {self.current_price:.2f} | Raw Target: {raw_target_leverage:.2f}x | Smoothed: {ema_leverage:.2f}x")
-                    
-                    # Track Previous State
-                    prev_qty = self.paper_session.held_quantity
-
-                    # Execute
-                    action_msg = self.paper_session.execute_target_leverage(ema_leverage, self.current_price, SYMBOL)
-                    self.current_action = action_msg
-                    print(f"Action result: {action_msg}")
-
-                    # Track New State
-                    curr_qty = self.paper_session.held_quantity
-
-                    # EVENT: Trade Closed (Was holding, now 0)
-                    if abs(prev_qty) > 0 and abs(curr_qty) == 0:
-                        print("🎉 TRADE CLOSED! Triggering Retraining...")
-                        self._trigger_retrain()
-
-                else:
-                    print(f"Skipping: obs is {'None' if obs is None else 'OK'}, model is {'None' if self.model is None else 'OK'}")
+                self.step()
                 
                 # Slower cycle: Wait 10 seconds
                 for _ in range(10): 
@@ -0,0 +1,273 @@
+"""
+Lightweight latency / size histograms shared by the bot's services, plus the
+process-wide registry behind the /metrics endpoint: per-stage cycle timers,
+REST call / request-weight counters and structured (optionally JSON) event logs.
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Seconds, roughly log-spaced from 100us to 30s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class Histogram:
+    """
+    Cumulative bucket counts (Prometheus style) plus a ring buffer of the most
+    recent samples for rolling percentiles. Thread-safe.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def percentile(self, q):
+        """q in [0, 100] over the rolling window (None if empty)."""
+        with self._lock:
+            if not self.recent:
+                return None
+            samples = np.fromiter(self.recent, dtype=np.float64, count=len(self.recent))
+        return float(np.percentile(samples, q))
+
+    def snapshot(self):
+        with self._lock:
+            count, total = self.count, self.sum
+            cumulative = list(np.cumsum(self.counts))
+            samples = np.fromiter(self.recent, dtype=np.float64, count=len(self.recent))
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'p50': float(np.percentile(samples, 50)) if len(samples) else None,
+            'p99': float(np.percentile(samples, 99)) if len(samples) else None,
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], cumulative)),
+        }
+
+
+# --- Registry, stage timers and REST accounting ---
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))  # 0 disables the /metrics endpoint
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()    # 'json': one JSON object per event line
+SLOW_CALL_SECONDS = float(os.getenv('SLOW_CALL_SECONDS', '2.0'))
+CYCLE_BUDGET_SECONDS = 10.0
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """Process-wide named histograms and counters with Prometheus-style labels."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            return self.histograms[key]
+
+    def register(self, name, histogram, **labels):
+        """Exposes an existing Histogram (e.g. a component's own) under `name`."""
+        with self._lock:
+            self.histograms[self._key(name, labels)] = histogram
+        return histogram
+
+    def counter(self, name, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.counters:
+                self.counters[key] = Counter()
+            return self.counters[key]
+
+    def render(self):
+        """Prometheus text exposition format (rolling p50/p99 as <name>_rolling{quantile=...})."""
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}' if items else ''
+
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines, rolling = [], {}
+        typed = set()
+        for (name, labels), counter in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{fmt(labels)} {counter.value:g}")
+        for (name, labels), hist in histograms:
+            snap = hist.snapshot()
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for le, count in snap['buckets'].items():
+                lines.append(f"{name}_bucket{fmt(labels, [('le', le)])} {count}")
+            lines.append(f"{name}_sum{fmt(labels)} {snap['sum']:g}")
+            lines.append(f"{name}_count{fmt(labels)} {snap['count']}")
+            for q, key in (('0.5', 'p50'), ('0.99', 'p99')):
+                if snap[key] is not None:
+                    rolling.setdefault(f"{name}_rolling", []).append(
+                        f"{name}_rolling{fmt(labels, [('quantile', q)])} {snap[key]:g}")
+        # Each metric family must be contiguous, so the rolling percentiles follow as gauges
+        for name, samples in rolling.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def log_event(event, **fields):
+    """Structured event: a JSON line with LOG_FORMAT=json, otherwise a compact [Metrics] line."""
+    if LOG_FORMAT == 'json':
+        print(json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str), flush=True)
+    else:
+        text = ' '.join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in fields.items())
+        print(f"[Metrics] {event} {text}")
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Times a block with the monotonic clock into stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.histogram('stage_seconds', stage=stage, **labels).observe(time.perf_counter() - start)
+
+
+def record_rest_call(method, weight, seconds, error=False):
+    """Counts one ccxt REST call: calls, request weight and latency per method."""
+    REGISTRY.counter('rest_calls_total', method=method).inc()
+    REGISTRY.counter('rest_weight_total', method=method).inc(weight)
+    if error:
+        REGISTRY.counter('rest_errors_total', method=method).inc()
+    REGISTRY.histogram('rest_call_seconds', method=method).observe(seconds)
+    if seconds > SLOW_CALL_SECONDS:
+        log_event('slow_call', method=method, seconds=seconds, weight=weight)
+
+
+def instrumented_call(exchange, limiter, method, weight, *args, **kwargs):
+    """limiter.acquire(weight), then exchange.<method>(...) timed and counted."""
+    limiter.acquire(weight)
+    start = time.perf_counter()
+    try:
+        result = getattr(exchange, method)(*args, **kwargs)
+    except Exception:
+        record_rest_call(method, weight, time.perf_counter() - start, error=True)
+        raise
+    record_rest_call(method, weight, time.perf_counter() - start)
+    return result
+
+
+class CycleTimer:
+    """
+    Per-cycle stage breakdown. stage() blocks add to this cycle's totals and to
+    stage_seconds{stage, symbol}; finish() records trading_cycle_seconds and logs the cycle
+    (with an overrun event when it exceeds the budget).
+    """
+
+    def __init__(self, symbol, budget=CYCLE_BUDGET_SECONDS):
+        self.symbol = symbol
+        self.budget = budget
+        self.stages = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            REGISTRY.histogram('stage_seconds', stage=name, symbol=self.symbol).observe(elapsed)
+
+    def finish(self):
+        total = time.perf_counter() - self.start
+        REGISTRY.histogram('trading_cycle_seconds', symbol=self.symbol).observe(total)
+        fields = {'symbol': self.symbol, 'total': total}
+        fields.update(self.stages)
+        if total > self.budget:
+            REGISTRY.counter('trading_cycle_overruns_total', symbol=self.symbol).inc()
+            log_event('cycle_overrun', budget=self.budget, **fields)
+        else:
+            log_event('cycle', **fields)
+        return total
+
+
+# --- /metrics endpoint ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Starts the process-wide /metrics endpoint once (no-op when port is 0 or already running)."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"[Metrics] Could not bind {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-http").start()
+            print(f"[Metrics] Serving http://{host}:{_server.server_address[1]}/metrics")
+        return _server
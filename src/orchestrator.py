@@ -0,0 +1,195 @@
+"""
+Runs the trading loop for many symbols in one process.
+Every symbol keeps its own session, feature engine and collector, while the ccxt
+clients, the request-weight budget and the policy (via the batched InferenceServer)
+are shared, so adding a symbol costs one set of candle requests and one row in a batch.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.main import TradingBot, SYMBOL, LIVETRADING, USE_WEBSOCKET, MODEL_PATH
+from src.data.fetcher import create_public_exchange
+from src.live.trader import create_trading_exchange
+from src.live.user_stream import UserDataStream
+from src.agent.inference import InferenceServer
+from src.agent.model_manager import ModelWatcher, start_training_process
+from src.metrics import REGISTRY, start_metrics_server
+
+SYMBOLS = [s.strip() for s in os.getenv('SYMBOLS', SYMBOL).split(',') if s.strip()]
+ORCHESTRATOR_WORKERS = int(os.getenv('ORCHESTRATOR_WORKERS', '8'))
+CYCLE_SECONDS = 10
+# Relative share of the live account per symbol ('BTC/USDT:2,ETH/USDT:1'); unlisted symbols weigh 1
+SYMBOL_WEIGHTS = os.getenv('SYMBOL_WEIGHTS', '')
+
+
+def symbol_allocations(symbols, spec=SYMBOL_WEIGHTS):
+    """
+    {symbol: fraction of the account balance}, summing to 1. Live sessions share one account,
+    so each sizes its leverage against its own fraction and the combined position stays
+    within MAX_LEVERAGE x the account.
+    """
+    weights = {s: 1.0 for s in symbols}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        symbol, _, weight = item.rpartition(':')
+        symbol = symbol.strip()
+        if symbol not in weights:
+            raise ValueError(f"SYMBOL_WEIGHTS names {symbol!r}, which is not in SYMBOLS")
+        weights[symbol] = float(weight)
+        if weights[symbol] < 0:
+            raise ValueError(f"SYMBOL_WEIGHTS: negative weight for {symbol}")
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("SYMBOL_WEIGHTS: weights sum to zero")
+    return {s: w / total for s, w in weights.items()}
+
+
+def history_file_for(symbol):
+    prefix = "live_trades" if LIVETRADING else "paper_trades"
+    return f"{prefix}_{symbol.replace('/', '')}.json"
+
+
+class TradingOrchestrator:
+    def __init__(self, symbols=SYMBOLS, max_workers=ORCHESTRATOR_WORKERS, cycle_seconds=CYCLE_SECONDS):
+        self.symbols = list(symbols)
+        self.cycle_seconds = cycle_seconds
+        self.running = False
+        self.thread = None
+
+        # Shared clients: one public (market data) and one private (orders) connection pool
+        self.exchange = create_public_exchange()
+        self.trade_exchange = create_trading_exchange() if LIVETRADING else None
+        # One listen key per account; every live session subscribes to it
+        self.user_stream = UserDataStream(self.trade_exchange) if LIVETRADING and USE_WEBSOCKET else None
+        self.inference = InferenceServer()
+        # The InferenceServer batches torch policies, so this watcher always loads the SB3 checkpoint
+        self.model_watcher = ModelWatcher(MODEL_PATH, device=self.inference.device, runtime='sb3')
+        self.model_timestamp = 0
+
+        # Every live session trades the same account balance: split it between the symbols
+        self.allocations = symbol_allocations(self.symbols)
+        self.bots = {}
+        for symbol in self.symbols:
+            bot = TradingBot(symbol=symbol, exchange=self.exchange, trade_exchange=self.trade_exchange,
+                             inference=self.inference, history_file=history_file_for(symbol),
+                             user_stream=self.user_stream, allocation=self.allocations[symbol])
+            bot.on_trade_closed = self._trigger_retrain
+            self.bots[symbol] = bot
+
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.symbols))), thread_name_prefix="symbol")
+        # Recorded by TradingBot.step() (with its per-stage breakdown) and served on /metrics
+        self.cycle_latency = {symbol: REGISTRY.histogram('trading_cycle_seconds', symbol=symbol) for symbol in self.symbols}
+        self.last_cycle_seconds = 0.0
+        self.retrain_process = None
+        self.self_play_process = None
+
+    def start(self):
+        if self.running: return
+        self.running = True
+
+        self._swap_model(self.model_watcher.load_now())
+        self.model_watcher.start()
+        self.inference.start()
+        start_metrics_server()
+        if self.user_stream:
+            self.user_stream.start()
+        for bot in self.bots.values():
+            bot.running = True
+            if bot.stream:
+                bot.stream.start()
+            bot.collector.start()
+
+        self.self_play_process = start_training_process("src/agent/train.py")
+        print(f"✅ Self-Play training started (PID: {self.self_play_process.pid}).")
+
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        print(f"[Orchestrator] Started {len(self.bots)} symbols: {', '.join(self.symbols)}")
+
+    def stop(self):
+        self.running = False
+        for bot in self.bots.values():
+            bot.running = False
+            bot.collector.stop()
+            if bot.stream:
+                bot.stream.stop()
+            if LIVETRADING:
+                bot.paper_session.stop()
+            bot.current_action = "STOPPED"
+        self.inference.stop()
+        self.model_watcher.stop()
+        if self.user_stream:
+            self.user_stream.stop()
+        print("[Orchestrator] Stop signal sent.")
+
+    def get_status(self):
+        """Per-symbol bot status plus cycle latency (seconds)."""
+        status = {}
+        for symbol, bot in self.bots.items():
+            s = bot.get_status()
+            latency = self.cycle_latency[symbol]
+            s['cycle_p50'] = latency.percentile(50)
+            s['cycle_p99'] = latency.percentile(99)
+            status[symbol] = s
+        return status
+
+    def _swap_model(self, loaded):
+        """Publishes a loaded + warmed checkpoint to the InferenceServer (between cycles)."""
+        if loaded:
+            model, self.model_timestamp = loaded
+            self.inference.add_policy('default', model.policy)
+            print(f"[Orchestrator] Model swapped in (Timestamp: {self.model_timestamp})")
+
+    def _trigger_retrain(self):
+        if self.retrain_process and self.retrain_process.poll() is None:
+            print("⚠️ Retraining already in progress.")
+            return
+        print("🚀 Triggering Event-Based Retraining...")
+        try:
+            self.retrain_process = start_training_process("src/agent/retrainer.py")
+            for bot in self.bots.values():
+                bot.retrain_process = self.retrain_process
+            print(f"✅ Background retraining started (PID: {self.retrain_process.pid}).")
+        except Exception as e:
+            print(f"❌ Failed to start retraining: {e}")
+
+    def _step_symbol(self, symbol):
+        try:
+            self.bots[symbol].step()
+        except Exception as e:
+            import traceback
+            print(f"[Orchestrator] ERROR in {symbol} cycle: {e}")
+            traceback.print_exc()
+
+    def _run_loop(self):
+        while self.running:
+            cycle_start = time.time()
+            # Retraining runs alongside trading; its checkpoint is swapped in once loaded
+            if self.retrain_process and self.retrain_process.poll() is not None:
+                print(f"✅ Training process finished (exit code {self.retrain_process.returncode}).")
+                self.retrain_process = None
+                for bot in self.bots.values():
+                    bot.retrain_process = None
+
+            self._swap_model(self.model_watcher.take())
+
+            # Symbols step concurrently, so their observations reach the InferenceServer together
+            wait([self.pool.submit(self._step_symbol, symbol) for symbol in self.symbols])
+            self.last_cycle_seconds = time.time() - cycle_start
+            slowest = max(self.symbols, key=lambda s: self.cycle_latency[s].percentile(50) or 0.0)
+            print(f"[Orchestrator] Cycle {self.last_cycle_seconds:.2f}s for {len(self.symbols)} symbols "
+                  f"(slowest p50: {slowest} {self.cycle_latency[slowest].percentile(50):.2f}s)")
+
+            while self.running and time.time() - cycle_start < self.cycle_seconds:
+                time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    orchestrator = TradingOrchestrator()
+    orchestrator.start()
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt: orchestrator.stop()
@@ -0,0 +1,201 @@
+"""
+Trading performance analytics.
+
+PerformanceTracker is updated per fill (win rate, profit factor, fees) and per equity
+tick (rolling Sharpe/Sortino, max drawdown, exposure), each in O(1), so sessions and
+dashboards can read the current numbers at any rate. performance_from_arrays() computes
+the same metrics over backtest arrays, vectorized across candidates.
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+ROLLING_WINDOW = 500        # equity ticks in the rolling Sharpe/Sortino window
+EXPOSURE_THRESHOLD = 0.01   # |leverage| above this counts as in the market
+RESUM_EVERY = 10000         # rebuild the rolling sums from the window to bound float drift
+CYCLES_PER_YEAR = 365 * 24 * 3600 / 10  # live sessions tick once per 10 s trading cycle
+
+
+def _ratio(mean, dev, periods_per_year):
+    if dev <= 0 or not math.isfinite(dev):
+        return 0.0
+    scale = math.sqrt(periods_per_year) if periods_per_year else 1.0
+    return mean / dev * scale
+
+
+class PerformanceTracker:
+    def __init__(self, window=ROLLING_WINDOW, periods_per_year=None):
+        self.window = window
+        self.periods_per_year = periods_per_year
+
+        # Fills
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.total_fees = 0.0
+        self.realized_pnl = 0.0
+
+        # Equity ticks
+        self.ticks = 0
+        self.exposed_ticks = 0
+        self.abs_leverage_sum = 0.0
+        self.last_equity = None
+        self.peak_equity = None
+        self.max_drawdown = 0.0
+        self._returns = deque(maxlen=window)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._down_sumsq = 0.0
+        self._updates = 0
+
+    def load_totals(self, totals):
+        """Seeds the fill statistics from stored aggregates (TradeJournal.totals())."""
+        for key in ('trades', 'wins', 'losses', 'gross_profit', 'gross_loss', 'total_fees', 'realized_pnl'):
+            setattr(self, key, totals.get(key, 0) or 0)
+
+    # --- Updates ---
+
+    def on_fill(self, realized_pnl, fee=0.0):
+        self.trades += 1
+        self.total_fees += fee
+        self.realized_pnl += realized_pnl
+        if realized_pnl > 0:
+            self.wins += 1
+            self.gross_profit += realized_pnl
+        elif realized_pnl < 0:
+            self.losses += 1
+            self.gross_loss -= realized_pnl
+
+    def on_equity(self, net_worth, leverage=0.0):
+        self.ticks += 1
+        if abs(leverage) > EXPOSURE_THRESHOLD:
+            self.exposed_ticks += 1
+        self.abs_leverage_sum += abs(leverage)
+
+        if self.peak_equity is None or net_worth > self.peak_equity:
+            self.peak_equity = net_worth
+        if self.peak_equity > 0:
+            self.max_drawdown = max(self.max_drawdown, 1.0 - net_worth / self.peak_equity)
+
+        if self.last_equity is not None and self.last_equity > 0:
+            self._push_return(net_worth / self.last_equity - 1.0)
+        self.last_equity = net_worth
+
+    def _push_return(self, r):
+        if len(self._returns) == self.window:
+            old = self._returns[0]
+            self._sum -= old
+            self._sumsq -= old * old
+            self._down_sumsq -= min(old, 0.0) ** 2
+        self._returns.append(r)
+        self._sum += r
+        self._sumsq += r * r
+        self._down_sumsq += min(r, 0.0) ** 2
+        self._updates += 1
+        if self._updates % RESUM_EVERY == 0:
+            values = np.fromiter(self._returns, dtype=np.float64)
+            self._sum = float(values.sum())
+            self._sumsq = float((values * values).sum())
+            self._down_sumsq = float((np.minimum(values, 0.0) ** 2).sum())
+
+    # --- Reads ---
+
+    def win_rate(self):
+        return (self.wins / self.trades) * 100.0 if self.trades else 0.0
+
+    def profit_factor(self):
+        if self.gross_loss > 0:
+            return self.gross_profit / self.gross_loss
+        return math.inf if self.gross_profit > 0 else 0.0
+
+    def sharpe(self):
+        n = len(self._returns)
+        if n < 2:
+            return 0.0
+        mean = self._sum / n
+        var = max(self._sumsq / n - mean * mean, 0.0)
+        return _ratio(mean, math.sqrt(var), self.periods_per_year)
+
+    def sortino(self):
+        n = len(self._returns)
+        if n < 2:
+            return 0.0
+        return _ratio(self._sum / n, math.sqrt(self._down_sumsq / n), self.periods_per_year)
+
+    def exposure(self):
+        return self.exposed_ticks / self.ticks if self.ticks else 0.0
+
+    def snapshot(self):
+        return {
+            'trades': self.trades,
+            'win_rate': self.win_rate(),
+            'profit_factor': self.profit_factor(),
+            'realized_pnl': self.realized_pnl,
+            'total_fees': self.total_fees,
+            'sharpe': self.sharpe(),
+            'sortino': self.sortino(),
+            'max_drawdown': self.max_drawdown,
+            'exposure': self.exposure(),
+            'avg_abs_leverage': self.abs_leverage_sum / self.ticks if self.ticks else 0.0,
+        }
+
+
+def performance_from_arrays(equity, leverage=None, fill_pnl=None, fees=None, window=ROLLING_WINDOW,
+                            periods_per_year=None):
+    """
+    PerformanceTracker.snapshot() for whole arrays, e.g. run_backtest(...)['equity'].
+    equity, leverage: (T,) or (T, N) per tick. fill_pnl: realized PnL per tick with NaN where
+    nothing was filled (same shape). fees: total fees per candidate. Returns a dict of
+    scalars (1-D input) or (N,) arrays; Sharpe/Sortino cover the last `window` returns.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    single = equity.ndim == 1
+    if single:
+        equity = equity[:, None]
+    n_cand = equity.shape[1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = equity[1:] / equity[:-1] - 1.0
+        returns = np.where(equity[:-1] > 0, returns, np.nan)[-window:]
+        peak = np.maximum.accumulate(equity, axis=0)
+        drawdown = np.where(peak > 0, 1.0 - equity / peak, 0.0)
+    n = np.sum(~np.isnan(returns), axis=0)
+    r = np.nan_to_num(returns)
+    mean = r.sum(axis=0) / np.maximum(n, 1)
+    std = np.sqrt(np.maximum((r * r).sum(axis=0) / np.maximum(n, 1) - mean * mean, 0.0))
+    down = np.sqrt((np.minimum(r, 0.0) ** 2).sum(axis=0) / np.maximum(n, 1))
+    scale = math.sqrt(periods_per_year) if periods_per_year else 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where((n >= 2) & (std > 0), mean / std * scale, 0.0)
+        sortino = np.where((n >= 2) & (down > 0), mean / down * scale, 0.0)
+
+    result = {
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'max_drawdown': drawdown.max(axis=0) if len(equity) else np.zeros(n_cand),
+    }
+    if leverage is not None:
+        lev = np.abs(np.asarray(leverage, dtype=np.float64).reshape(len(equity), -1))
+        result['exposure'] = (lev > EXPOSURE_THRESHOLD).mean(axis=0)
+        result['avg_abs_leverage'] = lev.mean(axis=0)
+    if fill_pnl is not None:
+        pnl = np.asarray(fill_pnl, dtype=np.float64).reshape(len(equity), -1)
+        filled = ~np.isnan(pnl)
+        p = np.nan_to_num(pnl)
+        trades = filled.sum(axis=0)
+        gross_profit = np.maximum(p, 0.0).sum(axis=0)
+        gross_loss = -np.minimum(p, 0.0).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['win_rate'] = np.where(trades > 0, (p > 0).sum(axis=0) / trades * 100.0, 0.0)
+            result['profit_factor'] = np.where(gross_loss > 0, gross_profit / gross_loss,
+                                               np.where(gross_profit > 0, np.inf, 0.0))
+        result['trades'] = trades
+        result['realized_pnl'] = p.sum(axis=0)
+    if fees is not None:
+        result['total_fees'] = np.asarray(fees, dtype=np.float64).reshape(-1)
+    if single:
+        result = {k: v[0] for k, v in result.items()}
+    return result
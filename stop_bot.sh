@@ -1,6 +1,26 @@
 #!/bin/bash
 cd "$(dirname "$0")"
 
+# Bot daemon (trading loop)
+if [ -f ".daemon.pid" ]; then
+    PID=$(cat ".daemon.pid")
+    if kill -0 "$PID" 2>/dev/null; then
+        echo "Stopping bot daemon (PID: $PID)..."
+        kill -TERM "$PID"
+        # Wait for the bot to shut down before dropping the only handle to it
+        for _ in $(seq 1 30); do
+            kill -0 "$PID" 2>/dev/null || break
+            sleep 1
+        done
+    fi
+    if kill -0 "$PID" 2>/dev/null; then
+        echo "⚠️ Bot daemon (PID: $PID) is still running; keeping .daemon.pid. Check logs/daemon.log."
+    else
+        rm ".daemon.pid"
+        echo "✅ Bot daemon stopped."
+    fi
+fi
+
 PID_FILE=".streamlit.pid"
 
 if [ -f "$PID_FILE" ]; then
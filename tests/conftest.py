@@ -0,0 +1,41 @@
+import pytest
+
+
+def _list_collections(self, filter=None, session=None, **kwargs):
+    # Missing in mongomock; plain collections only (it has no time-series support)
+    names = self.list_collection_names()
+    if filter and 'name' in filter:
+        names = [n for n in names if n == filter['name']]
+    return iter([{'name': n, 'type': 'collection'} for n in names])
+
+
+@pytest.fixture
+def mongo_storage(monkeypatch, tmp_path):
+    """The real MongoStorage singleton over an in-memory mongomock server, spilling under tmp_path."""
+    mongomock = pytest.importorskip('mongomock')
+    from mongomock.collection import BulkOperationBuilder
+    from src.data import storage
+
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_compat(self, *args, sort=None, **kwargs):
+        # pymongo >= 4.11 passes sort= to bulk updates; mongomock 4.3 predates it
+        return add_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.database.Database, 'list_collections', _list_collections)
+    monkeypatch.setattr(BulkOperationBuilder, 'add_update', add_update_compat)
+
+    client = mongomock.MongoClient()
+    # An existing plain collection: mongomock can't create time-series ones
+    client.get_database('binance_bot_db').create_collection(storage.COLLECTION_NAME)
+    monkeypatch.setattr(storage, 'MongoClient', lambda uri, **kwargs: client)
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://stand-in')
+    spill = str(tmp_path / 'spill.jsonl')
+    monkeypatch.setattr(storage, 'SPILL_PATH', spill)
+    monkeypatch.setattr(storage, 'REPLAY_PATH', spill + '.replay')
+    monkeypatch.setattr(storage, 'REJECTED_PATH', spill + '.rejected')
+    monkeypatch.setattr(storage.MongoStorage, '_instance', None)
+
+    instance = storage.MongoStorage()
+    yield instance
+    instance.close()
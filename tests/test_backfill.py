@@ -0,0 +1,130 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from src.data.backfill import Backfiller, find_gaps, plan_windows, MINUTE_MS
+from src.data.collector import DataCollector
+from src.data.fetcher import BinanceDataFetcher
+
+START = 1767225600000  # 2026-01-01 00:00 UTC
+HOUR_MS = 60 * MINUTE_MS
+
+
+class StandInExchange:
+    """Candle, funding and open interest history of a fake market, served like ccxt does."""
+
+    def __init__(self, now):
+        self.now = now
+        self.markets = {'BTC/USDT': {}}
+        self.calls = {}
+
+    def _count(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def milliseconds(self):
+        return self.now
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+        self._count('fetch_ohlcv')
+        first = -(-since // MINUTE_MS) * MINUTE_MS
+        times = [t for t in range(first, first + limit * MINUTE_MS, MINUTE_MS) if t < self.now]
+        return [[t, 1.0, 2.0, 0.5, float(t // MINUTE_MS % 1000), 3.0] for t in times]
+
+    def fetch_funding_rate_history(self, symbol, since=None, limit=1000):
+        self._count('fetch_funding_rate_history')
+        first = -(-since // (8 * HOUR_MS)) * 8 * HOUR_MS
+        times = [t for t in range(first, first + limit * 8 * HOUR_MS, 8 * HOUR_MS) if t < self.now]
+        return [{'timestamp': t, 'fundingRate': t / 1e16} for t in times]
+
+    def fetch_open_interest_history(self, symbol, period, since=None, limit=500):
+        self._count('fetch_open_interest_history')
+        first = -(-since // (5 * MINUTE_MS)) * 5 * MINUTE_MS
+        times = [t for t in range(first, first + limit * 5 * MINUTE_MS, 5 * MINUTE_MS) if t < self.now]
+        return [{'timestamp': t, 'openInterestAmount': float(t // MINUTE_MS)} for t in times]
+
+
+def _dt(ms):
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=int(ms))
+
+
+def store_minutes(storage, minutes):
+    """Collector-style points for the given minutes (epoch ms)."""
+    assert storage.upsert_market_data([{'timestamp': _dt(t), 'symbol': 'BTC/USDT', 'close': 1.0} for t in minutes]) == 0
+
+
+def stored_doc(storage, t):
+    return storage.collection.find_one({'symbol': 'BTC/USDT', 'timestamp': _dt(t)}, {'_id': 0})
+
+
+def backfiller(storage, now):
+    exchange = StandInExchange(now)
+    fetcher = BinanceDataFetcher(symbol='BTC/USDT', use_cache=False, exchange=exchange)
+    return Backfiller('BTC/USDT', fetcher=fetcher, storage=storage), exchange
+
+
+def test_find_gaps():
+    stored = np.array([0, 1, 1, 2, 5, 6, 9], dtype=np.int64) * MINUTE_MS
+    assert find_gaps(stored, 0, 10 * MINUTE_MS) == [(3 * MINUTE_MS, 5 * MINUTE_MS), (7 * MINUTE_MS, 9 * MINUTE_MS)]
+    # Missing edges, and points outside the range are ignored
+    assert find_gaps(stored, -2 * MINUTE_MS, 11 * MINUTE_MS)[0] == (-2 * MINUTE_MS, 0)
+    assert find_gaps(stored, -2 * MINUTE_MS, 11 * MINUTE_MS)[-1] == (10 * MINUTE_MS, 11 * MINUTE_MS)
+    assert find_gaps(np.array([], dtype=np.int64), 0, 3 * MINUTE_MS) == [(0, 3 * MINUTE_MS)]
+    assert find_gaps(np.arange(10, dtype=np.int64) * MINUTE_MS, 0, 10 * MINUTE_MS) == []
+
+
+def test_plan_windows_coalesces_nearby_gaps():
+    gaps = [(0, 10 * MINUTE_MS), (20 * MINUTE_MS, 30 * MINUTE_MS), (5000 * MINUTE_MS, 5001 * MINUTE_MS)]
+    assert plan_windows(gaps, page=100) == [(0, 30 * MINUTE_MS), (5000 * MINUTE_MS, 5001 * MINUTE_MS)]
+    # Long gaps are split into page-sized windows
+    assert plan_windows([(0, 250 * MINUTE_MS)], page=100) == [
+        (0, 100 * MINUTE_MS), (100 * MINUTE_MS, 200 * MINUTE_MS), (200 * MINUTE_MS, 250 * MINUTE_MS)]
+
+
+@pytest.mark.parametrize('timeseries', [False, True])
+def test_run_fills_gaps_idempotently(mongo_storage, timeseries):
+    # Time-series collections insert only absent points (_absent) instead of upserting
+    mongo_storage.is_timeseries = timeseries
+    end = START + 6 * HOUR_MS
+    grid = list(range(START, end, MINUTE_MS))
+    missing = set(grid[100:130]) | set(grid[200:201]) | set(grid[-60:])
+    store_minutes(mongo_storage, [t for t in grid if t not in missing])
+    job, exchange = backfiller(mongo_storage, now=end + 10 * MINUTE_MS)
+
+    stats = job.run(start=START, end=end)
+    assert stats['missing'] == len(missing) and stats['written'] == len(missing) and stats['gaps'] == 3
+    assert exchange.calls['fetch_ohlcv'] == stats['requests'] <= 3
+
+    gaps, rescan = job.scan(start=START, end=end)
+    assert gaps == [] and rescan['missing'] == 0 and rescan['duplicates'] == 0
+    assert job.run(start=START, end=end)['written'] == 0
+    assert mongo_storage.collection.count_documents({'symbol': 'BTC/USDT'}) == len(grid)
+
+    # As-of joins: the last funding settlement and open interest point at or before each minute
+    t = grid[200]
+    doc = stored_doc(mongo_storage, t)
+    assert doc['close'] == float(t // MINUTE_MS % 1000) and doc['backfilled']
+    assert doc['funding_rate'] == (t // (8 * HOUR_MS) * 8 * HOUR_MS) / 1e16
+    assert doc['open_interest'] == float(t // (5 * MINUTE_MS) * 5)
+    assert all(stored_doc(mongo_storage, t)['open_interest'] is not None for t in missing)
+    # Minutes the collector stored are left alone
+    assert 'backfilled' not in stored_doc(mongo_storage, grid[0])
+
+
+def test_dry_run_writes_nothing(mongo_storage):
+    end = START + HOUR_MS
+    store_minutes(mongo_storage, range(START, end - 10 * MINUTE_MS, MINUTE_MS))
+    job, exchange = backfiller(mongo_storage, now=end)
+    stats = job.run(start=START, end=end, dry_run=True)
+    assert stats['missing'] == 10 and stats['written'] == 0
+    assert 'fetch_ohlcv' not in exchange.calls
+    assert mongo_storage.collection.count_documents({}) == 50
+
+
+def test_repair_skips_without_storage(mongo_storage):
+    collector = DataCollector.__new__(DataCollector)
+    collector.symbol = 'BTC/USDT'
+    collector.storage = mongo_storage
+    mongo_storage.collection = None  # no MONGODB_URI, or Mongo unreachable
+    collector.fetcher = None  # would fail if the repair tried to download anything
+    collector.repair(START / 1000)
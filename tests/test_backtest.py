@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.agent import backtest
+from src.agent.backtest import run_backtest
+from src.main import PaperTradingSession
+
+N_STEPS = 1500
+
+
+def scenarios(n_steps=N_STEPS, seed=0):
+    """Prices and three candidates' target leverages covering flips, full closes and dust skips."""
+    rng = np.random.default_rng(seed)
+    prices = 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, n_steps)))
+    # Random targets: frequent direction flips and partial reductions
+    random = rng.uniform(-20, 20, n_steps)
+    # Alternates long / flat / short blocks: full closes and flips through zero
+    blocks = np.repeat(rng.choice([-5.0, 0.0, 5.0], n_steps // 10 + 1), 10)[:n_steps]
+    # A fixed target with tiny wiggles: most rebalances are under $10 and skipped
+    dust = 1.0 + rng.normal(0, 1e-4, n_steps)
+    return prices, np.stack([random, blocks, dust], axis=1)
+
+
+def replay_paper(targets, prices, tmp_path, name):
+    session = PaperTradingSession(history_file=os.path.join(tmp_path, f"{name}.json"))
+    equity = np.empty(len(prices))
+    for t, (target, price) in enumerate(zip(targets, prices)):
+        session.execute_target_leverage(target, price, 'BTC/USDT')
+        equity[t] = session.net_worth
+    return session, equity
+
+
+@pytest.mark.parametrize('use_jit', [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(backtest._simulate_jit is None, reason="numba not installed")),
+])
+def test_parity_with_paper_session(tmp_path, capsys, use_jit):
+    prices, targets = scenarios()
+    result = run_backtest(targets, prices, use_jit=use_jit)
+
+    for j in range(targets.shape[1]):
+        session, equity = replay_paper(targets[:, j], prices, tmp_path, f"candidate{j}")
+        np.testing.assert_allclose(result['equity'][:, j], equity, rtol=1e-12, atol=1e-9)
+        assert result['total_fees'][j] == pytest.approx(session.total_fees, rel=1e-12, abs=1e-9)
+        assert result['realized_pnl'][j] == pytest.approx(session.realized_pnl, rel=1e-12, abs=1e-9)
+        assert result['held_quantity'][j] == pytest.approx(session.held_quantity, rel=1e-12, abs=1e-12)
+        assert result['entry_price'][j] == pytest.approx(session.entry_price, rel=1e-12, abs=1e-9)
+        assert result['balance'][j] == pytest.approx(session.balance, rel=1e-12, abs=1e-9)
+    capsys.readouterr()
+
+
+def test_scenarios_cover_the_edge_cases():
+    prices, targets = scenarios()
+    result = run_backtest(targets, prices, use_jit=False)
+    # The dust candidate trades once to open, then skips every sub-$10 rebalance
+    assert 1 <= result['trades'][2] < N_STEPS // 10
+    # Block targets pass through zero: full closes leave no position or entry behind
+    flat = np.nonzero(targets[:, 1] == 0)[0][-1]
+    closed = run_backtest(targets[:flat + 1, 1], prices[:flat + 1], use_jit=False)
+    assert closed['held_quantity'] == 0.0 and closed['entry_price'] == 0.0
+    # Random targets flip direction many times
+    assert np.sum(np.diff(np.sign(targets[:, 0])) != 0) > 100
+
+
+def test_single_candidate_shape():
+    prices, targets = scenarios(50)
+    single = run_backtest(targets[:, 0], prices, use_jit=False)
+    batch = run_backtest(targets, prices, use_jit=False)
+    assert single['equity'].shape == (50,)
+    np.testing.assert_array_equal(single['equity'], batch['equity'][:, 0])
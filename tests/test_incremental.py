@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.data.incremental import IncrementalFeatureEngine
+from src.data.processor import DataProcessor
+from src.data.synthetic import generate_candles, resample_candles
+
+TIMEFRAMES = ('15m', '1h', '1m')
+
+
+@pytest.fixture(scope='module')
+def candles():
+    """Three days of 1m candles with a 3-hour flat stretch (every price equal) near the end."""
+    df = generate_candles(3 * 24 * 60, np.random.default_rng(3))
+    df.iloc[-600:-420, :4] = df['close'].iloc[-601]
+    return df
+
+
+def frames(df_1m, minutes):
+    df = df_1m.iloc[:minutes]
+    return {'1m': df, '5m': resample_candles(df, 5), '15m': resample_candles(df, 15), '1h': resample_candles(df, 60)}
+
+
+def batch_features(fr, close_aligned):
+    processor = DataProcessor(fr['5m'])
+    processor.add_technical_indicators()
+    return DataProcessor.merge_timeframes(processor.normalize_features(), {tf: fr[tf] for tf in TIMEFRAMES},
+                                          base_timeframe='5m', close_aligned=close_aligned)
+
+
+# Before, inside and after the flat stretch; none on a candle boundary, so every timeframe has a forming candle
+@pytest.mark.parametrize('close_aligned', [False, True])
+@pytest.mark.parametrize('minutes', [3623, 3733, 3842, 3953, 4064, 4175, 4286])
+def test_matches_batch_pipeline(candles, minutes, close_aligned):
+    fr = frames(candles, minutes)
+    engine = IncrementalFeatureEngine(base_timeframe='5m', timeframes=TIMEFRAMES, lookback=50,
+                                      close_aligned=close_aligned)
+    for tf in ('1m', '5m', '15m', '1h'):
+        engine.seed(tf, fr[tf])
+    live = engine.frame()
+    batch = batch_features(fr, close_aligned)
+    batch = batch[batch.index >= live.index[0]]
+
+    # Same rows survive dropna() (flat bands don't drop rows on one side only) ...
+    assert len(live) >= 50
+    assert live.index.equals(batch.index)
+    # ... with the same values (secondary blocks are float32 in the batch frame)
+    np.testing.assert_allclose(live.to_numpy(), batch[live.columns].to_numpy(), rtol=1e-6, atol=1e-6)
+
+
+def test_legacy_alignment_is_open_time_join(candles):
+    """close_aligned=False reproduces the exact open-time join + ffill the current policy was trained on."""
+    fr = frames(candles, 4000)
+    merged = batch_features(fr, close_aligned=False)
+    for tf in TIMEFRAMES:
+        feat = DataProcessor.timeframe_features(fr[tf], tf)
+        joined = fr['5m'][[]].join(feat, how='left').ffill().loc[merged.index]
+        np.testing.assert_allclose(merged[feat.columns].to_numpy(), joined.to_numpy(dtype=np.float32))
+
+    closed = batch_features(fr, close_aligned=True)
+    row = closed.index[-10]
+    assert merged.loc[row, 'close_pct_1m'] != closed.loc[row, 'close_pct_1m']
+
+
+def test_streamed_candles_match_seeding(candles):
+    """Pushing candles one by one (forming updates included) ends in the seeded state."""
+    fr = frames(candles, 3760)
+    engine = IncrementalFeatureEngine(base_timeframe='5m', timeframes=TIMEFRAMES, lookback=50)
+    for tf in ('1m', '5m', '15m', '1h'):
+        engine.seed(tf, frames(candles, 3600)[tf])
+    for minutes in range(3601, 3761):
+        step = frames(candles, minutes)
+        for tf in ('1m', '5m', '15m', '1h'):
+            engine.update(tf, step[tf].iloc[-2:])
+
+    seeded = IncrementalFeatureEngine(base_timeframe='5m', timeframes=TIMEFRAMES, lookback=50)
+    for tf in ('1m', '5m', '15m', '1h'):
+        seeded.seed(tf, fr[tf])
+    np.testing.assert_array_equal(engine.frame().to_numpy(), seeded.frame().to_numpy())
@@ -0,0 +1,79 @@
+import pytest
+
+from src.live import trader
+from src.live.trader import LiveTradingSession, MAX_LEVERAGE
+from src.orchestrator import symbol_allocations
+
+BALANCE = 10000.0
+PRICES = {'BTC/USDT': 60000.0, 'ETH/USDT': 3000.0}
+
+
+class StubExchange:
+    """One futures account in one-way mode: market orders fill at the ticker price, no fees."""
+
+    def __init__(self):
+        self.contracts = {}  # symbol -> signed quantity
+
+    def set_leverage(self, leverage, symbol):
+        pass
+
+    def fetch_balance(self):
+        return {'USDT': {'total': BALANCE}}
+
+    def fetch_positions(self):
+        positions = []
+        for symbol, qty in self.contracts.items():
+            positions.append({'symbol': symbol + ':USDT', 'info': {'symbol': symbol.replace('/', '')},
+                              'side': 'long' if qty > 0 else 'short' if qty < 0 else 'none',
+                              'contracts': abs(qty), 'notional': abs(qty) * PRICES[symbol],
+                              'entryPrice': PRICES[symbol], 'unrealizedPnl': 0.0})
+        return positions
+
+    def fetch_ticker(self, symbol):
+        return {'last': PRICES[symbol]}
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{int(amount * 1000) / 1000:.3f}"
+
+    def market(self, symbol):
+        return {'precision': {'amount': 0.001}}
+
+    def create_market_order(self, symbol, side, amount, params=None):
+        self.contracts[symbol] = self.contracts.get(symbol, 0.0) + (amount if side == 'buy' else -amount)
+        return {'id': '1', 'filled': amount, 'average': PRICES[symbol], 'fees': []}
+
+    def notional(self):
+        return sum(abs(qty) * PRICES[symbol] for symbol, qty in self.contracts.items())
+
+
+@pytest.fixture(autouse=True)
+def no_settle_wait(monkeypatch):
+    monkeypatch.setattr(trader.time, 'sleep', lambda s: None)
+
+
+def test_sessions_split_the_account(tmp_path):
+    exchange = StubExchange()
+    allocations = symbol_allocations(list(PRICES))
+    sessions = [LiveTradingSession(symbol=s, max_leverage=MAX_LEVERAGE, exchange=exchange, allocation=allocations[s],
+                                   history_file=str(tmp_path / f"live_{s.replace('/', '')}.json")) for s in PRICES]
+    try:
+        for _ in range(2):
+            for session, sign in zip(sessions, (1, -1)):
+                session.execute_target_leverage(sign * MAX_LEVERAGE, PRICES[session.symbol], session.symbol)
+        assert all(exchange.contracts[s] != 0 for s in PRICES)
+        assert exchange.notional() <= BALANCE * MAX_LEVERAGE
+        # Each session reports leverage against its own share of the account
+        for session in sessions:
+            assert session.net_worth == pytest.approx(BALANCE * allocations[session.symbol])
+            assert abs(session.current_leverage) <= MAX_LEVERAGE
+    finally:
+        for session in sessions:
+            session.stop()
+
+
+def test_symbol_allocations():
+    assert symbol_allocations(['A', 'B']) == {'A': 0.5, 'B': 0.5}
+    assert symbol_allocations(['A', 'B', 'C'], 'A:2, B:1') == {'A': 0.5, 'B': 0.25, 'C': 0.25}
+    assert symbol_allocations(['BTC/USDT:USDT'], 'BTC/USDT:USDT:1') == {'BTC/USDT:USDT': 1.0}
+    with pytest.raises(ValueError):
+        symbol_allocations(['A'], 'B:1')
@@ -0,0 +1,18 @@
+import pytest
+
+from src.data import ratelimit
+
+
+def test_default_shares_leave_room_for_bursts():
+    shares = ratelimit.weight_shares()
+    assert sum(shares.values()) * (1 + ratelimit.BURST_FRACTION) <= 1.0
+
+
+@pytest.mark.parametrize('spec', ['bot:0.5,train:0.45', 'bot:1.0'])
+def test_rejects_shares_without_burst_headroom(spec):
+    with pytest.raises(ValueError, match='BINANCE_WEIGHT_SHARES'):
+        ratelimit.weight_shares(spec)
+
+
+def test_accepts_shares_up_to_the_bound():
+    assert ratelimit.weight_shares('bot:0.6,train:0.3') == {'bot': 0.6, 'train': 0.3}
@@ -0,0 +1,124 @@
+import datetime
+import os
+import time
+
+import pytest
+from pymongo.errors import ConnectionFailure
+
+from src.data import storage
+
+T0 = datetime.datetime(2026, 1, 1)
+
+
+def point(i, symbol='BTC/USDT'):
+    return {'symbol': symbol, 'timestamp': T0 + datetime.timedelta(minutes=i), 'close': 100.0 + i}
+
+
+def stored(s):
+    return sorted((d['symbol'], d['timestamp']) for d in s.collection.find({}, {'_id': 0, 'symbol': 1, 'timestamp': 1}))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def mongo_down(monkeypatch, s):
+    def refuse(uri, **kwargs):
+        raise ConnectionFailure("stand-in server is down")
+    s.collection = None
+    monkeypatch.setattr(storage, 'MongoClient', refuse)
+
+
+def spilled_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return sum(1 for line in f if line.strip())
+
+
+def test_unique_point_index(mongo_storage):
+    info = mongo_storage.collection.index_information()
+    assert any(i['key'] == [('symbol', 1), ('timestamp', 1)] and i.get('unique') for i in info.values())
+
+
+def test_writes_in_batches_and_flushes_the_rest(mongo_storage, monkeypatch):
+    monkeypatch.setattr(storage, 'WRITE_BATCH_SIZE', 10)
+    monkeypatch.setattr(storage, 'WRITE_FLUSH_INTERVAL', 60.0)
+    for i in range(25):
+        mongo_storage.save_market_data(point(i))
+    # Two full batches go out on their own; the last 5 points wait for the interval or a flush
+    assert wait_for(lambda: mongo_storage.collection.count_documents({}) == 20)
+    time.sleep(0.1)
+    assert mongo_storage.collection.count_documents({}) == 20
+    mongo_storage.flush()
+    assert mongo_storage.collection.count_documents({}) == 25
+
+
+def test_spills_while_down_and_replays_after_reconnect(mongo_storage, monkeypatch):
+    client = storage.MongoClient
+    mongo_down(monkeypatch, mongo_storage)
+    for i in range(30):
+        mongo_storage.save_market_data(point(i))
+    mongo_storage.flush()
+    assert spilled_lines(storage.SPILL_PATH) == 30
+
+    # Back up: the next successful write replays the journal
+    monkeypatch.setattr(storage, 'MongoClient', client)
+    mongo_storage.save_market_data(point(30))
+    mongo_storage.flush()
+    assert stored(mongo_storage) == sorted(('BTC/USDT', point(i)['timestamp']) for i in range(31))
+    assert not os.path.exists(storage.SPILL_PATH) and not os.path.exists(storage.REPLAY_PATH)
+
+
+def test_replay_after_a_crash_writes_no_duplicates(mongo_storage, monkeypatch):
+    monkeypatch.setattr(storage, 'WRITE_BATCH_SIZE', 10)
+    # A crash left a replay file whose first half was already written, plus newer spills
+    mongo_storage._spill([point(i) for i in range(40)])
+    os.replace(storage.SPILL_PATH, storage.REPLAY_PATH)
+    assert mongo_storage.upsert_market_data([point(i) for i in range(20)]) == 0
+    mongo_storage._spill([point(i) for i in range(35, 50)])
+
+    # Mongo drops out after the first replayed chunk: the rest stays in the replay file
+    upsert_many = mongo_storage._upsert_many
+    calls = []
+
+    def flaky(docs):
+        calls.append(len(docs))
+        return upsert_many(docs) if len(calls) <= 1 else docs
+    monkeypatch.setattr(mongo_storage, '_upsert_many', flaky)
+    mongo_storage._replay_spill()
+    assert spilled_lines(storage.REPLAY_PATH) == 55 - 10
+    assert not os.path.exists(storage.SPILL_PATH)
+
+    monkeypatch.setattr(mongo_storage, '_upsert_many', upsert_many)
+    mongo_storage._replay_spill()
+    assert not os.path.exists(storage.REPLAY_PATH)
+    assert stored(mongo_storage) == sorted(('BTC/USDT', point(i)['timestamp']) for i in range(50))
+
+
+def test_writer_survives_a_bad_document(mongo_storage):
+    mongo_storage.save_market_data({'timestamp': T0, 'close': 1.0})  # no symbol: not a Mongo error
+    mongo_storage.flush()
+    assert mongo_storage._writer.is_alive()
+    assert spilled_lines(storage.SPILL_PATH) == 1
+
+    for i in range(5):
+        mongo_storage.save_market_data(point(i))
+    mongo_storage.flush()
+    assert mongo_storage._writer.is_alive()
+    assert stored(mongo_storage) == sorted(('BTC/USDT', point(i)['timestamp']) for i in range(5))
+    # The replay set the bad point aside instead of retrying it forever
+    assert spilled_lines(storage.REJECTED_PATH) == 1
+    assert not os.path.exists(storage.REPLAY_PATH)
+
+
+@pytest.mark.parametrize('timeseries', [False, True])
+def test_upserts_are_idempotent(mongo_storage, timeseries):
+    # Time-series collections have no unique index: _absent() filters stored points instead
+    mongo_storage.is_timeseries = timeseries
+    assert mongo_storage.upsert_market_data([point(i) for i in range(10)] + [point(3)]) == 0
+    assert mongo_storage.upsert_market_data([point(i) for i in range(5, 15)]) == 0
+    assert stored(mongo_storage) == sorted(('BTC/USDT', point(i)['timestamp']) for i in range(15))
@@ -0,0 +1,89 @@
+import time
+
+import pandas as pd
+
+from src.data.replay import ReplayServer
+from src.data.stream import MarketDataStream
+
+MINUTE_MS = 60 * 1000
+
+
+def kline(minute, close, timeframe='1m'):
+    return {'stream': f'btcusdt@kline_{timeframe}', 'data': {'e': 'kline', 'k': {
+        't': minute * MINUTE_MS, 'i': timeframe, 'o': str(close), 'h': str(close + 1), 'l': str(close - 1),
+        'c': str(close), 'v': '1.5'}}}
+
+
+def candles(minutes):
+    index = pd.to_datetime([m * MINUTE_MS for m in minutes], unit='ms')
+    index.name = 'timestamp'
+    closes = [100.0 + m for m in minutes]
+    return pd.DataFrame({'open': closes, 'high': [c + 1 for c in closes], 'low': [c - 1 for c in closes],
+                         'close': closes, 'volume': 1.5}, index=index)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class StubFetcher:
+    """fetch_ohlcv() from a fixed minute range; records the `since` of every call."""
+
+    def __init__(self, first, last):
+        self.first, self.last = first, last
+        self.since = []
+
+    def fetch_ohlcv(self, timeframe=None, limit=None, since=None):
+        self.since.append(since)
+        start = self.first if since is None else since // MINUTE_MS
+        return candles(range(start, self.last + 1))
+
+
+def test_replayed_messages_fill_the_buffers():
+    depth = {'stream': 'btcusdt@depth20@100ms', 'data': {
+        'e': 'depthUpdate', 'E': 1, 'U': 1, 'u': 2, 'pu': 0,
+        'b': [['100.0', '3'], ['99.9', '1']], 'a': [['100.1', '1'], ['100.2', '1']]}}
+    mark = {'stream': 'btcusdt@markPrice@1s', 'data': {'e': 'markPriceUpdate', 'p': '100.05', 'r': '0.0001'}}
+    server = ReplayServer([kline(0, 100), kline(1, 101), kline(1, 102), depth, mark], port=0).start()
+    stream = MarketDataStream(timeframes=('1m',), url=server.url)
+    try:
+        stream.start()
+        assert wait_for(lambda: stream.messages == 5)
+        df = stream.get_ohlcv('1m')
+        assert list(df['close']) == [100.0, 102.0]  # the forming candle is updated in place
+        assert stream.get_order_book()['bids'][0] == [100.0, 3.0]
+        assert abs(stream.get_order_book_imbalance() - 2 / 6) < 1e-12
+        assert stream.get_funding_rate() == 0.0001 and stream.get_mark_price() == 100.05
+        assert stream.is_fresh()
+    finally:
+        stream.stop()
+        server.stop()
+
+
+def test_reconnect_backfills_missed_candles():
+    now_minute = int(time.time() * 1000) // MINUTE_MS
+    fetcher = StubFetcher(now_minute - 20, now_minute)
+    server = ReplayServer([kline(now_minute - 15, 1)], port=0).start()
+    port = server.port
+    stream = MarketDataStream(timeframes=('1m',), url=server.url, fetcher=fetcher, buffer_size=100)
+    try:
+        stream.start()  # seeds minutes -20 .. 0 from REST
+        assert wait_for(lambda: stream.messages == 1)
+        # Outage: klines for the minutes in between are never delivered over the socket
+        server.stop()
+        fetcher.first, fetcher.last = now_minute - 20, now_minute + 1
+        server = ReplayServer([kline(now_minute + 2, 2)], port=port).start()
+        assert wait_for(lambda: stream.messages == 2)
+
+        assert fetcher.since[-1] == now_minute * MINUTE_MS  # refetched from the last buffered candle
+        minutes = stream.get_ohlcv('1m').index.values.astype('datetime64[ms]').astype('int64') // MINUTE_MS
+        assert list(minutes) == list(range(now_minute - 20, now_minute + 3))
+        assert stream.is_fresh()
+    finally:
+        stream.stop()
+        server.stop()
@@ -0,0 +1,78 @@
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from src.data.incremental import IncrementalFeatureEngine
+from src.data.synthetic import generate_candles, resample_candles, market_frame
+from src.env.trading_env import TradingEnv
+
+
+def make_env(lookback=3, episode_length=5, rows=40):
+    features = np.arange(rows * 12, dtype=np.float32).reshape(rows, 12)
+    prices = np.linspace(100.0, 110.0, rows)
+    return TradingEnv(features=features, prices=prices, lookback=lookback, episode_length=episode_length)
+
+
+def test_terminal_observation_survives_reset():
+    lookback, episode_length = 3, 5
+    vec = DummyVecEnv([lambda: make_env(lookback, episode_length)])
+    first = vec.reset()
+    for _ in range(episode_length):
+        obs, _, dones, infos = vec.step(np.zeros((1, 1), dtype=np.float32))
+
+    assert dones[0]
+    terminal = infos[0]['terminal_observation']
+    features = vec.envs[0].unwrapped.features
+    last_step = lookback - 1 + episode_length
+    np.testing.assert_array_equal(terminal[:, :12], features[last_step - lookback + 1:last_step + 1])
+    # The auto-reset observation starts the next episode from the top again
+    np.testing.assert_array_equal(obs[0], first[0])
+    assert not np.array_equal(terminal, obs[0])
+
+
+def test_truncated_step_returns_a_copy():
+    env = make_env()
+    env.reset()
+    for _ in range(5):
+        obs, _, terminated, truncated, _ = env.step(np.zeros(1, dtype=np.float32))
+    assert truncated and not terminated
+    kept = obs.copy()
+    env.reset()
+    np.testing.assert_array_equal(obs, kept)
+
+
+def test_matches_live_observation(tmp_path):
+    """Same candles and position: the env observation equals TradingBot._get_latest_observation."""
+    from src.main import TradingBot, PaperTradingSession, LOOKBACK_WINDOW
+
+    rng = np.random.default_rng(1)
+    df_1m = generate_candles(400 * 5, rng)
+    df_5m = resample_candles(df_1m, 5)
+    engine = IncrementalFeatureEngine(base_timeframe='5m', timeframes=('1m',), lookback=LOOKBACK_WINDOW)
+    engine.seed('1m', df_1m)
+    engine.seed('5m', df_5m)
+
+    session = PaperTradingSession(history_file=str(tmp_path / 'trades.json'))
+    price = float(df_5m['close'].iloc[-1])
+    session.execute_target_leverage(3.5, price * 0.99, 'BTC/USDT')
+    session._update_net_worth(price)
+
+    # A TradingBot without network, stream or model (like stub_bot in benchmarks/suite.py)
+    bot = TradingBot.__new__(TradingBot)
+    bot.stream = None
+    bot.feature_engine = engine
+    bot.paper_session = session
+    bot.current_price = 0.0
+    bot._sync_feature_engine = lambda: None  # the engine is already seeded
+    live = bot._get_latest_observation(lookback=LOOKBACK_WINDOW)
+
+    env = TradingEnv(market_frame(df_5m, df_1m), lookback=LOOKBACK_WINDOW)
+    env.reset()
+    env.current_step = len(env.prices) - 1
+    for attr in ('balance', 'held_quantity', 'entry_price'):
+        setattr(env, attr, getattr(session, attr))
+    env._update_net_worth(env.prices[env.current_step])
+    obs = env._get_obs()
+
+    assert live.shape == obs.shape and live.dtype == obs.dtype
+    assert session.held_quantity != 0 and obs[-1, -2] != 0  # the state columns are exercised
+    np.testing.assert_allclose(obs, live, rtol=0, atol=1e-6)